@@ -5,45 +5,163 @@ MCP CLI - Command-line interface for testing Microsoft Planner MCP Server
 import click
 import asyncio
 import httpx
+import math
+import os
+import random
+import shlex
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from rich.console import Console
 from rich.table import Table
+from rich.live import Live
 from rich import print as rprint
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 import json
 
 console = Console()
 
+DEFAULT_BASE_URL = "http://localhost:8080"
+
 
 @click.group()
-def cli():
+@click.option('--base-url', envvar='PLANNER_MCP_URL', default=DEFAULT_BASE_URL, show_default=True,
+              help='HTTP test server URL (env: PLANNER_MCP_URL)')
+@click.option('--timeout', default=30.0, show_default=True, help='Request timeout in seconds')
+@click.option('--concurrency', default=8, show_default=True, help='Maximum requests in flight')
+@click.pass_context
+def cli(ctx, base_url: str, timeout: float, concurrency: int):
     """Microsoft Planner MCP CLI"""
-    pass
+    ctx.obj = {
+        "base_url": base_url.rstrip("/"),
+        "timeout": timeout,
+        "concurrency": max(1, concurrency)
+    }
+
+
+def make_client(options: dict) -> httpx.AsyncClient:
+    """The invocation's single keep-alive client, pooled up to the concurrency limit"""
+    return httpx.AsyncClient(
+        base_url=options["base_url"],
+        timeout=options["timeout"],
+        limits=httpx.Limits(
+            max_connections=options["concurrency"],
+            max_keepalive_connections=options["concurrency"]
+        )
+    )
+
+
+def read_ids(values: Iterable[str], name: str = "ID") -> List[str]:
+    """IDs from the command line; ``-``, or no IDs with piped input, reads one ID per line from stdin"""
+    values = list(values)
+    ids = [value for value in values if value != "-"]
+    if "-" in values or (not ids and not sys.stdin.isatty()):
+        ids.extend(line.strip() for line in sys.stdin if line.strip())
+    
+    if not ids:
+        raise click.UsageError(f"Give at least one {name}, or pipe them in on stdin")
+    # Keep the given order, drop duplicates
+    return list(dict.fromkeys(ids))
+
+
+async def fan_out(
+    ids: List[str],
+    call: Callable[[str], Awaitable[Any]],
+    concurrency: int
+) -> AsyncIterator[Tuple[str, Any, Optional[Exception]]]:
+    """Run ``call`` for every ID, at most ``concurrency`` at a time.
+
+    Yields ``(id, result, error)`` in completion order, so output can be
+    written as soon as each result arrives.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(item_id: str):
+        async with semaphore:
+            try:
+                return item_id, await call(item_id), None
+            except Exception as e:
+                return item_id, None, e
+    
+    pending = [asyncio.ensure_future(run(item_id)) for item_id in ids]
+    try:
+        for next_done in asyncio.as_completed(pending):
+            yield await next_done
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class RequestFailed(Exception):
+    """A request the server answered with an error status"""
+
+
+def check_response(response: httpx.Response, not_found: str):
+    if response.status_code == 404:
+        raise RequestFailed(not_found)
+    if response.status_code == 503:
+        raise RequestFailed("Server not authenticated with Azure")
+    if response.status_code >= 400:
+        raise RequestFailed(f"Server returned {response.status_code}")
+
+
+def report_error(item_id: str, error: Exception) -> bool:
+    """Print a per-ID failure; returns False when the server is unreachable and the run should stop"""
+    if isinstance(error, httpx.ConnectError):
+        rprint("[red]❌ Cannot connect to server[/red]")
+        rprint("Make sure the HTTP Test Server workflow is running")
+        return False
+    if isinstance(error, httpx.TimeoutException):
+        rprint(f"[red]{item_id}: request timed out[/red]")
+    else:
+        rprint(f"[red]{item_id}: {error}[/red]")
+    return True
 
 
 @cli.command()
-@click.option('--plan-id', required=True, help='Plan ID')
-def get_plan(plan_id: str):
+@click.argument('ids', nargs=-1)
+@click.option('--plan-id', 'plan_ids', multiple=True, help='Plan ID (repeatable)')
+@click.pass_obj
+def get_plan(options: dict, ids: Tuple[str, ...], plan_ids: Tuple[str, ...]):
+    """Show one or more plans; use - to read plan IDs from stdin"""
+    plan_ids = read_ids(plan_ids + ids, "plan ID")
+    
     async def _get():
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://localhost:8080/planner/plans/{plan_id}")
-            plan = response.json()
+        failed = 0
+        async with make_client(options) as client:
+            async def fetch(plan_id: str):
+                response = await client.get(f"/planner/plans/{plan_id}")
+                check_response(response, f"Plan ID '{plan_id}' not found")
+                return response.json()
             
-            rprint(f"[cyan]Plan: {plan.get('title', 'Untitled')}[/cyan]")
-            rprint(f"ID: {plan.get('id')}")
-            rprint(f"Owner: {plan.get('owner')}")
-            if plan.get('created_date_time'):
-                rprint(f"Created: {plan.get('created_date_time')}")
+            async for plan_id, plan, error in fan_out(plan_ids, fetch, options["concurrency"]):
+                if error:
+                    failed += 1
+                    if not report_error(plan_id, error):
+                        break
+                    continue
+                
+                rprint(f"[cyan]Plan: {plan.get('title', 'Untitled')}[/cyan]")
+                rprint(f"ID: {plan.get('id')}")
+                rprint(f"Owner: {plan.get('owner')}")
+                if plan.get('createdDateTime'):
+                    rprint(f"Created: {plan.get('createdDateTime')}")
+        return failed
     
-    asyncio.run(_get())
+    if asyncio.run(_get()):
+        sys.exit(1)
 
 
 @cli.command()
-def health():
+@click.pass_obj
+def health(options: dict):
     """Check server health and authentication status"""
     async def _check():
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get("http://localhost:8080/health")
+            async with make_client({**options, "timeout": min(options["timeout"], 5.0)}) as client:
+                response = await client.get("/health")
                 data = response.json()
                 
                 if data.get("services_initialized"):
@@ -63,12 +181,13 @@ def health():
 
 
 @cli.command()
-def list_groups():
+@click.pass_obj
+def list_groups(options: dict):
     """List all Microsoft 365 Groups (Teams) accessible by the app"""
     async def _list():
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get("http://localhost:8080/planner/groups")
+            async with make_client(options) as client:
+                response = await client.get("/planner/groups")
                 
                 if response.status_code == 503:
                     rprint("[red]Server not authenticated with Azure[/red]")
@@ -107,26 +226,30 @@ def list_groups():
 
 
 @cli.command()
-@click.option('--group-id', required=True, help='Microsoft 365 Group ID')
-def list_group_plans(group_id: str):
-    """List all Planner plans for a specific group"""
+@click.argument('ids', nargs=-1)
+@click.option('--group-id', 'group_ids', multiple=True, help='Microsoft 365 Group ID (repeatable)')
+@click.pass_obj
+def list_group_plans(options: dict, ids: Tuple[str, ...], group_ids: Tuple[str, ...]):
+    """List all Planner plans for one or more groups; use - to read group IDs from stdin"""
+    group_ids = read_ids(group_ids + ids, "group ID")
+    
     async def _list():
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(f"http://localhost:8080/planner/groups/{group_id}/plans")
-                
-                if response.status_code == 404:
-                    rprint(f"[red]Group ID '{group_id}' not found[/red]")
-                    return
-                
-                if response.status_code == 503:
-                    rprint("[red]Server not authenticated with Azure[/red]")
-                    return
-                
-                response.raise_for_status()
-                data = response.json()
+        failed = 0
+        first_plan_id = None
+        async with make_client(options) as client:
+            async def fetch(group_id: str):
+                response = await client.get(f"/planner/groups/{group_id}/plans")
+                check_response(response, f"Group ID '{group_id}' not found")
+                return response.json()
+            
+            async for group_id, data, error in fan_out(group_ids, fetch, options["concurrency"]):
+                if error:
+                    failed += 1
+                    if not report_error(group_id, error):
+                        break
+                    continue
                 
-                rprint(f"[green]Found {data['count']} plans in this group[/green]")
+                rprint(f"[green]Found {data['count']} plans in group {group_id}[/green]")
                 
                 if data['plans']:
                     table = Table(title=f"Plans for Group {group_id}")
@@ -142,98 +265,990 @@ def list_group_plans(group_id: str):
                         )
                     
                     console.print(table)
-                    
-                    if data['plans']:
-                        first_plan_id = data['plans'][0].get('id')
-                        rprint(f"\n[yellow]Example: List tasks for the first plan:[/yellow]")
-                        rprint(f"python cli/mcp_cli.py list-tasks --plan-id {first_plan_id}")
-                else:
-                    rprint("[yellow]No plans found in this group[/yellow]")
-        except httpx.ConnectError:
-            rprint("[red]❌ Cannot connect to server[/red]")
-            rprint("Make sure the HTTP Test Server workflow is running")
-        except Exception as e:
-            rprint(f"[red]Error: {e}[/red]")
+                    first_plan_id = first_plan_id or data['plans'][0].get('id')
+        
+        if first_plan_id:
+            rprint(f"\n[yellow]Example: List tasks for the first plan:[/yellow]")
+            rprint(f"python cli/mcp_cli.py list-tasks --plan-id {first_plan_id}")
+        return failed
     
-    asyncio.run(_list())
+    if asyncio.run(_list()):
+        sys.exit(1)
 
 
 @cli.command()
-@click.option('--plan-id', required=True, help='Plan ID')
-def list_tasks(plan_id: str):
+@click.argument('ids', nargs=-1)
+@click.option('--plan-id', 'plan_ids', multiple=True, help='Plan ID (repeatable)')
+@click.pass_obj
+def list_tasks(options: dict, ids: Tuple[str, ...], plan_ids: Tuple[str, ...]):
+    """List the tasks of one or more plans, rendering rows as the server streams them"""
+    plan_ids = read_ids(plan_ids + ids, "plan ID")
+    
     async def _list():
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(f"http://localhost:8080/planner/plans/{plan_id}/tasks")
-                
-                if response.status_code == 404:
-                    rprint(f"[red]Plan ID '{plan_id}' not found[/red]")
-                    rprint("\n[yellow]Tip: Use 'list-groups' command to discover your Plan IDs[/yellow]")
-                    return
-                
-                if response.status_code == 503:
-                    rprint("[red]Server not authenticated with Azure[/red]")
-                    rprint("Check your .env file and Azure credentials")
-                    return
-                
-                response.raise_for_status()
-                tasks = response.json()
-            
-            table = Table(title=f"Tasks for Plan {plan_id}")
-            table.add_column("ID", style="cyan")
-            table.add_column("Title", style="green")
-            table.add_column("Status", style="yellow")
-            table.add_column("Priority")
-            
-            for task in tasks:
-                table.add_row(
-                    task.get("id", ""),
-                    task.get("title", ""),
-                    f"{task.get('percentComplete', 0)}%",
-                    str(task.get("priority", "N/A"))
-                )
+        failed = 0
+        several = len(plan_ids) > 1
+        
+        table = Table(title="Tasks" if several else f"Tasks for Plan {plan_ids[0]}")
+        if several:
+            table.add_column("Plan", style="magenta")
+        table.add_column("ID", style="cyan")
+        table.add_column("Title", style="green")
+        table.add_column("Status", style="yellow")
+        table.add_column("Priority")
+        
+        async with make_client(options) as client:
+            async def stream_tasks(plan_id: str) -> int:
+                count = 0
+                async with client.stream(
+                    "GET",
+                    f"/planner/plans/{plan_id}/tasks",
+                    params={"stream": "true"}
+                ) as response:
+                    check_response(response, f"Plan ID '{plan_id}' not found")
+                    
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        task = json.loads(line)
+                        if "error" in task:
+                            raise RequestFailed(f"Listing stopped early: {task['error']}")
+                        
+                        row = [
+                            task.get("id", ""),
+                            task.get("title", ""),
+                            f"{task.get('percentComplete', 0)}%",
+                            str(task.get("priority", "N/A"))
+                        ]
+                        table.add_row(*([plan_id] if several else []) + row)
+                        count += 1
+                return count
             
-            console.print(table)
-        except httpx.ConnectError:
-            rprint("[red]❌ Cannot connect to server[/red]")
-            rprint("Make sure the HTTP Test Server workflow is running")
-        except httpx.ReadTimeout:
-            rprint("[red]Request timed out[/red]")
-            rprint(f"The server couldn't find plan '{plan_id}' after retrying")
+            with Live(table, console=console, vertical_overflow="visible"):
+                async for plan_id, _, error in fan_out(plan_ids, stream_tasks, options["concurrency"]):
+                    if error:
+                        failed += 1
+                        if not report_error(plan_id, error):
+                            break
+        
+        rprint(f"[green]{table.row_count} tasks[/green]")
+        if failed and not several:
             rprint("\n[yellow]Tip: Use 'list-groups' command to discover valid Plan IDs[/yellow]")
-        except Exception as e:
-            rprint(f"[red]Error: {e}[/red]")
+        return failed
     
-    asyncio.run(_list())
+    if asyncio.run(_list()):
+        sys.exit(1)
 
 
 @cli.command()
 @click.option('--plan-id', required=True, help='Plan ID')
 @click.option('--title', required=True, help='Task title')
 @click.option('--bucket-id', help='Bucket ID (optional)')
-def create_task(plan_id: str, title: str, bucket_id: Optional[str]):
+@click.option('--description', help='Task description (optional)')
+@click.option('--idempotency-key', help="Key that makes repeating this create safe; when omitted, a random key covers only this command's own retries")
+@click.option('--retries', default=3, show_default=True, help='Retries after timeouts, throttling or server errors')
+@click.pass_obj
+def create_task(
+    options: dict,
+    plan_id: str,
+    title: str,
+    bucket_id: Optional[str],
+    description: Optional[str],
+    idempotency_key: Optional[str],
+    retries: int
+):
+    # Every attempt carries the same key, so a retry after a timeout returns
+    # the task the first attempt created instead of creating another
+    key = idempotency_key or uuid.uuid4().hex
+    
     async def _create():
-        async with httpx.AsyncClient() as client:
+        async with make_client(options) as client:
             params = {
                 "plan_id": plan_id,
                 "title": title
             }
             if bucket_id:
                 params["bucket_id"] = bucket_id
+            if description:
+                params["description"] = description
             
-            response = await client.post(
-                "http://localhost:8080/tools/create_task",
-                params=params
-            )
-            response.raise_for_status()
+            for attempt in range(retries + 1):
+                try:
+                    response = await client.post(
+                        "/tools/create_task",
+                        params=params,
+                        headers={"Idempotency-Key": key}
+                    )
+                    if response.status_code not in (429, 500, 502, 503, 504) or attempt == retries:
+                        break
+                except (httpx.TimeoutException, httpx.RemoteProtocolError):
+                    if attempt == retries:
+                        raise
+                rprint(f"[yellow]Create failed, retrying with idempotency key {key}[/yellow]")
+                await asyncio.sleep(2 ** attempt)
+            
+            check_response(response, f"Plan {plan_id} not found")
             result = response.json()
             
-            rprint(f"[green]Task created successfully![/green]")
-            rprint(f"Task ID: {result.get('task_id')}")
+            if result.get("replayed"):
+                rprint(f"[yellow]Task was already created with this idempotency key[/yellow]")
+            else:
+                rprint(f"[green]Task created successfully![/green]")
+            rprint(f"Task ID: {result.get('id')}")
             rprint(f"Title: {result.get('title')}")
+            rprint(f"Idempotency key: {key}")
+    
+    try:
+        asyncio.run(_create())
+    except (httpx.HTTPError, RequestFailed) as e:
+        report_error(key, e)
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument('ids', nargs=-1)
+@click.option('--task-id', 'task_ids', multiple=True, help='Task ID (repeatable)')
+@click.option('--title', help='New title')
+@click.option('--bucket-id', help='Move to this bucket')
+@click.option('--percent-complete', type=int, help='Progress (0, 50 or 100)')
+@click.option('--priority', type=int, help='Priority (0-10)')
+@click.option('--due-date', help='Due date (ISO 8601)')
+@click.pass_obj
+def update_task(
+    options: dict,
+    ids: Tuple[str, ...],
+    task_ids: Tuple[str, ...],
+    title: Optional[str],
+    bucket_id: Optional[str],
+    percent_complete: Optional[int],
+    priority: Optional[int],
+    due_date: Optional[str]
+):
+    """Apply the same update to one or more tasks; use - to read task IDs from stdin"""
+    params = {
+        "title": title,
+        "bucket_id": bucket_id,
+        "percent_complete": percent_complete,
+        "priority": priority,
+        "due_date": due_date
+    }
+    params = {name: value for name, value in params.items() if value is not None}
+    if not params:
+        raise click.UsageError("Nothing to update; give at least one field option")
+    task_ids = read_ids(task_ids + ids, "task ID")
+    
+    async def _update():
+        failed = 0
+        updated = 0
+        async with make_client(options) as client:
+            async def update(task_id: str):
+                response = await client.put(f"/tools/update_task/{task_id}", params=params)
+                check_response(response, f"Task ID '{task_id}' not found")
+                return response.json()
+            
+            async for task_id, result, error in fan_out(task_ids, update, options["concurrency"]):
+                if error:
+                    failed += 1
+                    if not report_error(task_id, error):
+                        break
+                    continue
+                updated += 1
+                rprint(f"[green]✓[/green] {task_id} {result.get('title', '')}")
+        
+        rprint(f"Updated {updated} of {len(task_ids)} tasks")
+        return failed
+    
+    if asyncio.run(_update()):
+        sys.exit(1)
+
+
+READ_OPS = ("get_plan", "list_tasks", "list_buckets", "get_board")
+WRITE_OPS = ("update_task",)
+
+
+class HTTPBenchTarget:
+    """Drives the HTTP test server"""
+    
+    PATHS = {
+        "get_plan": "/planner/plans/{id}",
+        "list_tasks": "/planner/plans/{id}/tasks",
+        "list_buckets": "/planner/plans/{id}/buckets",
+        "get_board": "/planner/plans/{id}/board"
+    }
+    
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+    
+    async def call(self, op: str, item_id: str, priority: int) -> int:
+        if op == "update_task":
+            response = await self.client.put(f"/tools/update_task/{item_id}", params={"priority": priority})
+        else:
+            response = await self.client.get(self.PATHS[op].format(id=item_id))
+        return response.status_code
+    
+    async def cache_stats(self) -> Optional[dict]:
+        response = await self.client.get("/health")
+        return response.json().get("cache") or None
+
+
+class StdioBenchTarget:
+    """Drives the MCP server over stdio, through its resources and tools"""
+    
+    RESOURCES = {
+        "get_plan": "planner://plans/{id}",
+        "list_tasks": "planner://plans/{id}/tasks",
+        "list_buckets": "planner://plans/{id}/buckets"
+    }
+    
+    def __init__(self, session):
+        self.session = session
+    
+    async def call(self, op: str, item_id: str, priority: int) -> int:
+        # MCP has no status codes; map outcomes onto HTTP ones for the report
+        if op in self.RESOURCES:
+            result = await self.session.read_resource(self.RESOURCES[op].format(id=item_id))
+            text = "".join(getattr(content, "text", "") for content in result.contents)
+            is_error = text.startswith("MCP server not configured")
+        else:
+            if op == "get_board":
+                result = await self.session.call_tool("get_plan_board", {"plan_id": item_id})
+            else:
+                result = await self.session.call_tool("update_task", {"task_id": item_id, "priority": priority})
+            text = "".join(getattr(content, "text", "") for content in result.content)
+            is_error = result.isError or text.startswith('{"error"')
+        
+        if is_error:
+            return 429 if "Rate limited" in text else 500
+        return 200
+    
+    async def cache_stats(self) -> Optional[dict]:
+        # The stdio server exposes no cache counters
+        return None
+
+
+@asynccontextmanager
+async def open_bench_target(target: str, options: dict, server_command: str):
+    if target == "http":
+        async with make_client(options) as client:
+            yield HTTPBenchTarget(client)
+        return
+    
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+    
+    command, *args = shlex.split(server_command)
+    async with stdio_client(StdioServerParameters(command=command, args=args)) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield StdioBenchTarget(session)
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> dict:
+    """Throughput, latency percentiles (ms) and error/429 rates for ``(op, latency, status)`` samples"""
+    latencies = sorted(round(latency * 1000, 3) for _, latency, _ in samples)
+    total = len(samples)
+    errors = sum(1 for _, _, status in samples if status >= 400)
+    throttled = sum(1 for _, _, status in samples if status == 429)
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+            "mean": round(sum(latencies) / total, 3) if total else None
+        },
+        "error_rate": round(errors / total, 4) if total else None,
+        "rate_limited_rate": round(throttled / total, 4) if total else None
+    }
+
+
+@cli.command()
+@click.option('--target', type=click.Choice(["http", "stdio"]), default="http", show_default=True,
+              help='HTTP test server (--base-url) or an MCP server spawned over stdio')
+@click.option('--server-command', default=f"{sys.executable} -m src.server", show_default=True,
+              help='Command starting the MCP server for --target stdio')
+@click.option('--plan-id', 'plan_ids', multiple=True, required=True, help='Plan ID to read (repeatable)')
+@click.option('--task-id', 'task_ids', multiple=True, help='Task ID to update (repeatable); required for writes')
+@click.option('--read-op', 'read_ops', type=click.Choice(READ_OPS), multiple=True,
+              help='Read operations in the mix (repeatable, default all)')
+@click.option('--write-ratio', type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help='Fraction of requests that update a task')
+@click.option('--write-priority', type=click.IntRange(0, 10), default=5, show_default=True,
+              help='Priority the write requests set on the tasks')
+@click.option('--duration', type=float, default=30.0, show_default=True, help='Run time in seconds')
+@click.option('--rps', type=float, help='Target request rate; without it the --concurrency workers run flat out')
+@click.option('--seed', type=int, help='Random seed for a repeatable request mix')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Write the results as JSON')
+@click.pass_obj
+def bench(
+    options: dict,
+    target: str,
+    server_command: str,
+    plan_ids: Tuple[str, ...],
+    task_ids: Tuple[str, ...],
+    read_ops: Tuple[str, ...],
+    write_ratio: float,
+    write_priority: int,
+    duration: float,
+    rps: Optional[float],
+    seed: Optional[int],
+    output: Optional[str]
+):
+    """Load-test the server with a mix of reads and writes and report latency, errors and cache hits.
+    
+    Writes really update the given tasks (their priority), so point them at
+    test tasks only.
+    """
+    if write_ratio and not task_ids:
+        raise click.UsageError("--write-ratio needs at least one --task-id")
+    read_ops = read_ops or READ_OPS
+    rng = random.Random(seed)
+    concurrency = options["concurrency"]
+    
+    def next_request() -> Tuple[str, str]:
+        if write_ratio and rng.random() < write_ratio:
+            return "update_task", rng.choice(task_ids)
+        return rng.choice(read_ops), rng.choice(plan_ids)
+    
+    async def _bench():
+        samples: List[Tuple[str, float, int]] = []
+        
+        async with open_bench_target(target, options, server_command) as bench_target:
+            async def issue(op: str, item_id: str, started: float):
+                try:
+                    status = await bench_target.call(op, item_id, write_priority)
+                except httpx.TimeoutException:
+                    status = 504
+                except Exception:
+                    status = 599
+                samples.append((op, time.perf_counter() - started, status))
+            
+            stats_before = await bench_target.cache_stats()
+            started_at = datetime.now(timezone.utc)
+            start = time.perf_counter()
+            deadline = start + duration
+            
+            if rps:
+                # Open loop: requests start on schedule whether or not earlier
+                # ones finished, and latency counts from the scheduled time so
+                # queueing behind a slow server is not hidden
+                slots = asyncio.Semaphore(concurrency)
+                in_flight = set()
+                
+                async def scheduled(op: str, item_id: str, due: float):
+                    async with slots:
+                        await issue(op, item_id, due)
+                
+                sent = 0
+                while True:
+                    due = start + sent / rps
+                    if due >= deadline:
+                        break
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                    task = asyncio.ensure_future(scheduled(*next_request(), due))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    sent += 1
+                if in_flight:
+                    await asyncio.wait(in_flight)
+            else:
+                # Closed loop: each worker sends its next request once the previous one is answered
+                async def worker():
+                    while time.perf_counter() < deadline:
+                        await issue(*next_request(), time.perf_counter())
+                
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+            
+            elapsed = time.perf_counter() - start
+            stats_after = await bench_target.cache_stats()
+        
+        cache = None
+        if stats_before and stats_after:
+            hits = stats_after.get("hits", 0) - stats_before.get("hits", 0)
+            misses = stats_after.get("misses", 0) - stats_before.get("misses", 0)
+            cache = {"hits": hits, "misses": misses, "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None}
+        
+        by_op = {}
+        for op in sorted({op for op, _, _ in samples}):
+            by_op[op] = summarize([sample for sample in samples if sample[0] == op], elapsed)
+        
+        statuses = {}
+        for _, _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        
+        return {
+            "target": target,
+            "base_url": options["base_url"] if target == "http" else server_command,
+            "started_at": started_at.isoformat(),
+            "config": {
+                "duration": duration,
+                "rps": rps,
+                "concurrency": concurrency,
+                "write_ratio": write_ratio,
+                "read_ops": list(read_ops),
+                "plans": len(plan_ids),
+                "tasks": len(task_ids),
+                "seed": seed
+            },
+            "elapsed_seconds": round(elapsed, 3),
+            **summarize(samples, elapsed),
+            "statuses": statuses,
+            "cache": cache,
+            "operations": by_op
+        }
+    
+    try:
+        results = asyncio.run(_bench())
+    except httpx.ConnectError:
+        rprint("[red]❌ Cannot connect to server[/red]")
+        rprint("Make sure the HTTP Test Server workflow is running")
+        sys.exit(1)
+    
+    def ms(value: Optional[float]) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+    
+    table = Table(title=f"Benchmark: {results['requests']} requests in {results['elapsed_seconds']}s")
+    table.add_column("Operation", style="cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("RPS", justify="right")
+    for name in ("p50", "p90", "p99", "max"):
+        table.add_column(f"{name} ms", justify="right")
+    table.add_column("Errors", justify="right", style="red")
+    table.add_column("429", justify="right", style="yellow")
+    
+    for name, row in [*results["operations"].items(), ("all", results)]:
+        latency = row["latency_ms"]
+        table.add_row(
+            name,
+            str(row["requests"]),
+            str(row["throughput_rps"]),
+            ms(latency["p50"]),
+            ms(latency["p90"]),
+            ms(latency["p99"]),
+            ms(latency["max"]),
+            f"{(row['error_rate'] or 0):.1%}",
+            f"{(row['rate_limited_rate'] or 0):.1%}"
+        )
+    console.print(table)
+    
+    cache = results["cache"]
+    if cache and cache["hit_ratio"] is not None:
+        rprint(f"Server cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_ratio']:.1%} hit ratio)")
+    else:
+        rprint("Server cache: no hit/miss counters available")
+    
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        rprint(f"Results written to {output}")
+
+
+# Export output. The server streams records plan by plan (POST /export); a
+# writer appends them and, at each plan boundary, reports whether everything
+# written so far is durable. Only then are the finished plans added to the
+# checkpoint, so a resumed export redoes at most the plans since then:
+#
+# * JSONL is one file. Every plan boundary is durable; the checkpoint keeps
+#   the file size there, and a resume truncates to it.
+# * Parquet is a directory with one subdirectory per record type, written in
+#   row groups. A part file is durable once closed (which writes its
+#   footer); parts are closed every ``part_rows`` rows at a plan boundary,
+#   and a resume deletes parts the checkpoint does not list.
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+
+# Parquet columns per record type; nested values (assignments, checklist, ...) are stored as JSON text
+_STRING, _INT, _TIMESTAMP, _JSON = "string", "int", "timestamp", "json"
+PARQUET_COLUMNS = {
+    "plan": {
+        "id": _STRING, "title": _STRING, "owner": _STRING,
+        "createdDateTime": _TIMESTAMP, "container": _JSON
+    },
+    "bucket": {"id": _STRING, "name": _STRING, "orderHint": _STRING},
+    "task": {
+        "id": _STRING, "title": _STRING, "bucketId": _STRING, "percentComplete": _INT,
+        "priority": _INT, "startDateTime": _TIMESTAMP, "dueDateTime": _TIMESTAMP,
+        "createdDateTime": _TIMESTAMP, "assignments": _JSON, "orderHint": _STRING
+    },
+    "task_details": {
+        "id": _STRING, "description": _STRING, "previewType": _STRING,
+        "checklist": _JSON, "references": _JSON
+    }
+}
+
+
+class ExportCheckpoint:
+    """Progress of one export, saved next to the output after every durable step"""
+    
+    def __init__(self, path: str, data: Dict[str, Any]):
+        self.path = path
+        self.data = data
+    
+    @classmethod
+    def start(cls, path: str, output: str, fmt: str, include_details: bool) -> "ExportCheckpoint":
+        return cls(path, {
+            "output": os.path.abspath(output),
+            "format": fmt,
+            "include_details": include_details,
+            "done": [],
+            "writer": {},
+            "complete": False
+        })
+    
+    @classmethod
+    def load(cls, path: str, output: str, fmt: str, include_details: bool) -> "ExportCheckpoint":
+        """The checkpoint of an earlier run; raises ValueError if it was for a different export"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        expected = {"output": os.path.abspath(output), "format": fmt, "include_details": include_details}
+        for name, value in expected.items():
+            if data.get(name) != value:
+                raise ValueError(f"Checkpoint {path} is for {name}={data.get(name)!r}, not {value!r}")
+        return cls(path, data)
+    
+    @property
+    def done(self) -> List[str]:
+        return self.data["done"]
+    
+    def save(self) -> None:
+        # Replaced in one step, so an interrupted save leaves the previous checkpoint
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+
+
+class JsonlWriter:
+    """All records in one file, one JSON object per line, as the server sends them"""
+    
+    def __init__(self, path: str, state: Optional[Dict[str, Any]] = None):
+        if state:
+            # Drop whatever was written after the last checkpoint
+            self.file = open(path, "r+b")
+            self.file.truncate(state["offset"])
+            self.file.seek(state["offset"])
+        else:
+            self.file = open(path, "wb")
+    
+    def write(self, line: bytes) -> None:
+        self.file.write(line.rstrip(b"\n") + b"\n")
+    
+    def commit(self) -> Optional[Dict[str, Any]]:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": self.file.tell()}
+    
+    def close(self) -> Dict[str, Any]:
+        state = self.commit()
+        self.file.close()
+        return state
+    
+    def abort(self) -> None:
+        self.file.close()
+
+
+def _column_value(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == _JSON:
+        return json.dumps(value, separators=(",", ":"))
+    if kind == _TIMESTAMP:
+        return datetime.fromisoformat(value)
+    return value
+
+
+class ParquetWriter:
+    """One directory of part files per record type, each with a fixed schema.
+
+    Needs pyarrow (``pip install '.[parquet]'``). At most ``row_group_rows``
+    rows per record type are held in memory.
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        state: Optional[Dict[str, Any]] = None,
+        row_group_rows: int = 10000,
+        part_rows: int = 500000
+    ):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install '.[parquet]'") from None
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.directory = directory
+        self.row_group_rows = row_group_rows
+        self.part_rows = part_rows
+        self.parts: List[str] = list((state or {}).get("parts", []))
+        self._part_number = (state or {}).get("next_part", 0)
+        self._rows: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in PARQUET_COLUMNS}
+        # Record type -> (part name, open pyarrow writer)
+        self._writers: Dict[str, Tuple[str, Any]] = {}
+        self._part_size = 0
+        
+        kept = set(self.parts)
+        for kind in PARQUET_COLUMNS:
+            os.makedirs(os.path.join(directory, kind), exist_ok=True)
+            for name in os.listdir(os.path.join(directory, kind)):
+                # Parts from an interrupted run, or from an earlier export to the same directory
+                if f"{kind}/{name}" not in kept and name.endswith(".parquet"):
+                    os.remove(os.path.join(directory, kind, name))
+        
+        types = {
+            _STRING: pyarrow.string(),
+            _JSON: pyarrow.string(),
+            _INT: pyarrow.int64(),
+            _TIMESTAMP: pyarrow.timestamp("us", tz="UTC")
+        }
+        self._schemas = {
+            kind: pyarrow.schema([("planId", pyarrow.string())] + [(name, types[column]) for name, column in columns.items()])
+            for kind, columns in PARQUET_COLUMNS.items()
+        }
+    
+    def write(self, line: bytes) -> None:
+        item = json.loads(line)
+        kind = item["type"]
+        columns = PARQUET_COLUMNS[kind]
+        data = item["data"]
+        row = {"planId": item["planId"]}
+        row.update((name, _column_value(column, data.get(name))) for name, column in columns.items())
+        rows = self._rows[kind]
+        rows.append(row)
+        self._part_size += 1
+        if len(rows) >= self.row_group_rows:
+            self._flush(kind)
+    
+    def _flush(self, kind: str) -> None:
+        rows = self._rows[kind]
+        if not rows:
+            return
+        if kind not in self._writers:
+            name = f"{kind}/part-{self._part_number:05d}.parquet"
+            self._writers[kind] = (name, self._pq.ParquetWriter(os.path.join(self.directory, name), self._schemas[kind]))
+        _, writer = self._writers[kind]
+        writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schemas[kind]))
+        rows.clear()
+    
+    def _close_parts(self) -> None:
+        for kind in PARQUET_COLUMNS:
+            self._flush(kind)
+        for name, writer in self._writers.values():
+            writer.close()
+            self.parts.append(name)
+        self._writers.clear()
+        self._part_number += 1
+        self._part_size = 0
+    
+    def _state(self) -> Dict[str, Any]:
+        return {"parts": list(self.parts), "next_part": self._part_number}
+    
+    def commit(self) -> Optional[Dict[str, Any]]:
+        if self._part_size < self.part_rows:
+            return None
+        self._close_parts()
+        return self._state()
+    
+    def close(self) -> Dict[str, Any]:
+        self._close_parts()
+        return self._state()
+    
+    def abort(self) -> None:
+        # The open parts may end inside a plan; they are not in the checkpoint, so a resume removes them
+        for _, writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+def open_export_writer(fmt: str, output: str, state: Optional[Dict[str, Any]] = None):
+    if fmt == "parquet":
+        return ParquetWriter(output, state)
+    return JsonlWriter(output, state)
+
+
+@cli.command()
+@click.argument('ids', nargs=-1)
+@click.option('--plan-id', 'plan_ids', multiple=True, help='Plan ID (repeatable)')
+@click.option('--group-id', 'group_ids', multiple=True, help='Export every plan of this group (repeatable)')
+@click.option('--output', '-o', required=True, type=click.Path(), help='JSONL file, or directory for parquet')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='jsonl', show_default=True)
+@click.option('--details', is_flag=True, help="Include each task's description, checklist and references")
+@click.option('--checkpoint', 'checkpoint_path', type=click.Path(dir_okay=False),
+              help='Progress file  [default: OUTPUT.checkpoint]')
+@click.option('--resume', is_flag=True, help='Continue an interrupted export from its checkpoint')
+@click.pass_obj
+def export(
+    options: dict,
+    ids: Tuple[str, ...],
+    plan_ids: Tuple[str, ...],
+    group_ids: Tuple[str, ...],
+    output: str,
+    fmt: str,
+    details: bool,
+    checkpoint_path: Optional[str],
+    resume: bool
+):
+    """Export plans, buckets, tasks and optionally task details for analytics.
+    
+    Records are written as the server streams them, so memory use does not
+    grow with the export. After an interruption, run the same command with
+    --resume; plans that failed are retried as well.
+    """
+    plan_ids = read_ids(plan_ids + ids, "plan ID") if plan_ids or ids or not group_ids else []
+    checkpoint_path = checkpoint_path or f"{output.rstrip(os.sep)}.checkpoint"
+    
+    if resume:
+        try:
+            checkpoint = ExportCheckpoint.load(checkpoint_path, output, fmt, details)
+        except FileNotFoundError:
+            raise click.UsageError(f"No checkpoint at {checkpoint_path}")
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        if checkpoint.data["complete"]:
+            rprint(f"[green]Export to {output} is already complete[/green]")
+            return
+    else:
+        checkpoint = ExportCheckpoint.start(checkpoint_path, output, fmt, details)
+    
+    try:
+        writer = open_export_writer(fmt, output, checkpoint.data["writer"] or None)
+    except (RuntimeError, OSError) as e:
+        raise click.ClickException(str(e))
+    checkpoint.save()
+    
+    counts = {"task": 0, "task_details": 0}
+    plans = failed = details_failed = 0
+    
+    async def _export():
+        nonlocal plans, failed, details_failed
+        # Plans written since the checkpoint was last saved
+        finished: List[str] = []
+        body = {
+            "plan_ids": plan_ids,
+            "group_ids": list(group_ids),
+            "include_details": details,
+            "skip_plan_ids": checkpoint.done
+        }
+        async with make_client(options) as client:
+            async with client.stream("POST", "/export", json=body) as response:
+                check_response(response, "Plan or group not found")
+                
+                with console.status("Exporting...") as status:
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        kind = record["type"]
+                        if kind == "plan_done":
+                            plans += 1
+                            finished.append(record["planId"])
+                            state = writer.commit()
+                            if state is not None:
+                                checkpoint.done.extend(finished)
+                                checkpoint.data["writer"] = state
+                                checkpoint.save()
+                                finished.clear()
+                            status.update(f"Exporting... {plans} plans, {counts['task']:,} tasks")
+                        elif kind == "error" and record.get("taskId"):
+                            # The task is exported without its details; the plan goes on
+                            details_failed += 1
+                            rprint(f"[yellow]{record['planId']}: no details for task {record['taskId']}: {record['error']}[/yellow]")
+                        elif kind == "error":
+                            if record.get("partial"):
+                                raise RequestFailed(f"Export stopped in plan {record.get('planId')}: {record['error']}")
+                            failed += 1
+                            rprint(f"[red]{record['planId']}: {record['error']}[/red]")
+                        else:
+                            writer.write(line.encode("utf-8"))
+                            if kind in counts:
+                                counts[kind] += 1
+        
+        checkpoint.data["writer"] = writer.close()
+        checkpoint.done.extend(finished)
+        # Failed plans are not in the checkpoint, so a resume retries them
+        checkpoint.data["complete"] = failed == 0
+        checkpoint.save()
+    
+    try:
+        asyncio.run(_export())
+    except (RequestFailed, httpx.HTTPError, OSError) as e:
+        writer.abort()
+        report_error("export", e)
+        rprint(f"Run again with --resume to continue from the last checkpoint ({len(checkpoint.done)} plans)")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        writer.abort()
+        rprint(f"[yellow]Interrupted; run again with --resume to continue ({len(checkpoint.done)} plans saved)[/yellow]")
+        sys.exit(130)
+    
+    summary = f"{plans} plans, {counts['task']:,} tasks"
+    if details:
+        summary += f", {counts['task_details']:,} task details"
+    rprint(f"[green]Exported {summary} to {output}[/green]")
+    if details_failed:
+        rprint(f"[yellow]Details of {details_failed} tasks could not be read and are missing[/yellow]")
+    if failed:
+        rprint(f"[red]{failed} plans failed; run again with --resume to retry them[/red]")
+        sys.exit(1)
+
+
+@cli.group()
+def cache():
+    """Inspect and repair the server cache (memory or shared backend)"""
+
+
+def run_admin(call: Callable[[httpx.AsyncClient], Awaitable[None]], options: dict):
+    """Run one admin request; exits non-zero on failure"""
+    async def _run():
+        async with make_client(options) as client:
+            await call(client)
+    
+    try:
+        asyncio.run(_run())
+    except (RequestFailed, httpx.HTTPError) as e:
+        report_error("cache", e)
+        sys.exit(1)
+
+
+def check_admin_response(response: httpx.Response):
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail")
+        except ValueError:
+            detail = response.text
+        raise RequestFailed(f"Server returned {response.status_code}: {detail}")
+
+
+@cache.command('keys')
+@click.option('--prefix', default='', help='Key prefix, e.g. plan_board:')
+@click.option('--tag', help='Only keys with this tag, e.g. plan:<PLAN_ID> or task_details')
+@click.option('--limit', default=200, show_default=True, help='Maximum keys listed')
+@click.option('--json', 'as_json', is_flag=True, help='Print the raw JSON')
+@click.pass_obj
+def cache_keys(options: dict, prefix: str, tag: Optional[str], limit: int, as_json: bool):
+    """List cached keys with size, seconds to expiry and pins"""
+    async def _keys(client: httpx.AsyncClient):
+        params = {"prefix": prefix, "limit": limit}
+        if tag:
+            params["tag"] = tag
+        response = await client.get("/admin/cache/keys", params=params)
+        check_admin_response(response)
+        data = response.json()
+        
+        if as_json:
+            click.echo(json.dumps(data, indent=2))
+            return
+        table = Table(title=f"{data['count']} keys, {data['bytes']:,} bytes")
+        table.add_column("Key", style="cyan")
+        table.add_column("Bytes", justify="right")
+        table.add_column("TTL (s)", justify="right")
+        table.add_column("Pinned")
+        table.add_column("Tags", style="dim")
+        for entry in data["entries"]:
+            table.add_row(
+                entry["key"],
+                f"{entry['bytes']:,}",
+                "-" if entry["ttl"] is None else str(entry["ttl"]),
+                "yes" if entry["pinned"] else "",
+                ", ".join(entry["tags"][1:])
+            )
+        console.print(table)
+    
+    run_admin(_keys, options)
+
+
+@cache.command('purge')
+@click.option('--prefix', help='Purge keys with this prefix')
+@click.option('--plan-id', help="Purge everything cached about this plan, including its tasks")
+@click.option('--tag', help='Purge keys with this tag')
+@click.pass_obj
+def cache_purge(options: dict, prefix: Optional[str], plan_id: Optional[str], tag: Optional[str]):
+    """Purge keys matching all given filters, e.g. a plan with a stale board"""
+    if prefix is None and plan_id is None and tag is None:
+        raise click.UsageError("Give --prefix, --plan-id or --tag")
+    
+    async def _purge(client: httpx.AsyncClient):
+        params = {name: value for name, value in (("prefix", prefix), ("plan_id", plan_id), ("tag", tag)) if value is not None}
+        response = await client.delete("/admin/cache/keys", params=params)
+        check_admin_response(response)
+        rprint(f"[green]Purged {response.json()['purged']} keys[/green]")
+    
+    run_admin(_purge, options)
+
+
+@cache.command('pin')
+@click.argument('keys', nargs=-1, required=True)
+@click.pass_obj
+def cache_pin(options: dict, keys: Tuple[str, ...]):
+    """Pin cache keys so they never expire"""
+    async def _pin(client: httpx.AsyncClient):
+        response = await client.put("/admin/cache/pins", json=list(keys))
+        check_admin_response(response)
+        rprint(f"[green]Pinned {response.json()['changed']} keys[/green]")
+    
+    run_admin(_pin, options)
+
+
+@cache.command('unpin')
+@click.argument('keys', nargs=-1, required=True)
+@click.pass_obj
+def cache_unpin(options: dict, keys: Tuple[str, ...]):
+    """Unpin cache keys; they expire normally again"""
+    async def _unpin(client: httpx.AsyncClient):
+        response = await client.delete("/admin/cache/pins", params=[("key", key) for key in keys])
+        check_admin_response(response)
+        rprint(f"[green]Unpinned {response.json()['changed']} keys[/green]")
+    
+    run_admin(_unpin, options)
+
+
+@cache.command('export')
+@click.option('--output', required=True, type=click.Path(dir_okay=False, writable=True), help='File to write')
+@click.option('--prefix', default='', help='Only keys with this prefix')
+@click.pass_obj
+def cache_export(options: dict, output: str, prefix: str):
+    """Save the cache contents to a file (cache snapshot format)"""
+    async def _export(client: httpx.AsyncClient):
+        response = await client.get("/admin/cache/export", params={"prefix": prefix})
+        check_admin_response(response)
+        with open(output, "wb") as f:
+            f.write(response.content)
+        rprint(f"[green]Wrote {len(response.content):,} bytes to {output}[/green]")
+    
+    run_admin(_export, options)
+
+
+@cache.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.pass_obj
+def cache_import(options: dict, path: str):
+    """Load a cache export into the server, replacing existing entries"""
+    async def _import(client: httpx.AsyncClient):
+        with open(path, "rb") as f:
+            data = f.read()
+        response = await client.post(
+            "/admin/cache/import",
+            content=data,
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        check_admin_response(response)
+        rprint(f"[green]Imported {response.json()['imported']} entries[/green]")
     
-    asyncio.run(_create())
+    run_admin(_import, options)
 
 
 if __name__ == "__main__":
-    cli()
\ No newline at end of file
+    cli()
@@ -57,12 +57,27 @@ class MicrosoftAuthManager:
     def _save_token_cache(self):
         """Save tokens to cache file"""
         try:
-            with open(TOKEN_CACHE_FILE, 'w') as f:
+            # Write-then-rename so other worker processes never read a partial file
+            tmp_file = f"{TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(self._token_cache, f)
+            os.replace(tmp_file, TOKEN_CACHE_FILE)
             logger.debug("saved_token_cache")
         except Exception as e:
             logger.warning("failed_to_save_cache", error=str(e))
     
+    def _get_cached_token(self, cache_key: str) -> Optional[str]:
+        """Return a cached token that is still valid for at least 5 minutes"""
+        cached = self._token_cache.get(cache_key)
+        if not cached or cached.get("expires_at", 0) <= time.time() + 300:
+            # Another worker process may already have refreshed the token file
+            self._load_token_cache()
+            cached = self._token_cache.get(cache_key)
+        
+        if cached and cached.get("expires_at", 0) > time.time() + 300:
+            return cached["access_token"]
+        return None
+    
     def get_token(self, scopes: Optional[list] = None) -> str:
         """
         Get an access token using the appropriate flow.
@@ -83,10 +98,9 @@ class MicrosoftAuthManager:
         cache_key = f"app:{':'.join(sorted(scopes))}"
         
         # Check cache
-        if cache_key in self._token_cache:
-            cached = self._token_cache[cache_key]
-            if cached["expires_at"] > time.time() + 300:
-                return cached["access_token"]
+        cached_token = self._get_cached_token(cache_key)
+        if cached_token:
+            return cached_token
         
         # Acquire new token
         result = self._app.acquire_token_for_client(scopes=scopes)
@@ -121,11 +135,10 @@ class MicrosoftAuthManager:
         cache_key = f"user:{':'.join(sorted(scopes))}"
         
         # Check cache first
-        if cache_key in self._token_cache:
-            cached = self._token_cache[cache_key]
-            if cached.get("expires_at", 0) > time.time() + 300:
-                logger.info("using_cached_user_token")
-                return cached["access_token"]
+        cached_token = self._get_cached_token(cache_key)
+        if cached_token:
+            logger.info("using_cached_user_token")
+            return cached_token
         
         # Try silent token acquisition first (if we have an account)
         accounts = self._app.get_accounts()
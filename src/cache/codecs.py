@@ -0,0 +1,303 @@
+import json
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.cache.interface import CacheInterface
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+# Encoded values start with a two byte header: codec tag, compression tag.
+_UNCOMPRESSED = b"-"
+
+
+class Codec(ABC):
+    name = ""
+    tag = b""
+    
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+    
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        pass
+
+
+class JSONCodec(Codec):
+    """UTF-8 JSON; payloads can be sent to clients without re-encoding"""
+    name = "json"
+    tag = b"j"
+    
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+    
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    tag = b"m"
+    
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("The msgpack cache codec requires the 'msgpack' package")
+    
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+    
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class Compression(ABC):
+    name = ""
+    tag = b""
+    
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        pass
+    
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        pass
+
+
+class ZlibCompression(Compression):
+    name = "zlib"
+    tag = b"z"
+    
+    def __init__(self, level: int = 6):
+        self.level = level
+    
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+    
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCompression(Compression):
+    name = "zstd"
+    tag = b"s"
+    
+    def __init__(self, level: int = 3):
+        if zstandard is None:
+            raise ImportError("zstd cache compression requires the 'zstandard' package")
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+    
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+CODECS = {"json": JSONCodec, "msgpack": MsgpackCodec}
+COMPRESSIONS = {"zlib": ZlibCompression, "zstd": ZstdCompression}
+
+
+def get_codec(name: str) -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown cache codec '{name}', expected one of {', '.join(CODECS)}")
+    return CODECS[name]()
+
+
+def get_compression(name: str) -> Optional[Compression]:
+    if name in ("", "none"):
+        return None
+    if name not in COMPRESSIONS:
+        raise ValueError(f"Unknown cache compression '{name}', expected one of none, {', '.join(COMPRESSIONS)}")
+    return COMPRESSIONS[name]()
+
+
+class CodecCache(CacheInterface):
+    """
+    Stores values under configured key prefixes as encoded (and, above a
+    size threshold, compressed) bytes instead of Python object graphs.
+
+    ``get`` transparently decodes. ``get_raw`` returns JSON bytes that can be
+    written to a client as-is; for JSON encoded entries that costs at most a
+    decompression, never a serialization.
+    """
+    
+    def __init__(
+        self,
+        backend: CacheInterface,
+        codecs: Dict[str, str],
+        compression: str = "zlib",
+        compress_min_bytes: int = 16384
+    ):
+        super().__init__()
+        self.backend = backend
+        # Longest prefix wins when prefixes overlap
+        self._codecs: List[Tuple[str, Codec]] = sorted(
+            ((prefix, get_codec(name)) for prefix, name in codecs.items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self._compression = get_compression(compression)
+        self.compress_min_bytes = compress_min_bytes
+        # Decoders for entries written with other settings (e.g. restored snapshots)
+        self._codec_tags: Dict[bytes, Codec] = {codec.tag: codec for _, codec in self._codecs}
+        self._compression_tags: Dict[bytes, Compression] = {}
+        if self._compression:
+            self._compression_tags[self._compression.tag] = self._compression
+    
+    def _codec_for(self, key: str) -> Optional[Codec]:
+        for prefix, codec in self._codecs:
+            if key.startswith(prefix):
+                return codec
+        return None
+    
+    def encode(self, key: str, value: Any) -> Any:
+        codec = self._codec_for(key)
+        if codec is None:
+            return value
+        
+        payload = codec.encode(value)
+        if self._compression and len(payload) >= self.compress_min_bytes:
+            return codec.tag + self._compression.tag + self._compression.compress(payload)
+        return codec.tag + _UNCOMPRESSED + payload
+    
+    @staticmethod
+    def _decoder(tags: Dict[bytes, Any], classes: Iterable[type], tag: bytes, header: bytes) -> Any:
+        if tag not in tags:
+            for cls in classes:
+                if cls.tag == tag:
+                    tags[tag] = cls()
+                    break
+            else:
+                raise ValueError(f"Unknown cache value header: {header!r}")
+        return tags[tag]
+    
+    def _payload(self, data: bytes) -> Tuple[Codec, bytes]:
+        header, payload = data[:2], data[2:]
+        if len(header) < 2:
+            raise ValueError(f"Truncated cache value header: {header!r}")
+        codec_tag, compression_tag = header[:1], header[1:]
+        codec = self._decoder(self._codec_tags, CODECS.values(), codec_tag, header)
+        if compression_tag != _UNCOMPRESSED:
+            compression = self._decoder(self._compression_tags, COMPRESSIONS.values(), compression_tag, header)
+            payload = compression.decompress(payload)
+        return codec, payload
+    
+    def decode(self, key: str, value: Any) -> Any:
+        if not isinstance(value, bytes) or self._codec_for(key) is None:
+            return value
+        
+        codec, payload = self._payload(value)
+        return codec.decode(payload)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        return self.decode(key, value)
+    
+    async def get_stale(self, key: str) -> Optional[Any]:
+        value = await self.backend.get_stale(key)
+        if value is None:
+            return None
+        return self.decode(key, value)
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        
+        if isinstance(value, bytes) and self._codec_for(key) is not None:
+            codec, payload = self._payload(value)
+            if isinstance(codec, JSONCodec):
+                return payload
+            value = codec.decode(payload)
+        return JSONCodec().encode(value)
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self.backend.set(key, self.encode(key, value), ttl)
+    
+    async def delete(self, key: str) -> None:
+        await self.backend.delete(key)
+    
+    async def clear(self) -> None:
+        await self.backend.clear()
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        values = await self.backend.get_many(keys)
+        return {key: self.decode(key, value) for key, value in values.items()}
+    
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        await self.backend.set_many(
+            {key: self.encode(key, value) for key, value in items.items()},
+            ttl
+        )
+    
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        await self.backend.delete_many(keys)
+    
+    # Generations are kept by the backend, which may be shared
+    
+    async def generations(self, keys: Iterable[str]) -> Dict[str, int]:
+        return await self.backend.generations(keys)
+    
+    async def increment_generations(self, keys: Iterable[str]) -> None:
+        await self.backend.increment_generations(keys)
+    
+    async def set_many_if_current(
+        self,
+        items: Dict[str, Any],
+        generations: Dict[str, int],
+        ttl: Optional[int] = None
+    ) -> List[str]:
+        return await self.backend.set_many_if_current(
+            {key: self.encode(key, value) for key, value in items.items()},
+            generations,
+            ttl
+        )
+    
+    async def stats(self) -> Dict[str, Any]:
+        return await self.backend.stats()
+    
+    async def track_accesses(self, prefixes: Tuple[str, ...]) -> None:
+        await self.backend.track_accesses(prefixes)
+    
+    async def take_accesses(self) -> Dict[str, int]:
+        return await self.backend.take_accesses()
+    
+    # Entries are snapshotted in their encoded form
+    
+    async def snapshot(self, path: str) -> int:
+        return await self.backend.snapshot(path)
+    
+    async def restore(self, path: str) -> int:
+        return await self.backend.restore(path)
+    
+    # Administration works on the stored (encoded) entries
+    
+    async def keys(self, prefix: str = "") -> List[str]:
+        return await self.backend.keys(prefix)
+    
+    async def entries(self, prefix: str = "", limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        return await self.backend.entries(prefix, limit)
+    
+    async def pin(self, keys: Iterable[str], pinned: bool = True) -> int:
+        return await self.backend.pin(keys, pinned)
+    
+    async def export_entries(self, prefix: str = "") -> bytes:
+        return await self.backend.export_entries(prefix)
+    
+    async def import_entries(self, data: bytes) -> List[str]:
+        return await self.backend.import_entries(data)
+    
+    async def close(self) -> None:
+        await self.backend.close()
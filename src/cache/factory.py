@@ -0,0 +1,42 @@
+from src.cache.codecs import CodecCache
+from src.cache.interface import CacheInterface
+from src.cache.memory import MemoryCache
+
+
+CACHE_TYPES = ("memory", "shared", "redis")
+
+
+def create_cache(settings) -> CacheInterface:
+    """Build the configured cache backend, wrapped in the value codec layer"""
+    backend = _create_backend(settings)
+    if not settings.cache_codecs:
+        return backend
+    
+    return CodecCache(
+        backend,
+        settings.cache_codecs,
+        compression=settings.cache_compression,
+        compress_min_bytes=settings.cache_compress_min_bytes
+    )
+
+
+def _create_backend(settings) -> CacheInterface:
+    cache_type = settings.cache_type.lower()
+    
+    if cache_type == "memory":
+        return MemoryCache(settings.cache_ttl_seconds, stale_ttl=settings.cache_stale_ttl_seconds)
+    
+    if cache_type == "shared":
+        from src.cache.shared import SharedCacheClient, DEFAULT_SOCKET_PATH
+        return SharedCacheClient(settings.cache_socket_path or DEFAULT_SOCKET_PATH)
+    
+    if cache_type == "redis":
+        from src.cache.redis_cache import RedisCache
+        return RedisCache.from_url(
+            settings.cache_redis_url,
+            default_ttl=settings.cache_ttl_seconds,
+            namespace=settings.cache_redis_namespace,
+            max_connections=settings.cache_redis_max_connections
+        )
+    
+    raise ValueError(f"Unsupported cache type '{settings.cache_type}', expected one of {', '.join(CACHE_TYPES)}")
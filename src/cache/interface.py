@@ -1,8 +1,26 @@
+import asyncio
+import json
+import zlib
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
 
 
 class CacheInterface(ABC):
+    # Generations are striped over a fixed number of slots, so they stay
+    # bounded however many keys pass through the cache
+    GENERATION_STRIPES = 256
+    
+    def __init__(self):
+        self._generations = [0] * self.GENERATION_STRIPES
+        # Loads in flight per key, joined by concurrent callers
+        self._loads: Dict[str, asyncio.Future] = {}
+        # Loader errors on which get_or_load answers with an expired copy
+        # (see get_stale) instead of failing
+        self.stale_errors: Tuple[type, ...] = ()
+    
     @abstractmethod
     async def get(self, key: str) -> Optional[Any]:
         pass
@@ -18,3 +36,217 @@ class CacheInterface(ABC):
     @abstractmethod
     async def clear(self) -> None:
         pass
+    
+    async def get_stale(self, key: str) -> Optional[Any]:
+        """An expired value still kept for ``key``, for backends that keep them"""
+        return None
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Cached value as JSON bytes, ready to be sent to a client"""
+        value = await self.get(key)
+        if value is None:
+            return None
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+    
+    # Bulk operations. Networked backends override these to use a single
+    # round trip; the defaults simply loop over the single-key operations.
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        result = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+    
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+    
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            await self.delete(key)
+    
+    async def close(self) -> None:
+        pass
+    
+    # Loads and invalidation. A load records the key's generation before it
+    # fetches and only stores its result if no invalidation happened in the
+    # meantime, so a slow reader cannot put back data a writer just replaced.
+    # The generations live where the entries do: backends shared between
+    # processes override generations, increment_generations and
+    # set_many_if_current to keep them in the store and compare atomically.
+    
+    def _stripe(self, key: str) -> int:
+        # Stable across processes, unlike hash()
+        return zlib.crc32(key.encode("utf-8")) % self.GENERATION_STRIPES
+    
+    async def generations(self, keys: Iterable[str]) -> Dict[str, int]:
+        return {key: self._generations[self._stripe(key)] for key in keys}
+    
+    async def increment_generations(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._generations[self._stripe(key)] += 1
+    
+    async def set_many_if_current(
+        self,
+        items: Dict[str, Any],
+        generations: Dict[str, int],
+        ttl: Optional[int] = None
+    ) -> List[str]:
+        """Store the items whose generation is still the given one; returns their keys"""
+        current_generations = await self.generations(items)
+        current = {key: value for key, value in items.items() if current_generations[key] == generations[key]}
+        if current:
+            await self.set_many(current, ttl)
+        return list(current)
+    
+    async def generation(self, key: str) -> int:
+        return (await self.generations([key]))[key]
+    
+    async def bump_generations(self, keys: Iterable[str]) -> None:
+        """Loads of ``keys`` already in flight will not be stored, and new callers start new loads"""
+        keys = list(keys)
+        for key in keys:
+            self._loads.pop(key, None)
+        await self.increment_generations(keys)
+    
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        """Delete keys after a write; loads of them already in flight will not be stored"""
+        keys = list(keys)
+        await self.bump_generations(keys)
+        await self.delete_many(keys)
+    
+    async def set_if_unchanged(self, key: str, value: Any, generation: int, ttl: Optional[int] = None) -> bool:
+        return bool(await self.set_many_if_current({key: value}, {key: generation}, ttl))
+    
+    async def set_many_if_unchanged(
+        self,
+        items: Dict[str, Any],
+        generations: Dict[str, int],
+        ttl: Optional[int] = None
+    ) -> None:
+        if items:
+            await self.set_many_if_current(items, generations, ttl)
+    
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """Cached value for ``key``, or the result of ``loader()`` stored under it.
+        
+        Concurrent callers for the same key wait for one load instead of each
+        calling the loader; callers after an invalidation start a new one. A
+        result that raced an invalidation is returned but not stored. If the
+        loader fails with one of ``stale_errors`` and an expired copy is
+        still kept, that copy is returned instead.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        
+        load = self._loads.get(key)
+        if load is None:
+            load = self._loads[key] = asyncio.ensure_future(self._run_load(key, loader, ttl))
+            load.add_done_callback(lambda done: self._load_done(key, done))
+        # A caller that is cancelled does not cancel the load others wait for
+        return await asyncio.shield(load)
+    
+    def _load_done(self, key: str, load: asyncio.Future) -> None:
+        if self._loads.get(key) is load:
+            del self._loads[key]
+        # Retrieved here, so a load nobody waits for any more logs no unretrieved error
+        if not load.cancelled():
+            load.exception()
+    
+    async def _run_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int]) -> Any:
+        # Another load may have stored the value since the caller's miss
+        value = await self.get(key)
+        if value is not None:
+            return value
+        
+        generation = await self.generation(key)
+        try:
+            value = await loader()
+        except self.stale_errors as e:
+            stale = await self.get_stale(key)
+            if stale is None:
+                raise
+            logger.warning("cache_served_stale", key=key, error=str(e))
+            return stale
+        await self.set_if_unchanged(key, value, generation, ttl)
+        return value
+    
+    async def get_or_load_raw(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> bytes:
+        """As ``get_or_load``, as JSON bytes (see ``get_raw``)"""
+        cached = await self.get_raw(key)
+        if cached is not None:
+            return cached
+        value = await self.get_or_load(key, loader, ttl)
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+    
+    async def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, for backends that keep them"""
+        return {}
+    
+    async def track_accesses(self, prefixes: Tuple[str, ...]) -> None:
+        """Count hits on keys with these prefixes (none: stop counting), for backends that can"""
+        pass
+    
+    async def take_accesses(self) -> Dict[str, int]:
+        """Hits per tracked key since the previous call, for backends that count them"""
+        return {}
+    
+    # Snapshots let a restarted process start warm. Only the in-process
+    # backend needs them; the shared daemon and Redis outlive the server.
+    
+    async def snapshot(self, path: str) -> int:
+        """Write unexpired entries to ``path``; returns how many were written"""
+        return 0
+    
+    async def restore(self, path: str) -> int:
+        """Load entries from a snapshot; returns how many were restored"""
+        return 0
+    
+    
+    # Administration (listing, pins, export and import); every backend here
+    # implements it, the defaults are for other implementations
+    
+    def _not_supported(self) -> NotImplementedError:
+        return NotImplementedError(f"{type(self).__name__} does not support cache administration")
+    
+    async def keys(self, prefix: str = "") -> List[str]:
+        """All stored keys starting with ``prefix``, expired ones not yet removed included"""
+        raise self._not_supported()
+    
+    async def entries(self, prefix: str = "", limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        """``{key, bytes, ttl, pinned}`` per key, in key order, at most ``limit`` (None: all).
+        
+        ttl is None for entries that do not expire, negative for expired
+        entries kept to be served stale.
+        """
+        raise self._not_supported()
+    
+    async def pin(self, keys: Iterable[str], pinned: bool = True) -> int:
+        """Exempt keys from expiry (or undo it); returns how many changed"""
+        raise self._not_supported()
+    
+    async def export_entries(self, prefix: str = "") -> bytes:
+        """Unexpired entries starting with ``prefix``, in snapshot format"""
+        raise self._not_supported()
+    
+    async def import_entries(self, data: bytes) -> List[str]:
+        """Store exported entries, replacing existing ones; returns the keys stored"""
+        raise self._not_supported()
+
+
+def hit_ratio(hits: int, misses: int) -> Optional[float]:
+    lookups = hits + misses
+    return round(hits / lookups, 4) if lookups else None
@@ -1,28 +1,57 @@
+import asyncio
+import os
 import time
-from typing import Any, Optional, Dict
-from src.cache.interface import CacheInterface
+from typing import Any, Optional, Dict, Iterable, List, Set, Tuple
+from src.cache import serialization
+from src.cache.interface import CacheInterface, hit_ratio
+from src.cache.snapshot import Entry, decode_entries, encode_entries, read_snapshot, write_snapshot
 import structlog
 
 logger = structlog.get_logger()
 
 
 class MemoryCache(CacheInterface):
-    def __init__(self, default_ttl: int = 300):
+    def __init__(self, default_ttl: int = 300, stale_ttl: int = 0):
+        super().__init__()
         self.default_ttl = default_ttl
+        # Expired entries are kept this much longer for get_stale
+        self.stale_ttl = stale_ttl
         self._cache: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        # Reads (hits and misses) per key since the last take_accesses(), for the refresh
+        # scheduler; only keys under track_accesses() prefixes are counted
+        self._access_prefixes: Tuple[str, ...] = ()
+        self._accesses: Dict[str, int] = {}
+        # Pinned keys never expire; the pin outlives deletes, so a reloaded value is pinned too
+        self._pinned: Set[str] = set()
     
     async def get(self, key: str) -> Optional[Any]:
+        if self._access_prefixes and key.startswith(self._access_prefixes):
+            self._accesses[key] = self._accesses.get(key, 0) + 1
         if key not in self._cache:
+            self.misses += 1
             return None
         
         entry = self._cache[key]
-        if entry["expires_at"] and time.time() > entry["expires_at"]:
-            del self._cache[key]
+        if entry["expires_at"] and time.time() > entry["expires_at"] and key not in self._pinned:
+            if time.time() > entry["expires_at"] + self.stale_ttl:
+                del self._cache[key]
+            self.misses += 1
             return None
         
+        self.hits += 1
         logger.debug("cache_hit", key=key)
         return entry["value"]
     
+    async def get_stale(self, key: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] and time.time() > entry["expires_at"] + self.stale_ttl:
+            return None
+        return entry["value"]
+    
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         ttl = ttl or self.default_ttl
         expires_at = time.time() + ttl if ttl > 0 else None
@@ -40,4 +69,108 @@ class MemoryCache(CacheInterface):
     
     async def clear(self) -> None:
         self._cache.clear()
+        self._pinned.clear()
         logger.info("cache_cleared")
+    
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": hit_ratio(self.hits, self.misses),
+            "entries": len(self._cache)
+        }
+    
+    async def track_accesses(self, prefixes: Tuple[str, ...]) -> None:
+        self._access_prefixes = tuple(prefixes)
+        self._accesses = {}
+    
+    async def take_accesses(self) -> Dict[str, int]:
+        accesses, self._accesses = self._accesses, {}
+        return accesses
+    
+    def _live_entries(self, prefix: str = "") -> List[Entry]:
+        now = time.time()
+        entries = []
+        for key, entry in self._cache.items():
+            expires_at = entry["expires_at"]
+            if not key.startswith(prefix):
+                continue
+            if key in self._pinned and expires_at:
+                # Pins are not part of the format; a pinned entry gets at least a fresh TTL
+                expires_at = max(expires_at, now + self.default_ttl)
+            if not expires_at or expires_at > now:
+                entries.append((key, expires_at, entry["value"]))
+        return entries
+    
+    def _load(self, entries: List[Entry], replace: bool = False) -> List[str]:
+        """Store unexpired entries; returns the keys stored"""
+        now = time.time()
+        loaded = []
+        for key, expires_at, value in entries:
+            if expires_at and expires_at <= now:
+                continue
+            if key in self._cache and not replace:
+                continue
+            self._cache[key] = {"value": value, "expires_at": expires_at}
+            loaded.append(key)
+        return loaded
+    
+    async def snapshot(self, path: str) -> int:
+        entries = self._live_entries()
+        await asyncio.to_thread(write_snapshot, path, entries)
+        logger.info("cache_snapshot_written", path=path, entries=len(entries))
+        return len(entries)
+    
+    async def restore(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        
+        entries = await asyncio.to_thread(read_snapshot, path)
+        # Entries keep their original expiry; anything already set here is newer
+        restored = len(self._load(entries))
+        logger.info("cache_snapshot_restored", path=path, entries=restored)
+        return restored
+    
+    # Administration
+    
+    async def keys(self, prefix: str = "") -> List[str]:
+        return [key for key in self._cache if key.startswith(prefix)]
+    
+    async def entries(self, prefix: str = "", limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        now = time.time()
+        for key in [key for key in self._cache if key.startswith(prefix)]:
+            # Expired entries past the stale window are dropped rather than listed
+            expires_at = self._cache[key]["expires_at"]
+            if expires_at and now > expires_at + self.stale_ttl and key not in self._pinned:
+                del self._cache[key]
+        
+        result = []
+        for key in sorted(key for key in self._cache if key.startswith(prefix))[:limit]:
+            entry = self._cache[key]
+            value = entry["value"]
+            pinned = key in self._pinned
+            result.append({
+                "key": key,
+                "bytes": len(value) if isinstance(value, bytes) else len(serialization.dumps(value)),
+                "ttl": None if pinned or not entry["expires_at"] else round(entry["expires_at"] - now, 1),
+                "pinned": pinned
+            })
+        return result
+    
+    async def pin(self, keys: Iterable[str], pinned: bool = True) -> int:
+        changed = 0
+        for key in keys:
+            if pinned and key not in self._pinned:
+                self._pinned.add(key)
+                changed += 1
+            elif not pinned and key in self._pinned:
+                self._pinned.discard(key)
+                changed += 1
+        return changed
+    
+    async def export_entries(self, prefix: str = "") -> bytes:
+        return await asyncio.to_thread(encode_entries, self._live_entries(prefix))
+    
+    async def import_entries(self, data: bytes) -> List[str]:
+        entries = await asyncio.to_thread(decode_entries, data)
+        return self._load(entries, replace=True)
@@ -0,0 +1,269 @@
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+import structlog
+from src.cache import serialization
+from src.cache.interface import CacheInterface, hit_ratio
+from src.cache.snapshot import decode_entries, encode_entries
+
+try:
+    from redis import asyncio as aioredis
+    from redis.exceptions import WatchError
+except ImportError:  # optional dependency, see the "redis" extra in pyproject.toml
+    aioredis = None
+    WatchError = None
+
+logger = structlog.get_logger()
+
+
+class RedisCache(CacheInterface):
+    """
+    Cache backend for any server speaking the Redis protocol.
+
+    All keys are prefixed with a namespace so that several replicas (and other
+    applications) can share one Redis instance. Values are stored with the
+    tagged encoding from ``src.cache.serialization``: bytes as they are
+    (which includes the entries the codec layer already encoded, see
+    CACHE_CODECS), anything else as JSON text.
+
+    Administration works on the namespace through SCAN. A pin removes the
+    key's expiry (PERSIST), so it lasts until the key is written again.
+
+    Generations are counters in Redis too (one key per stripe, outside the
+    namespace), so every replica sees every invalidation. Conditional
+    stores WATCH the counters they depend on: an invalidation between the
+    check and the write aborts the write.
+    """
+    
+    # Attempts of a conditional store whose transaction was aborted
+    WATCH_ATTEMPTS = 3
+    
+    def __init__(self, client: Any, default_ttl: int = 300, namespace: str = "planner-mcp:"):
+        super().__init__()
+        # ``client`` is a redis.asyncio.Redis or a compatible stand-in such as
+        # fakeredis.aioredis.FakeRedis
+        self.client = client
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+    
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        default_ttl: int = 300,
+        namespace: str = "planner-mcp:",
+        max_connections: int = 20
+    ) -> "RedisCache":
+        if aioredis is None:
+            raise ImportError(
+                "The redis cache backend requires the 'redis' package: "
+                "pip install 'planner-mcp-server[redis]'"
+            )
+        
+        pool = aioredis.ConnectionPool.from_url(url, max_connections=max_connections)
+        return cls(aioredis.Redis(connection_pool=pool), default_ttl, namespace)
+    
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+    
+    def _generation_key(self, key: str) -> str:
+        return f"generations:{self.namespace}{self._stripe(key)}"
+    
+    def _set_command(self, pipe: Any, key: str, value: Any, ttl: Optional[int]) -> None:
+        ttl = ttl or self.default_ttl
+        if ttl > 0:
+            pipe.set(self._key(key), serialization.dumps(value), ex=ttl)
+        else:
+            pipe.set(self._key(key), serialization.dumps(value))
+    
+    async def _scan(self, prefix: str = "") -> AsyncIterator[str]:
+        """Keys of this namespace starting with ``prefix``, without the namespace"""
+        # Glob characters in the namespace or prefix must match literally
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", self._key(prefix)) + "*"
+        async for redis_key in self.client.scan_iter(match=pattern, count=500):
+            if isinstance(redis_key, bytes):
+                redis_key = redis_key.decode("utf-8")
+            yield redis_key[len(self.namespace):]
+    
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self.client.get(self._key(key))
+        if data is None:
+            return None
+        
+        logger.debug("cache_hit", key=key)
+        return serialization.loads(data)
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = ttl or self.default_ttl
+        payload = serialization.dumps(value)
+        
+        if ttl > 0:
+            await self.client.set(self._key(key), payload, ex=ttl)
+        else:
+            await self.client.set(self._key(key), payload)
+        logger.debug("cache_set", key=key, ttl=ttl)
+    
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+        logger.debug("cache_delete", key=key)
+    
+    async def clear(self) -> None:
+        # Only remove this server's keys, the instance may be shared
+        deleted = 0
+        batch = []
+        async for redis_key in self.client.scan_iter(match=f"{self.namespace}*", count=500):
+            batch.append(redis_key)
+            if len(batch) >= 500:
+                deleted += await self.client.delete(*batch)
+                batch = []
+        if batch:
+            deleted += await self.client.delete(*batch)
+        logger.info("cache_cleared", keys=deleted)
+    
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        
+        values = await self.client.mget([self._key(key) for key in keys])
+        return {
+            key: serialization.loads(data)
+            for key, data in zip(keys, values)
+            if data is not None
+        }
+    
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        if not items:
+            return
+        
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                self._set_command(pipe, key, value, ttl)
+            await pipe.execute()
+        logger.debug("cache_set_many", keys=len(items), ttl=ttl or self.default_ttl)
+    
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        redis_keys = [self._key(key) for key in keys]
+        if redis_keys:
+            await self.client.delete(*redis_keys)
+    
+    async def generations(self, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self.client.mget([self._generation_key(key) for key in keys])
+        return {key: int(value or 0) for key, value in zip(keys, values)}
+    
+    async def increment_generations(self, keys: Iterable[str]) -> None:
+        generation_keys = {self._generation_key(key) for key in keys}
+        if not generation_keys:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for generation_key in generation_keys:
+                pipe.incr(generation_key)
+            await pipe.execute()
+    
+    async def set_many_if_current(
+        self,
+        items: Dict[str, Any],
+        generations: Dict[str, int],
+        ttl: Optional[int] = None
+    ) -> List[str]:
+        keys = list(items)
+        generation_keys = [self._generation_key(key) for key in keys]
+        for _ in range(self.WATCH_ATTEMPTS):
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(*set(generation_keys))
+                    values = await pipe.mget(generation_keys)
+                    current = [key for key, value in zip(keys, values) if int(value or 0) == generations[key]]
+                    if not current:
+                        return []
+                    pipe.multi()
+                    for key in current:
+                        self._set_command(pipe, key, items[key], ttl)
+                    await pipe.execute()
+                    return current
+                except WatchError:
+                    # A generation changed meanwhile; check again which are still current
+                    continue
+        return []
+    
+    async def stats(self) -> Dict[str, Any]:
+        # Redis counts keyspace hits per server, not per namespace
+        info = await self.client.info("stats")
+        hits, misses = info.get("keyspace_hits", 0), info.get("keyspace_misses", 0)
+        return {"hits": hits, "misses": misses, "hit_ratio": hit_ratio(hits, misses)}
+    
+    async def keys(self, prefix: str = "") -> List[str]:
+        return sorted([key async for key in self._scan(prefix)])
+    
+    async def entries(self, prefix: str = "", limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        keys = (await self.keys(prefix))[:limit]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.strlen(self._key(key))
+                pipe.pttl(self._key(key))
+            replies = await pipe.execute()
+        
+        result = []
+        for key, size, pttl in zip(keys, replies[0::2], replies[1::2]):
+            if pttl == -2:
+                # Expired or deleted since the scan
+                continue
+            result.append({
+                "key": key,
+                "bytes": size,
+                "ttl": None if pttl < 0 else round(pttl / 1000, 1),
+                "pinned": pttl == -1
+            })
+        return result
+    
+    async def pin(self, keys: Iterable[str], pinned: bool = True) -> int:
+        keys = list(keys)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                if pinned:
+                    pipe.persist(self._key(key))
+                else:
+                    # Only keys without an expiry get one again
+                    pipe.expire(self._key(key), self.default_ttl, nx=True)
+            replies = await pipe.execute()
+        return sum(1 for reply in replies if reply)
+    
+    async def export_entries(self, prefix: str = "") -> bytes:
+        keys = await self.keys(prefix)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(self._key(key))
+                pipe.pttl(self._key(key))
+            replies = await pipe.execute()
+        
+        now = time.time()
+        entries = [
+            (key, now + pttl / 1000 if pttl >= 0 else None, serialization.loads(data))
+            for key, data, pttl in zip(keys, replies[0::2], replies[1::2])
+            if data is not None
+        ]
+        return await asyncio.to_thread(encode_entries, entries)
+    
+    async def import_entries(self, data: bytes) -> List[str]:
+        entries = await asyncio.to_thread(decode_entries, data)
+        now = time.time()
+        stored = []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, expires_at, value in entries:
+                if expires_at and expires_at <= now:
+                    continue
+                payload = serialization.dumps(value)
+                if expires_at:
+                    pipe.set(self._key(key), payload, px=max(1, int((expires_at - now) * 1000)))
+                else:
+                    pipe.set(self._key(key), payload)
+                stored.append(key)
+            await pipe.execute()
+        return stored
+    
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,22 @@
+import json
+from typing import Any
+
+# One-byte tag in front of every payload so raw bytes values (already encoded
+# responses) round-trip without being wrapped in JSON.
+_JSON_TAG = b"j"
+_BYTES_TAG = b"b"
+
+
+def dumps(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _BYTES_TAG + bytes(value)
+    return _JSON_TAG + json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    tag, payload = data[:1], data[1:]
+    if tag == _BYTES_TAG:
+        return bytes(payload)
+    if tag == _JSON_TAG:
+        return json.loads(payload)
+    raise ValueError(f"Unknown cache value encoding: {tag!r}")
@@ -0,0 +1,237 @@
+"""
+Shared out-of-process cache.
+
+A small daemon owns a single MemoryCache and serves it over a Unix socket so
+that several HTTP worker processes see the same cache entries. Run it
+standalone with ``python -m src.cache.shared`` or let
+``src.http_test_server`` spawn it when ``HTTP_WORKERS`` is greater than one.
+"""
+
+import asyncio
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import structlog
+from src.cache import serialization
+from src.cache.interface import CacheInterface
+from src.cache.memory import MemoryCache
+
+logger = structlog.get_logger()
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "planner-mcp-cache.sock")
+
+_LENGTH = struct.Struct(">I")
+
+
+class SharedCacheError(Exception):
+    pass
+
+
+async def _write_message(writer: asyncio.StreamWriter, items: List[Any]) -> None:
+    parts = [_LENGTH.pack(len(items))]
+    for item in items:
+        payload = serialization.dumps(item)
+        parts.append(_LENGTH.pack(len(payload)))
+        parts.append(payload)
+    writer.write(b"".join(parts))
+    await writer.drain()
+
+
+async def _read_message(reader: asyncio.StreamReader) -> List[Any]:
+    (count,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    items = []
+    for _ in range(count):
+        (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+        items.append(serialization.loads(await reader.readexactly(size)))
+    return items
+
+
+class SharedCacheServer:
+    OPERATIONS = (
+        "get", "set", "delete", "clear", "stats",
+        "keys", "entries", "pin", "export_entries", "import_entries",
+        "track_accesses", "take_accesses",
+        "generations", "increment_generations", "set_many_if_current"
+    )
+    
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, default_ttl: int = 300):
+        self.socket_path = socket_path
+        self.cache = MemoryCache(default_ttl)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+    
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection,
+            path=self.socket_path
+        )
+        # Only processes running as the same user may talk to the cache
+        os.chmod(self.socket_path, 0o600)
+        logger.info("shared_cache_listening", socket_path=self.socket_path)
+    
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+    
+    async def _set_many_if_current(self, keys: List[str], generations: List[int], ttl: Optional[int], *values: Any) -> List[str]:
+        # Values travel as separate message items, so bytes values keep their tag
+        return await self.cache.set_many_if_current(dict(zip(keys, values)), dict(zip(keys, generations)), ttl)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    op, *args = await _read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                
+                if op not in self.OPERATIONS:
+                    await _write_message(writer, [False, f"Unsupported cache operation: {op}"])
+                    continue
+                
+                try:
+                    handler = getattr(self, f"_{op}", None) or getattr(self.cache, op)
+                    result = await handler(*args)
+                except Exception as e:
+                    logger.error("shared_cache_operation_failed", op=op, error=str(e))
+                    await _write_message(writer, [False, str(e)])
+                    continue
+                
+                await _write_message(writer, [True, result])
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+
+class SharedCacheClient(CacheInterface):
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, pool_size: int = 8):
+        super().__init__()
+        self.socket_path = socket_path
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+    
+    async def _call(self, op: str, *args: Any) -> Any:
+        async with self._slots:
+            for attempt in range(2):
+                reused = bool(self._idle)
+                if reused:
+                    reader, writer = self._idle.pop()
+                else:
+                    reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                
+                try:
+                    await _write_message(writer, [op, *args])
+                    ok, result = await _read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    writer.close()
+                    # Pooled connections are dropped when the daemon restarts;
+                    # discard them all and retry once on a fresh connection.
+                    if reused and attempt == 0:
+                        await self.close()
+                        continue
+                    raise
+                
+                self._idle.append((reader, writer))
+                break
+        
+        if not ok:
+            raise SharedCacheError(result)
+        return result
+    
+    async def get(self, key: str) -> Optional[Any]:
+        return await self._call("get", key)
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self._call("set", key, value, ttl)
+    
+    async def delete(self, key: str) -> None:
+        await self._call("delete", key)
+    
+    async def clear(self) -> None:
+        await self._call("clear")
+    
+    async def stats(self) -> Dict[str, Any]:
+        # Counted by the daemon, so they cover every worker
+        return await self._call("stats")
+    
+    # Kept by the daemon, which handles one operation at a time, so a
+    # worker's invalidation stops the loads of every worker and the check
+    # and store of set_many_if_current cannot interleave with it
+    
+    async def generations(self, keys: Iterable[str]) -> Dict[str, int]:
+        return await self._call("generations", list(keys))
+    
+    async def increment_generations(self, keys: Iterable[str]) -> None:
+        await self._call("increment_generations", list(keys))
+    
+    async def set_many_if_current(
+        self,
+        items: Dict[str, Any],
+        generations: Dict[str, int],
+        ttl: Optional[int] = None
+    ) -> List[str]:
+        keys = list(items)
+        return await self._call(
+            "set_many_if_current",
+            keys,
+            [generations[key] for key in keys],
+            ttl,
+            *(items[key] for key in keys)
+        )
+    
+    # Counted by the daemon, so the refresh scheduler sees every worker's reads
+    
+    async def track_accesses(self, prefixes: Tuple[str, ...]) -> None:
+        await self._call("track_accesses", list(prefixes))
+    
+    async def take_accesses(self) -> Dict[str, int]:
+        return await self._call("take_accesses")
+    
+    async def keys(self, prefix: str = "") -> List[str]:
+        return await self._call("keys", prefix)
+    
+    async def entries(self, prefix: str = "", limit: Optional[int] = 1000) -> List[Dict[str, Any]]:
+        return await self._call("entries", prefix, limit)
+    
+    async def pin(self, keys: Iterable[str], pinned: bool = True) -> int:
+        return await self._call("pin", list(keys), pinned)
+    
+    async def export_entries(self, prefix: str = "") -> bytes:
+        return await self._call("export_entries", prefix)
+    
+    async def import_entries(self, data: bytes) -> List[str]:
+        return await self._call("import_entries", data)
+    
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def run_cache_daemon(socket_path: str = DEFAULT_SOCKET_PATH, default_ttl: int = 300) -> None:
+    asyncio.run(SharedCacheServer(socket_path, default_ttl).serve_forever())
+
+
+if __name__ == "__main__":
+    from src.config import Settings
+    from src.utils.logger import configure_logging
+    
+    settings = Settings()
+    configure_logging(settings.log_level, settings.log_format)
+    run_cache_daemon(settings.cache_socket_path or DEFAULT_SOCKET_PATH, settings.cache_ttl_seconds)
@@ -0,0 +1,72 @@
+import os
+import struct
+from typing import Any, List, Optional, Tuple
+from src.cache import serialization
+
+# File layout: magic, then one record per entry:
+#   key length (4 bytes), key, expiry (8 byte float, 0 = none),
+#   value length (4 bytes), value (src.cache.serialization encoding)
+_MAGIC = b"PMCSNAP1"
+_LENGTH = struct.Struct(">I")
+_EXPIRY = struct.Struct(">d")
+
+Entry = Tuple[str, Optional[float], Any]
+
+
+def encode_entries(entries: List[Entry]) -> bytes:
+    """Entries in snapshot format, e.g. for a cache export"""
+    parts = [_MAGIC]
+    for key, expires_at, value in entries:
+        key_bytes = key.encode("utf-8")
+        payload = serialization.dumps(value)
+        parts.append(_LENGTH.pack(len(key_bytes)))
+        parts.append(key_bytes)
+        parts.append(_EXPIRY.pack(expires_at or 0.0))
+        parts.append(_LENGTH.pack(len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def decode_entries(data: bytes, source: str = "data") -> List[Entry]:
+    if not data.startswith(_MAGIC):
+        raise ValueError(f"{source} is not a cache snapshot")
+    
+    entries: List[Entry] = []
+    offset = len(_MAGIC)
+    try:
+        while offset < len(data):
+            (key_length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            key = data[offset:offset + key_length].decode("utf-8")
+            offset += key_length
+            (expires_at,) = _EXPIRY.unpack_from(data, offset)
+            offset += _EXPIRY.size
+            (value_length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            if offset + value_length > len(data):
+                raise ValueError(f"{source} is truncated")
+            value = serialization.loads(data[offset:offset + value_length])
+            offset += value_length
+            entries.append((key, expires_at or None, value))
+    except struct.error:
+        raise ValueError(f"{source} is truncated")
+    return entries
+
+
+def write_snapshot(path: str, entries: List[Entry]) -> None:
+    """Write entries to ``path``, replacing it atomically"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    # Cached plans are tenant data, so the file is private to the service user
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(encode_entries(entries))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> List[Entry]:
+    with open(path, "rb") as f:
+        return decode_entries(f.read(), path)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -24,12 +24,92 @@ class Settings(BaseSettings):
     mcp_server_version: str = "1.0.0"
     mcp_server_host: str = "0.0.0.0"
     mcp_server_port: int = 8080
+    http_workers: int = 1
+    http_compress_min_bytes: int = 1024  # Responses at least this large are gzip/br compressed
     
     graph_api_version: str = "v1.0"
     graph_api_timeout: int = 30
+    # Consecutive failures (5xx, timeouts) that open an endpoint class's circuit; 0 disables
+    graph_breaker_threshold: int = 5
+    graph_breaker_reset_seconds: int = 30
+    # Send idempotent GETs a second time once they run past the class's p95 latency
+    graph_hedge_reads: bool = False
+    graph_hedge_min_delay_ms: int = 100
+    # Decode collection pages (tasks, buckets, plans) while they download, so
+    # large pages are never held in memory whole
+    graph_stream_pages: bool = False
     
-    cache_type: str = "memory"
+    cache_type: str = "memory"  # memory, shared or redis
     cache_ttl_seconds: int = 300
+    cache_socket_path: str = ""  # Unix socket of the shared cache daemon (src.cache.shared)
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_redis_namespace: str = "planner-mcp:"
+    cache_redis_max_connections: int = 20
+    # Key prefix -> codec (json or msgpack); matching entries are stored as
+    # bytes and compressed once they reach cache_compress_min_bytes
+    cache_codecs: Dict[str, str] = {
+        "plan:": "json",
+        "plan_tasks:": "json",
+        "plan_buckets:": "json",
+        "plan_board:": "json",
+        "group_plans:": "json"
+    }
+    cache_compression: str = "zlib"  # none, zlib or zstd
+    cache_compress_min_bytes: int = 16384
+    # Memory cache contents are saved here on shutdown and restored on startup; empty disables
+    cache_snapshot_path: str = ""
+    # Expired memory cache entries are kept this long and served while Graph is unavailable; 0 disables
+    cache_stale_ttl_seconds: int = 0
+    
+    # Warmed in the background at startup (JSON lists); group IDs add all of the group's plans
+    preload_plan_ids: List[str] = []
+    preload_group_ids: List[str] = []
+    preload_concurrency: int = 4
+    preload_blocking: bool = False  # Finish the preload before serving requests
+    
+    # Background refresh of the most read plans (memory cache backend); both
+    # intervals are capped at 80% of cache_ttl_seconds
+    refresh_enabled: bool = False
+    refresh_min_interval_seconds: int = 30
+    refresh_max_interval_seconds: int = 240
+    refresh_max_plans: int = 20
+    refresh_budget_per_minute: int = 60  # Graph requests the scheduler may spend
+    
+    # Plans whose task indexes (bucket, assignee, due, state) are kept in memory
+    task_index_max_plans: int = 256
+    # Tasks per page of the paged task listing; a client may ask for up to the max
+    task_page_size: int = 100
+    task_page_max_size: int = 1000
+    
+    # Bulk export (POST /export): plans fetched at once, and Graph pages buffered per plan
+    export_concurrency: int = 4
+    export_buffer_pages: int = 4
+    
+    # Resolved user names (task assignees); needs User.ReadBasic.All
+    user_directory_ttl_seconds: int = 86400
+    user_directory_max_users: int = 10000
+    
+    # Idempotent creates: attempts per create, and how long keys are remembered;
+    # with a ledger path pending creates survive restarts
+    create_max_attempts: int = 3
+    create_ledger_ttl_seconds: int = 86400
+    create_ledger_path: str = ""
+    
+    # Coalescing window for task updates (write-behind); 0 writes each update immediately
+    task_write_behind_ms: int = 0
+    
+    # Cross-plan rollups: Graph requests in flight, plans per $batch request
+    aggregation_max_concurrency: int = 8
+    aggregation_batch_size: int = 20
+    
+    # /admin/cache routes of the HTTP test server (list, purge, pin, export,
+    # import); off by default, as they change the cache without authentication
+    cache_admin_enabled: bool = False
+    
+    # Profiling and memory diagnostics (admin routes, diagnostics tool); the
+    # loop watchdog reports calls that block the event loop longer than the threshold
+    diagnostics_enabled: bool = False
+    diagnostics_block_threshold_ms: int = 100
     
     log_level: str = "INFO"
     log_format: str = "json"
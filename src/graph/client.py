@@ -1,34 +1,93 @@
+import asyncio
+import time
 import httpx
-from typing import Dict, List, Any, Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import Dict, List, Any, Optional, Tuple, Union, AsyncIterator
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 import structlog
-from src.graph.models import PlannerTask, PlannerPlan, PlannerBucket
+from src.graph.models import PlannerTask, PlannerTaskDetails, PlannerPlan, PlannerBucket
 from src.graph.exceptions import (
     GraphAPIError, 
     RateLimitError, 
     NotFoundError,
-    AuthenticationError
+    AuthenticationError,
+    ConflictError,
+    ServerError,
+    CircuitOpenError
 )
+from src.graph.resilience import CircuitBreaker, LatencyTracker, endpoint_class
+from src.graph.streaming import PageDecoder
 
 logger = structlog.get_logger()
 
+# Read size when collection pages are decoded as they stream in
+STREAM_CHUNK_BYTES = 65536
+
 
 class GraphAPIClient:
     BASE_URL = "https://graph.microsoft.com/v1.0"
     
-    def __init__(self, auth_manager):
+    def __init__(
+        self,
+        auth_manager,
+        breaker_threshold: int = 5,
+        breaker_reset_seconds: float = 30,
+        hedge_reads: bool = False,
+        hedge_min_delay: float = 0.1,
+        stream_pages: bool = False
+    ):
         self.auth = auth_manager
         self.client = httpx.AsyncClient(
             timeout=30.0,
             limits=httpx.Limits(max_keepalive_connections=10)
         )
-        
+        # Monotonic time until which Graph asked us to back off (Retry-After),
+        # so background work can pause instead of adding to the throttling
+        self.rate_limited_until = 0.0
+        # Per endpoint class (see endpoint_class): a circuit breaker, and
+        # recent latencies for hedging GETs
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.hedge_reads = hedge_reads
+        self.hedge_min_delay = hedge_min_delay
+        self.hedged_requests = 0
+        # Decode collection pages while they download instead of buffering them
+        self.stream_pages = stream_pages
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+    
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.client.aclose()
     
+    def _rate_limited(self, retry_after: float, message: str) -> RateLimitError:
+        self.rate_limited_until = max(self.rate_limited_until, time.monotonic() + retry_after)
+        logger.warning("graph_rate_limited", retry_after=retry_after)
+        return RateLimitError(message, retry_after=retry_after)
+    
+    def rate_limit_remaining(self) -> float:
+        """Seconds left before Graph accepts requests again after a 429"""
+        return max(0.0, self.rate_limited_until - time.monotonic())
+    
+    def _breaker(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(self.breaker_threshold, self.breaker_reset_seconds)
+        return self._breakers[name]
+    
+    def _latency(self, name: str) -> LatencyTracker:
+        if name not in self._latencies:
+            self._latencies[name] = LatencyTracker()
+        return self._latencies[name]
+    
+    def resilience_status(self) -> Dict[str, Any]:
+        """Circuit states and latencies per endpoint class, for health checks"""
+        return {
+            "circuits": {name: breaker.to_dict() for name, breaker in self._breakers.items()},
+            "latency": {name: tracker.to_dict() for name, tracker in self._latencies.items()},
+            "hedged_requests": self.hedged_requests
+        }
+    
     def _get_headers(self) -> Dict[str, str]:
         token = self.auth.get_token()
         return {
@@ -40,6 +99,9 @@ class GraphAPIClient:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
+        # Resending the same If-Match etag cannot succeed, and an open circuit
+        # is meant to fail fast
+        retry=retry_if_not_exception_type((ConflictError, CircuitOpenError)),
         reraise=True
     )
     async def _make_request(
@@ -48,7 +110,21 @@ class GraphAPIClient:
         endpoint: str,
         **kwargs
     ) -> httpx.Response:
-        url = f"{self.BASE_URL}{endpoint}"
+        return await self._send(method, endpoint, **kwargs)
+    
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        stream: bool = False,
+        **kwargs
+    ) -> httpx.Response:
+        """A single request, without retries; for writes that are not safe to repeat blindly.
+        
+        With ``stream`` the body is not read yet; the caller must close the response.
+        """
+        # Absolute URLs are @odata.nextLink values from a previous page
+        url = endpoint if endpoint.startswith("https://") else f"{self.BASE_URL}{endpoint}"
         headers = self._get_headers()
         
         if "headers" in kwargs:
@@ -57,16 +133,21 @@ class GraphAPIClient:
         logger.debug("making_graph_request", method=method, endpoint=endpoint)
         
         try:
-            response = await self.client.request(
+            response = await self._request(
+                endpoint_class(endpoint),
+                stream,
                 method=method,
                 url=url,
                 headers=headers,
                 **kwargs
             )
+            if stream and not response.is_success:
+                # Error statuses are raised below; their bodies are not needed
+                await response.aclose()
             
             if response.status_code == 429:
                 retry_after = int(response.headers.get("Retry-After", "60"))
-                raise RateLimitError(f"Rate limited. Retry after {retry_after} seconds")
+                raise self._rate_limited(retry_after, f"Rate limited. Retry after {retry_after} seconds")
             
             if response.status_code == 401:
                 raise AuthenticationError("Authentication failed")
@@ -74,37 +155,216 @@ class GraphAPIClient:
             if response.status_code == 404:
                 raise NotFoundError(f"Resource not found: {endpoint}")
             
+            if response.status_code == 412:
+                raise ConflictError(f"Resource changed since it was read: {endpoint}")
+            
             response.raise_for_status()
             
             return response
-            
+        
         except httpx.HTTPStatusError as e:
             logger.error("graph_api_error", status=e.response.status_code)
+            if e.response.status_code >= 500:
+                raise ServerError(f"Graph API error: {e}")
             raise GraphAPIError(f"Graph API error: {e}")
         except Exception as e:
             logger.error("unexpected_error", error=str(e))
             raise
     
-    async def get_plan(self, plan_id: str) -> PlannerPlan:
-        response = await self._make_request("GET", f"/planner/plans/{plan_id}")
+    async def _request(self, name: str, stream: bool = False, **request) -> httpx.Response:
+        """Send through the endpoint class's circuit breaker; 5xx and transport errors count as failures"""
+        breaker = self._breaker(name)
+        breaker.allow(name)
+        try:
+            # Streamed responses are not hedged: the losing copy could not be closed cleanly
+            if request["method"] == "GET" and self.hedge_reads and not stream:
+                response = await self._hedged(name, **request)
+            else:
+                response = await self._timed(name, stream, **request)
+        except httpx.TransportError:
+            self._failed(name, breaker)
+            raise
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except Exception:
+            # Failed on our side without an answer from Graph; frees a half-open trial
+            breaker.abandon()
+            raise
+        
+        if response.status_code >= 500:
+            self._failed(name, breaker)
+        else:
+            breaker.record_success()
+        return response
+    
+    def _failed(self, name: str, breaker: CircuitBreaker) -> None:
+        if breaker.record_failure():
+            logger.warning("graph_circuit_opened", endpoint_class=name, seconds=breaker.reset_timeout)
+    
+    async def _timed(self, name: str, stream: bool = False, **request) -> httpx.Response:
+        started = time.monotonic()
+        try:
+            if stream:
+                return await self.client.send(self.client.build_request(**request), stream=True)
+            return await self.client.request(**request)
+        finally:
+            # Cancelled (hedged) requests count with the time they had run,
+            # so slow ones still raise the percentile
+            self._latency(name).record(time.monotonic() - started)
+    
+    async def _hedged(self, name: str, **request) -> httpx.Response:
+        """A GET sent again once it has taken longer than the class's p95; the slower copy is cancelled"""
+        p95 = self._latency(name).p95()
+        delay = max(p95, self.hedge_min_delay) if p95 is not None else None
+        
+        attempts = [asyncio.ensure_future(self._timed(name, **request))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                self.hedged_requests += 1
+                logger.debug("graph_request_hedged", endpoint_class=name, delay=round(delay, 3))
+                attempts.append(asyncio.ensure_future(self._timed(name, **request)))
+            
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Every finished attempt's outcome is read, so none is left unretrieved
+                answered = [attempt for attempt in done if attempt.exception() is None]
+                for attempt in answered:
+                    if attempt.result().status_code < 500:
+                        return attempt.result()
+                if not pending:
+                    # Both failed: report the later failure
+                    return answered[0].result() if answered else done.pop().result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+    
+    @staticmethod
+    def _query(
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """OData query parameters for a field projection and expansions"""
+        params = {}
+        if select:
+            # Expanded navigation properties must be part of the projection
+            fields = list(select) + [name for name in (expand or []) if name not in select]
+            params["$select"] = ",".join(fields)
+        if expand:
+            params["$expand"] = ",".join(expand)
+        return params
+    
+    async def iter_pages(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield the ``value`` of each page of a collection, following @odata.nextLink.
+        
+        With ``stream_pages`` the items are yielded in smaller lists, as each
+        part of a page is downloaded and decoded.
+        """
+        if self.stream_pages:
+            async for items in self._iter_pages_streamed(endpoint, params):
+                yield items
+            return
+        
+        response = await self._make_request("GET", endpoint, params=params or {})
+        while True:
+            data = response.json()
+            yield data.get("value", [])
+            
+            next_link = data.get("@odata.nextLink")
+            if not next_link:
+                return
+            # The next link already carries the original query
+            response = await self._make_request("GET", next_link)
+    
+    async def _iter_pages_streamed(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        request: Dict[str, Any] = {"params": params or {}}
+        while endpoint:
+            response = await self._make_request("GET", endpoint, stream=True, **request)
+            decoder = PageDecoder()
+            try:
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                    items = decoder.feed(chunk)
+                    if items:
+                        yield items
+                items = decoder.close()
+                if items:
+                    yield items
+            finally:
+                await response.aclose()
+            
+            # The next link already carries the original query
+            endpoint = decoder.fields.get("@odata.nextLink")
+            request = {}
+    
+    async def iter_plan_tasks(
+        self,
+        plan_id: str,
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None
+    ) -> AsyncIterator[List[PlannerTask]]:
+        """Yield a plan's tasks one Graph page at a time"""
+        async for page in self.iter_pages(f"/planner/plans/{plan_id}/tasks", self._query(select, expand)):
+            yield [PlannerTask.from_dict(t) for t in page]
+    
+    async def iter_groups(self, select: Optional[List[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield the Microsoft 365 (unified) groups visible to the app one page at a time"""
+        params = self._query(select)
+        params["$filter"] = "groupTypes/any(c:c eq 'Unified')"
+        async for page in self.iter_pages("/groups", params):
+            yield page
+    
+    async def get_plan(self, plan_id: str, select: Optional[List[str]] = None) -> PlannerPlan:
+        response = await self._make_request(
+            "GET",
+            f"/planner/plans/{plan_id}",
+            params=self._query(select)
+        )
         return PlannerPlan.from_dict(response.json())
     
-    async def get_group_plans(self, group_id: str) -> List[PlannerPlan]:
-        response = await self._make_request("GET", f"/groups/{group_id}/planner/plans")
-        data = response.json()
-        return [PlannerPlan.from_dict(p) for p in data.get("value", [])]
+    async def get_group_plans(self, group_id: str, select: Optional[List[str]] = None) -> List[PlannerPlan]:
+        plans = []
+        async for page in self.iter_pages(f"/groups/{group_id}/planner/plans", self._query(select)):
+            plans.extend(PlannerPlan.from_dict(p) for p in page)
+        return plans
     
-    async def get_task(self, task_id: str) -> PlannerTask:
-        response = await self._make_request("GET", f"/planner/tasks/{task_id}")
+    async def get_task(
+        self,
+        task_id: str,
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None
+    ) -> PlannerTask:
+        response = await self._make_request(
+            "GET",
+            f"/planner/tasks/{task_id}",
+            params=self._query(select, expand)
+        )
         return PlannerTask.from_dict(response.json())
     
-    async def get_plan_tasks(self, plan_id: str) -> List[PlannerTask]:
-        response = await self._make_request("GET", f"/planner/plans/{plan_id}/tasks")
-        data = response.json()
-        return [PlannerTask.from_dict(t) for t in data.get("value", [])]
+    async def get_plan_tasks(
+        self,
+        plan_id: str,
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None
+    ) -> List[PlannerTask]:
+        tasks = []
+        async for page in self.iter_plan_tasks(plan_id, select, expand):
+            tasks.extend(page)
+        return tasks
     
     async def create_task(self, task_data: Dict[str, Any]) -> PlannerTask:
-        response = await self._make_request(
+        # Not retried here: a create that timed out may still have been
+        # applied, so callers reconcile before trying again
+        response = await self._send(
             "POST",
             "/planner/tasks",
             json=task_data
@@ -121,8 +381,11 @@ class GraphAPIClient:
             "PATCH",
             f"/planner/tasks/{task_id}",
             json=updates,
-            headers={"If-Match": etag}
+            headers={"If-Match": etag, "Prefer": "return=representation"}
         )
+        # Without a representation Graph answers 204 No Content
+        if response.status_code == 204 or not response.content:
+            return PlannerTask(id=task_id)
         return PlannerTask.from_dict(response.json())
     
     async def delete_task(self, task_id: str, etag: str) -> bool:
@@ -133,13 +396,49 @@ class GraphAPIClient:
         )
         return response.status_code == 204
     
-    async def get_plan_buckets(self, plan_id: str) -> List[PlannerBucket]:
+    async def get_task_details(self, task_id: str) -> PlannerTaskDetails:
+        response = await self._make_request("GET", f"/planner/tasks/{task_id}/details")
+        return PlannerTaskDetails.from_dict(response.json())
+    
+    async def update_task_details(
+        self,
+        task_id: str,
+        updates: Dict[str, Any],
+        etag: str
+    ) -> PlannerTaskDetails:
         response = await self._make_request(
-            "GET",
-            f"/planner/plans/{plan_id}/buckets"
+            "PATCH",
+            f"/planner/tasks/{task_id}/details",
+            json=updates,
+            headers={"If-Match": etag, "Prefer": "return=representation"}
         )
-        data = response.json()
-        return [PlannerBucket.from_dict(b) for b in data.get("value", [])]
+        if response.status_code == 204 or not response.content:
+            return PlannerTaskDetails(id=task_id)
+        return PlannerTaskDetails.from_dict(response.json())
+    
+    async def get_plan_buckets(self, plan_id: str, select: Optional[List[str]] = None) -> List[PlannerBucket]:
+        buckets = []
+        async for page in self.iter_pages(f"/planner/plans/{plan_id}/buckets", self._query(select)):
+            buckets.extend(PlannerBucket.from_dict(b) for b in page)
+        return buckets
+    
+    async def get_directory_objects(
+        self,
+        ids: List[str],
+        types: Optional[List[str]] = None,
+        select: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Directory objects (users, groups, ...) for up to 1000 IDs in one request; unknown IDs are left out"""
+        payload: Dict[str, Any] = {"ids": ids}
+        if types:
+            payload["types"] = types
+        response = await self._make_request(
+            "POST",
+            "/directoryObjects/getByIds",
+            params=self._query(select),
+            json=payload
+        )
+        return response.json().get("value", [])
     
     async def batch_request(self, requests: List[Dict[str, Any]]) -> List[Dict]:
         batch_payload = {"requests": requests}
@@ -149,3 +448,136 @@ class GraphAPIClient:
             json=batch_payload
         )
         return response.json().get("responses", [])
+    
+    def _batch_error(self, item: Dict[str, Any], url: str) -> GraphAPIError:
+        status = item.get("status")
+        message = item.get("body", {}).get("error", {}).get("message", "")
+        if status == 429:
+            retry_after = int((item.get("headers") or {}).get("Retry-After", "60"))
+            return self._rate_limited(retry_after, f"Rate limited in batch: {url}")
+        if status == 404:
+            return NotFoundError(f"Resource not found: {url}")
+        if status == 401:
+            return AuthenticationError("Authentication failed")
+        if status == 412:
+            return ConflictError(f"Resource changed since it was read: {url}")
+        return GraphAPIError(f"Graph API error {status} for {url}: {message}")
+    
+    async def get_plans_tasks(
+        self,
+        plan_ids: List[str],
+        select: Optional[List[str]] = None
+    ) -> Dict[str, Union[List[PlannerTask], GraphAPIError]]:
+        """Tasks of up to 20 plans in a single $batch request.
+        
+        Each plan maps to its tasks, or to the error its sub-request failed with.
+        """
+        query = "&".join(f"{name}={value}" for name, value in self._query(select).items())
+        urls = [f"/planner/plans/{plan_id}/tasks" + (f"?{query}" if query else "") for plan_id in plan_ids]
+        responses = await self.batch_request([
+            {"id": str(index), "method": "GET", "url": url}
+            for index, url in enumerate(urls)
+        ])
+        
+        results: Dict[str, Union[List[PlannerTask], GraphAPIError]] = {}
+        for item in responses:
+            index = int(item["id"])
+            if item.get("status") == 200:
+                body = item.get("body", {})
+                tasks = [PlannerTask.from_dict(t) for t in body.get("value", [])]
+                # Sub-requests are paged like direct ones
+                if body.get("@odata.nextLink"):
+                    try:
+                        async for page in self.iter_pages(body["@odata.nextLink"]):
+                            tasks.extend(PlannerTask.from_dict(t) for t in page)
+                    except GraphAPIError as e:
+                        results[plan_ids[index]] = e
+                        continue
+                results[plan_ids[index]] = tasks
+            else:
+                results[plan_ids[index]] = self._batch_error(item, urls[index])
+        return results
+    
+    async def get_tasks(
+        self,
+        task_ids: List[str],
+        select: Optional[List[str]] = None
+    ) -> Dict[str, Union[PlannerTask, GraphAPIError]]:
+        """Up to 20 tasks in a single $batch request.
+        
+        Each task maps to its current state, or to the error its sub-request failed with.
+        """
+        query = "&".join(f"{name}={value}" for name, value in self._query(select).items())
+        urls = [f"/planner/tasks/{task_id}" + (f"?{query}" if query else "") for task_id in task_ids]
+        responses = await self.batch_request([
+            {"id": str(index), "method": "GET", "url": url}
+            for index, url in enumerate(urls)
+        ])
+        
+        results: Dict[str, Union[PlannerTask, GraphAPIError]] = {}
+        for item in responses:
+            index = int(item["id"])
+            if item.get("status") == 200:
+                results[task_ids[index]] = PlannerTask.from_dict(item.get("body", {}))
+            else:
+                results[task_ids[index]] = self._batch_error(item, urls[index])
+        return results
+    
+    async def get_tasks_details(
+        self,
+        task_ids: List[str]
+    ) -> Dict[str, Union[PlannerTaskDetails, GraphAPIError]]:
+        """Details of up to 20 tasks in a single $batch request.
+        
+        Each task maps to its details, or to the error its sub-request failed with.
+        """
+        urls = [f"/planner/tasks/{task_id}/details" for task_id in task_ids]
+        responses = await self.batch_request([
+            {"id": str(index), "method": "GET", "url": url}
+            for index, url in enumerate(urls)
+        ])
+        
+        results: Dict[str, Union[PlannerTaskDetails, GraphAPIError]] = {}
+        for item in responses:
+            index = int(item["id"])
+            if item.get("status") == 200:
+                results[task_ids[index]] = PlannerTaskDetails.from_dict(item.get("body", {}))
+            else:
+                results[task_ids[index]] = self._batch_error(item, urls[index])
+        return results
+    
+    async def update_tasks(
+        self,
+        updates: Dict[str, Tuple[Dict[str, Any], str]]
+    ) -> Dict[str, Union[PlannerTask, GraphAPIError]]:
+        """PATCH up to 20 tasks in a single $batch request.
+        
+        ``updates`` maps task IDs to ``(changes, etag)``. Each task maps to its
+        new state, or to the error its sub-request failed with.
+        """
+        task_ids = list(updates)
+        urls = [f"/planner/tasks/{task_id}" for task_id in task_ids]
+        responses = await self.batch_request([
+            {
+                "id": str(index),
+                "method": "PATCH",
+                "url": url,
+                "headers": {
+                    "Content-Type": "application/json",
+                    "If-Match": updates[task_ids[index]][1],
+                    "Prefer": "return=representation"
+                },
+                "body": updates[task_ids[index]][0]
+            }
+            for index, url in enumerate(urls)
+        ])
+        
+        results: Dict[str, Union[PlannerTask, GraphAPIError]] = {}
+        for item in responses:
+            index = int(item["id"])
+            if item.get("status") in (200, 204):
+                body = item.get("body") or {}
+                results[task_ids[index]] = PlannerTask.from_dict(body) if body else PlannerTask(id=task_ids[index])
+            else:
+                results[task_ids[index]] = self._batch_error(item, urls[index])
+        return results
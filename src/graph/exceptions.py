@@ -3,6 +3,18 @@ class GraphAPIError(Exception):
 
 
 class RateLimitError(GraphAPIError):
+    def __init__(self, message: str, retry_after: float = 60):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ServerError(GraphAPIError):
+    """Graph failed with a 5xx; a write may or may not have been applied"""
+    pass
+
+
+class CircuitOpenError(GraphAPIError):
+    """Requests of this kind are failing; not sent to Graph until the circuit half-opens"""
     pass
 
 
@@ -16,3 +28,8 @@ class AuthenticationError(GraphAPIError):
 
 class ValidationError(GraphAPIError):
     pass
+
+
+class ConflictError(GraphAPIError):
+    """The If-Match etag no longer matches (412): the item changed since it was read"""
+    pass
@@ -3,101 +3,182 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
+# Default $select projections for list views: exactly the Graph properties the
+# models below read, so Graph does not send (and we do not parse) the rest.
+PLAN_FIELDS = ["id", "title", "owner", "createdDateTime", "container"]
+BUCKET_FIELDS = ["id", "name", "planId", "orderHint"]
+TASK_LIST_FIELDS = [
+    "id", "title", "planId", "bucketId", "percentComplete", "priority",
+    "startDateTime", "dueDateTime", "assignments", "orderHint"
+]
+
+
+def _present(data: Dict[str, Any], fields: Dict[str, str]) -> Dict[str, Any]:
+    """Model arguments for the Graph properties present in ``data``.
+
+    Properties left out by a $select projection stay unset on the model, so
+    ``to_dict`` can tell "not fetched" apart from "empty".
+    """
+    return {attr: data[prop] for attr, prop in fields.items() if prop in data}
+
+
+def _isoformat(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
 class PlannerPlan(BaseModel):
-    id: str
-    title: str
+    id: str = ""
+    title: str = ""
     owner: Optional[str] = None
     created_date_time: Optional[datetime] = None
     container: Optional[Dict[str, Any]] = None
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "PlannerPlan":
-        return cls(
-            id=data.get("id", ""),
-            title=data.get("title", ""),
-            owner=data.get("owner"),
-            created_date_time=data.get("createdDateTime"),
-            container=data.get("container")
-        )
+        return cls(**_present(data, {
+            "id": "id",
+            "title": "title",
+            "owner": "owner",
+            "created_date_time": "createdDateTime",
+            "container": "container"
+        }))
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "title": self.title,
-            "owner": self.owner,
-            "createdDateTime": self.created_date_time.isoformat() if self.created_date_time else None,
-            "container": self.container
-        }
+        result = {"id": self.id}
+        if "title" in self.model_fields_set:
+            result["title"] = self.title
+        if "owner" in self.model_fields_set:
+            result["owner"] = self.owner
+        if "created_date_time" in self.model_fields_set:
+            result["createdDateTime"] = self.created_date_time.isoformat() if self.created_date_time else None
+        if "container" in self.model_fields_set:
+            result["container"] = self.container
+        return result
 
 
 class PlannerBucket(BaseModel):
-    id: str
-    name: str
-    plan_id: str
+    id: str = ""
+    name: str = ""
+    plan_id: str = ""
     order_hint: Optional[str] = None
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "PlannerBucket":
-        return cls(
-            id=data.get("id", ""),
-            name=data.get("name", ""),
-            plan_id=data.get("planId", ""),
-            order_hint=data.get("orderHint")
-        )
+        return cls(**_present(data, {
+            "id": "id",
+            "name": "name",
+            "plan_id": "planId",
+            "order_hint": "orderHint"
+        }))
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "planId": self.plan_id,
-            "orderHint": self.order_hint
-        }
+        result = {"id": self.id}
+        if "name" in self.model_fields_set:
+            result["name"] = self.name
+        if "plan_id" in self.model_fields_set:
+            result["planId"] = self.plan_id
+        if "order_hint" in self.model_fields_set:
+            result["orderHint"] = self.order_hint
+        return result
+
+
+class PlannerTaskDetails(BaseModel):
+    model_config = {"populate_by_name": True}
+    
+    id: str = ""
+    description: Optional[str] = None
+    preview_type: Optional[str] = None
+    checklist: Optional[Dict[str, Any]] = None
+    references: Optional[Dict[str, Any]] = None
+    odata_etag: Optional[str] = Field(None, alias="@odata.etag")
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlannerTaskDetails":
+        return cls(**_present(data, {
+            "id": "id",
+            "description": "description",
+            "preview_type": "previewType",
+            "checklist": "checklist",
+            "references": "references",
+            "odata_etag": "@odata.etag"
+        }))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"id": self.id}
+        if self.description is not None:
+            result["description"] = self.description
+        if self.preview_type is not None:
+            result["previewType"] = self.preview_type
+        if self.checklist:
+            result["checklist"] = self.checklist
+        if self.references:
+            result["references"] = self.references
+        return result
 
 
 class PlannerTask(BaseModel):
     model_config = {"populate_by_name": True}
     
-    id: str
-    title: str
-    plan_id: str
+    id: str = ""
+    title: str = ""
+    plan_id: str = ""
     bucket_id: Optional[str] = None
     percent_complete: int = 0
     priority: Optional[int] = None
     start_date_time: Optional[datetime] = None
     due_date_time: Optional[datetime] = None
     assignments: Optional[Dict[str, Any]] = None
+    order_hint: Optional[str] = None
+    created_date_time: Optional[datetime] = None
+    details: Optional[PlannerTaskDetails] = None
     odata_etag: Optional[str] = Field(None, alias="@odata.etag")
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "PlannerTask":
-        return cls(
-            id=data.get("id", ""),
-            title=data.get("title", ""),
-            plan_id=data.get("planId", ""),
-            bucket_id=data.get("bucketId"),
-            percent_complete=data.get("percentComplete", 0),
-            priority=data.get("priority"),
-            start_date_time=data.get("startDateTime"),
-            due_date_time=data.get("dueDateTime"),
-            assignments=data.get("assignments"),
-            odata_etag=data.get("@odata.etag")
-        )
+        task = _present(data, {
+            "id": "id",
+            "title": "title",
+            "plan_id": "planId",
+            "bucket_id": "bucketId",
+            "percent_complete": "percentComplete",
+            "priority": "priority",
+            "start_date_time": "startDateTime",
+            "due_date_time": "dueDateTime",
+            "assignments": "assignments",
+            "order_hint": "orderHint",
+            "created_date_time": "createdDateTime",
+            "odata_etag": "@odata.etag"
+        })
+        # Present when the task was fetched with $expand=details
+        if data.get("details"):
+            task["details"] = PlannerTaskDetails.from_dict(data["details"])
+        return cls(**task)
     
     def to_dict(self) -> Dict[str, Any]:
-        result = {
-            "id": self.id,
-            "title": self.title,
-            "planId": self.plan_id,
-            "percentComplete": self.percent_complete
-        }
+        result: Dict[str, Any] = {"id": self.id}
+        if "title" in self.model_fields_set:
+            result["title"] = self.title
+        if "plan_id" in self.model_fields_set:
+            result["planId"] = self.plan_id
+        if "percent_complete" in self.model_fields_set:
+            result["percentComplete"] = self.percent_complete
         if self.bucket_id:
             result["bucketId"] = self.bucket_id
         if self.priority is not None:
             result["priority"] = self.priority
         if self.start_date_time:
-            result["startDateTime"] = self.start_date_time.isoformat() if isinstance(self.start_date_time, datetime) else self.start_date_time
+            result["startDateTime"] = _isoformat(self.start_date_time)
         if self.due_date_time:
-            result["dueDateTime"] = self.due_date_time.isoformat() if isinstance(self.due_date_time, datetime) else self.due_date_time
+            result["dueDateTime"] = _isoformat(self.due_date_time)
         if self.assignments:
             result["assignments"] = self.assignments
+        if self.order_hint:
+            result["orderHint"] = self.order_hint
+        if self.created_date_time:
+            result["createdDateTime"] = _isoformat(self.created_date_time)
+        if self.details:
+            result["details"] = self.details.to_dict()
+        # Kept with cached tasks, so writes from a cached view need no read-back
+        if self.odata_etag:
+            result["@odata.etag"] = self.odata_etag
         return result
@@ -0,0 +1,124 @@
+"""Planner order hints, computed locally.
+
+Planner sorts tasks, buckets and assignments by ordinal comparison of their
+``orderHint`` strings. Instead of asking the service for a hint with its
+``"<previous> <next>!"`` syntax and reading the result back, the functions
+here generate a string that sorts strictly between two known neighbours.
+
+Generated hints end in one of the characters ``#`` to ``~``. They never
+end in ``!``, so they cannot be mistaken for the service syntax, and there
+is always room for another hint below them. Hints from the service may sort
+lower; a hint below one of those starts with a character under the
+alphabet, down to a space, and still ends in the alphabet.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_MIN_CHAR = ord('"')
+_MAX_CHAR = ord("~")
+# Lowest character used inside a hint, to go below hints at or under _MIN_CHAR
+_LOW_CHAR = ord(" ")
+
+
+def between(before: Optional[str] = None, after: Optional[str] = None) -> str:
+    """A hint that sorts after ``before`` and before ``after`` (None: no bound)"""
+    lower = before or ""
+    if after is not None and lower >= after:
+        raise ValueError(f"Order hint {before!r} does not sort before {after!r}")
+    
+    result: List[str] = []
+    bounded = after is not None
+    i = 0
+    while True:
+        if bounded and i >= len(after):
+            # Everything left below `after` would need characters below a space
+            raise ValueError(f"No order hint fits between {before!r} and {after!r}")
+        lo = ord(lower[i]) if i < len(lower) else None
+        hi = ord(after[i]) if bounded else None
+        
+        # The last character is above _MIN_CHAR, so a hint can always go below it
+        first = _MIN_CHAR + 1 if lo is None else max(lo + 1, _MIN_CHAR + 1)
+        last = _MAX_CHAR if hi is None else min(hi - 1, _MAX_CHAR)
+        if first <= last:
+            result.append(chr((first + last) // 2))
+            return "".join(result)
+        
+        # No character fits at this position: continue a level deeper
+        if lo is None and hi - 1 >= _LOW_CHAR:
+            # Step down one character; anything may follow it
+            result.append(chr(hi - 1))
+            bounded = False
+        elif lo is None or lo == hi:
+            result.append(chr(hi))
+        else:
+            result.append(chr(lo))
+            # Already below `after` from here on
+            bounded = False
+        i += 1
+
+
+def spread(count: int, before: Optional[str] = None, after: Optional[str] = None) -> List[str]:
+    """``count`` increasing hints between two neighbours, split evenly so they stay short"""
+    hints: List[Optional[str]] = [None] * count
+    
+    def fill(start: int, end: int, low: Optional[str], high: Optional[str]) -> None:
+        if start >= end:
+            return
+        middle = (start + end) // 2
+        hint = between(low, high)
+        hints[middle] = hint
+        fill(start, middle, low, hint)
+        fill(middle + 1, end, hint, high)
+    
+    fill(0, count, before, after)
+    return hints
+
+
+def _longest_increasing(hints: Sequence[Optional[str]]) -> List[int]:
+    """Positions of a longest strictly increasing run of hints (None never qualifies)"""
+    tails: List[str] = []
+    tail_positions: List[int] = []
+    previous: List[int] = [-1] * len(hints)
+    for position, hint in enumerate(hints):
+        if hint is None:
+            continue
+        length = bisect_left(tails, hint)
+        if length == len(tails):
+            tails.append(hint)
+            tail_positions.append(position)
+        else:
+            tails[length] = hint
+            tail_positions[length] = position
+        previous[position] = tail_positions[length - 1] if length else -1
+    
+    kept: List[int] = []
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        kept.append(position)
+        position = previous[position]
+    return kept[::-1]
+
+
+def plan_reorder(items: Sequence[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+    """New hints that put ``(id, current hint)`` items in the given order.
+
+    Items along a longest run whose hints already increase keep them; only
+    the others get a new hint, between their kept neighbours. Returns the
+    new hints by ID, so callers write as few items as possible.
+    """
+    kept = set(_longest_increasing([hint for _, hint in items]))
+    
+    changes: Dict[str, str] = {}
+    run: List[str] = []
+    low: Optional[str] = None
+    for position, (item_id, hint) in enumerate(items):
+        if position not in kept:
+            run.append(item_id)
+            continue
+        if run:
+            changes.update(zip(run, spread(len(run), low, hint)))
+            run = []
+        low = hint
+    if run:
+        changes.update(zip(run, spread(len(run), low, None)))
+    return changes
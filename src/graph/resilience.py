@@ -0,0 +1,112 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlparse
+import httpx
+from src.graph.exceptions import CircuitOpenError, ServerError, RateLimitError
+
+# Collection names that identify what an endpoint operates on; everything
+# else in a path is an ID
+_RESOURCES = {"plans", "tasks", "buckets", "details", "getByIds"}
+
+
+# Errors that mean Graph could not answer, as opposed to answering "no".
+# Cached reads may serve their last known value on these.
+UNAVAILABLE_ERRORS = (CircuitOpenError, ServerError, RateLimitError, httpx.TransportError)
+
+
+def endpoint_class(endpoint: str) -> str:
+    """Groups endpoints that fail together, e.g. ``planner/plans/tasks`` for any plan's tasks"""
+    path = urlparse(endpoint).path if endpoint.startswith("https://") else endpoint
+    segments = [segment for segment in path.split("/") if segment and segment != "v1.0"]
+    if not segments:
+        return "/"
+    return "/".join([segments[0]] + [segment for segment in segments[1:] if segment in _RESOURCES])
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures (0 disables it).
+
+    While open, calls fail at once with CircuitOpenError. After
+    ``reset_timeout`` seconds one trial call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+    
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def allow(self, name: str) -> None:
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return
+        raise CircuitOpenError(f"Graph {name} requests are failing; retry in {self.retry_in():.0f}s")
+    
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+    
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when this opened the circuit"""
+        self.failures += 1
+        was_open = self.opened_at is not None
+        if self.threshold > 0 and (self._trial_running or self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+        return not was_open and self.opened_at is not None
+    
+    def abandon(self) -> None:
+        """The call was cancelled before it told us anything"""
+        self._trial_running = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "retry_in": round(self.retry_in(), 1)}
+
+
+class LatencyTracker:
+    """Recent latencies of one endpoint class, for the hedging delay"""
+    
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._p95: Optional[float] = None
+        self._since_update = 0
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_update += 1
+    
+    def p95(self) -> Optional[float]:
+        """95th percentile in seconds, or None until there are enough samples"""
+        if len(self._samples) < self.min_samples:
+            return None
+        # Recomputed every few samples rather than on every request
+        if self._p95 is None or self._since_update >= 10:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self._since_update = 0
+        return self._p95
+    
+    def to_dict(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {"samples": len(self._samples), "p95_ms": round(p95 * 1000, 1) if p95 is not None else None}
@@ -0,0 +1,143 @@
+"""Incremental decoding of Graph collection pages.
+
+A page is a JSON object whose ``value`` array holds the items, next to a
+few small properties such as ``@odata.nextLink``. ``PageDecoder`` is fed
+the body as it arrives and hands back each item as soon as it is
+complete, so a page is never held in memory as a whole: at any time there
+is one network chunk, one partly received item and the items decoded from
+that chunk.
+
+Each item (and each other property) is decoded with the standard library's
+``raw_decode``. An item cut off at the end of a chunk fails to decode and
+is tried again once more data has arrived.
+"""
+import codecs
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+_WHITESPACE = " \t\n\r"
+
+# Decoder states: what the next token must be
+_OBJECT = "object"            # {
+_KEY = "key"                  # a property name, or }
+_COLON = "colon"              # :
+_FIELD = "field"              # a property value
+_ITEMS = "items"              # [ opening the item array
+_ITEM = "item"                # an item, or ]
+_AFTER_ITEM = "after_item"    # , or ]
+_AFTER_FIELD = "after_field"  # , or }
+_DONE = "done"
+
+
+class PageDecoder:
+    """Decodes one collection page incrementally; see the module docstring.
+
+    ``feed`` returns the items completed by a chunk, ``close`` checks that
+    the page ended properly. Properties other than the item array end up
+    in ``fields``.
+    """
+    
+    def __init__(self, items_key: str = "value"):
+        self.items_key = items_key
+        self.fields: Dict[str, Any] = {}
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._state = _OBJECT
+        self._key: Optional[str] = None
+        self._final = False
+    
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buffer += self._text.decode(chunk)
+        return self._parse()
+    
+    def close(self) -> List[Any]:
+        """Items left at the end of the body; raises ValueError if the page is incomplete"""
+        self._buffer += self._text.decode(b"", final=True)
+        self._final = True
+        items = self._parse()
+        if self._state != _DONE:
+            raise ValueError(f"Graph response ended inside the page (expecting {self._state})")
+        return items
+    
+    def _skip(self, pos: int) -> int:
+        while pos < len(self._buffer) and self._buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+    
+    def _value(self, pos: int) -> Optional[Tuple[Any, int]]:
+        """(value, end) of the JSON value at ``pos``, or None until more data arrives"""
+        try:
+            value, end = self._json.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if self._final:
+                raise
+            return None
+        # A number (or literal) at the end of the buffer may continue in the next chunk
+        if end >= len(self._buffer) and not self._final:
+            return None
+        return value, end
+    
+    def _expect(self, pos: int, *tokens: str) -> str:
+        token = self._buffer[pos]
+        if token not in tokens:
+            raise ValueError(f"Unexpected {token!r} in Graph response at {self._state}")
+        return token
+    
+    def _parse(self) -> List[Any]:
+        items: List[Any] = []
+        pos = 0
+        while True:
+            pos = self._skip(pos)
+            if pos >= len(self._buffer) or self._state == _DONE:
+                break
+            
+            if self._state == _OBJECT:
+                self._expect(pos, "{")
+                self._state = _KEY
+                pos += 1
+            elif self._state in (_KEY, _FIELD, _ITEM):
+                if self._state == _KEY and self._buffer[pos] == "}":
+                    self._state = _DONE
+                    pos += 1
+                    continue
+                if self._state == _ITEM and self._buffer[pos] == "]":
+                    self._state = _AFTER_FIELD
+                    pos += 1
+                    continue
+                decoded = self._value(pos)
+                if decoded is None:
+                    break
+                value, pos = decoded
+                if self._state == _KEY:
+                    self._key = value
+                    self._state = _COLON
+                elif self._state == _FIELD:
+                    self.fields[self._key] = value
+                    self._state = _AFTER_FIELD
+                else:
+                    items.append(value)
+                    self._state = _AFTER_ITEM
+            elif self._state == _COLON:
+                self._expect(pos, ":")
+                self._state = _ITEMS if self._key == self.items_key else _FIELD
+                pos += 1
+            elif self._state == _ITEMS:
+                if self._buffer[pos] != "[":
+                    # Not an array after all; keep it as an ordinary property
+                    self._state = _FIELD
+                    continue
+                self._state = _ITEM
+                pos += 1
+            elif self._state == _AFTER_ITEM:
+                token = self._expect(pos, ",", "]")
+                self._state = _ITEM if token == "," else _AFTER_FIELD
+                pos += 1
+            elif self._state == _AFTER_FIELD:
+                token = self._expect(pos, ",", "}")
+                self._state = _KEY if token == "," else _DONE
+                pos += 1
+        
+        # Only the unconsumed tail (at most one partial value) is kept
+        self._buffer = self._buffer[pos:]
+        return items
@@ -3,19 +3,45 @@ HTTP Test Server for Microsoft Planner MCP
 This provides an HTTP interface for testing the MCP server functionality
 """
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 from dotenv import load_dotenv
 import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
 
 from src.config import Settings as AppSettings
 from src.auth.microsoft import MicrosoftAuthManager
 from src.graph.client import GraphAPIClient
-from src.cache.memory import MemoryCache
+from src.graph.resilience import UNAVAILABLE_ERRORS
+from src.graph.exceptions import CircuitOpenError, ConflictError, RateLimitError, NotFoundError, ServerError
+from src.cache.factory import create_cache
+from src.cache.shared import DEFAULT_SOCKET_PATH, run_cache_daemon
 from src.tools.task_tools import TaskTools
+from src.tools.plan_tools import PlanTools
+from src.tools.aggregation_tools import AggregationTools
+from src.tools.task_index import TaskIndexes
+from src.tools.preload import CachePreloader
+from src.tools.refresh import RefreshScheduler
+from src.tools.user_directory import UserDirectory
+from src.tools.create_ledger import CacheCreateLedger, CreateLedger
+from src.tools.cache_admin import CacheAdmin
+from src.tools.export import PlanExporter
 from src.utils.logger import configure_logging
+from src.utils.diagnostics import Diagnostics
+from src.utils.worker_lock import WorkerLock
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional dependency
+    BrotliMiddleware = None
 
 # Load environment
 load_dotenv()
@@ -27,17 +53,37 @@ logger = configure_logging(settings.log_level, "console")
 # Create FastAPI app
 app = FastAPI(title="Planner MCP Test Server")
 
+# Compress larger bodies; br when available, gzip otherwise
+if BrotliMiddleware:
+    app.add_middleware(BrotliMiddleware, minimum_size=settings.http_compress_min_bytes, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.http_compress_min_bytes)
+
 # Global services
 auth_manager = None
 graph_client = None
 cache_manager = None
 task_tools = None
+plan_tools = None
+aggregation_tools = None
+preloader = None
+refresh_scheduler = None
+user_directory = None
+cache_admin = None
+exporter = None
+diagnostics = None
 services_initialized = False
 
+# With several workers, the one holding this lock runs the preload and refresh jobs
+worker_lock = None
+if settings.http_workers > 1:
+    worker_lock = WorkerLock(os.path.join(tempfile.gettempdir(), f"planner-mcp-{settings.mcp_server_port}.jobs.lock"))
+background_waiter = None
+
 
 def initialize_services():
     """Initialize all services"""
-    global auth_manager, graph_client, cache_manager, task_tools, services_initialized
+    global auth_manager, graph_client, cache_manager, task_tools, plan_tools, aggregation_tools, preloader, refresh_scheduler, user_directory, cache_admin, exporter, services_initialized
     
     if not settings.azure_tenant_id or not settings.azure_client_id:
         logger.warning("Azure credentials not configured")
@@ -70,9 +116,75 @@ def initialize_services():
                 client_secret=settings.azure_client_secret
             )
         
-        graph_client = GraphAPIClient(auth_manager)
-        cache_manager = MemoryCache(settings.cache_ttl_seconds)
-        task_tools = TaskTools(graph_client, cache_manager)
+        graph_client = GraphAPIClient(
+            auth_manager,
+            breaker_threshold=settings.graph_breaker_threshold,
+            breaker_reset_seconds=settings.graph_breaker_reset_seconds,
+            hedge_reads=settings.graph_hedge_reads,
+            hedge_min_delay=settings.graph_hedge_min_delay_ms / 1000,
+            stream_pages=settings.graph_stream_pages
+        )
+        cache_manager = create_cache(settings)
+        # Cached reads answer from their last copy while Graph is unavailable
+        cache_manager.stale_errors = UNAVAILABLE_ERRORS
+        task_indexes = TaskIndexes(settings.cache_ttl_seconds, settings.task_index_max_plans)
+        task_tools = TaskTools(
+            graph_client,
+            cache_manager,
+            write_behind_window=settings.task_write_behind_ms / 1000,
+            indexes=task_indexes,
+            # Workers share the ledger through the cache, so a retry reaching
+            # another worker still finds the key
+            ledger=(
+                CacheCreateLedger(cache_manager, settings.create_ledger_ttl_seconds)
+                if settings.http_workers > 1
+                else CreateLedger(settings.create_ledger_ttl_seconds, settings.create_ledger_path)
+            ),
+            create_attempts=settings.create_max_attempts
+        )
+        plan_tools = PlanTools(
+            graph_client,
+            cache_manager,
+            task_indexes,
+            task_page_size=settings.task_page_size,
+            task_page_max_size=settings.task_page_max_size
+        )
+        # The /admin/cache routes can purge and overwrite entries, so they are opt-in
+        cache_admin = CacheAdmin(cache_manager, plan_tools) if settings.cache_admin_enabled else None
+        exporter = PlanExporter(
+            graph_client,
+            concurrency=settings.export_concurrency,
+            buffer_pages=settings.export_buffer_pages
+        )
+        user_directory = UserDirectory(
+            graph_client,
+            ttl=settings.user_directory_ttl_seconds,
+            max_users=settings.user_directory_max_users
+        )
+        aggregation_tools = AggregationTools(
+            graph_client,
+            cache_manager,
+            max_concurrency=settings.aggregation_max_concurrency,
+            batch_size=settings.aggregation_batch_size
+        )
+        preloader = CachePreloader(
+            plan_tools,
+            aggregation_tools,
+            plan_ids=settings.preload_plan_ids,
+            group_ids=settings.preload_group_ids,
+            concurrency=settings.preload_concurrency
+        )
+        if settings.refresh_enabled:
+            refresh_scheduler = RefreshScheduler(
+                graph_client,
+                cache_manager,
+                plan_tools,
+                min_interval=settings.refresh_min_interval_seconds,
+                max_interval=settings.refresh_max_interval_seconds,
+                max_plans=settings.refresh_max_plans,
+                budget_per_minute=settings.refresh_budget_per_minute,
+                ttl=settings.cache_ttl_seconds
+            )
         
         services_initialized = True
         logger.info("Services initialized successfully")
@@ -84,8 +196,69 @@ def initialize_services():
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize services on startup"""
-    initialize_services()
+    """Initialize services and warm the cache on startup"""
+    global diagnostics
+    # Started first, so slow or blocking startup work is visible too
+    if settings.diagnostics_enabled:
+        diagnostics = Diagnostics(settings.diagnostics_block_threshold_ms / 1000)
+        diagnostics.start()
+    
+    if not initialize_services():
+        return
+    
+    # Restore first, so the preload only fetches what the snapshot lacks
+    if settings.cache_snapshot_path:
+        try:
+            await cache_manager.restore(settings.cache_snapshot_path)
+        except Exception as e:
+            logger.warning(f"Failed to restore cache snapshot: {e}")
+    
+    global background_waiter
+    if worker_lock is None or worker_lock.acquire():
+        await start_background_jobs()
+    else:
+        background_waiter = asyncio.ensure_future(wait_for_worker_lock())
+
+
+async def start_background_jobs(blocking: bool = settings.preload_blocking):
+    if blocking:
+        await preloader.run()
+    else:
+        preloader.start()
+    if refresh_scheduler:
+        refresh_scheduler.start()
+
+
+async def wait_for_worker_lock(interval: float = 30):
+    """Take over the background jobs once the worker running them exits"""
+    while not worker_lock.acquire():
+        await asyncio.sleep(interval)
+    logger.info("background_jobs_taken_over", worker_pid=os.getpid())
+    await start_background_jobs(blocking=False)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued task updates, save the cache snapshot and release cache connections on shutdown"""
+    if background_waiter:
+        background_waiter.cancel()
+    if preloader:
+        await preloader.stop()
+    if refresh_scheduler:
+        await refresh_scheduler.stop()
+    if worker_lock:
+        worker_lock.release()
+    if task_tools:
+        await task_tools.close()
+    if cache_manager:
+        if settings.cache_snapshot_path:
+            try:
+                await cache_manager.snapshot(settings.cache_snapshot_path)
+            except Exception as e:
+                logger.warning(f"Failed to write cache snapshot: {e}")
+        await cache_manager.close()
+    if diagnostics:
+        diagnostics.stop()
 
 
 @app.get("/health")
@@ -94,31 +267,299 @@ async def health_check():
     return {
         "status": "running",
         "services_initialized": services_initialized,
-        "azure_configured": bool(settings.azure_tenant_id)
+        "azure_configured": bool(settings.azure_tenant_id),
+        "worker_pid": os.getpid(),
+        "cache_backend": type(cache_manager).__name__ if cache_manager else None,
+        "cache": await cache_manager.stats() if cache_manager else None,
+        "background_jobs": worker_lock is None or worker_lock.held,
+        "preload": preloader.status if preloader else None,
+        "refresh": refresh_scheduler.status if refresh_scheduler else None,
+        "graph": graph_client.resilience_status() if graph_client else None
     }
 
 
+def admin_error_status(error: Exception) -> int:
+    """Unsupported backend: 501, bad filter or import data: 400"""
+    if isinstance(error, NotImplementedError):
+        return 501
+    if isinstance(error, ValueError):
+        return 400
+    return 500
+
+
+def require_cache_admin() -> CacheAdmin:
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    if cache_admin is None:
+        raise HTTPException(status_code=404, detail="Cache administration is disabled. Set CACHE_ADMIN_ENABLED=true.")
+    return cache_admin
+
+
+@app.get("/admin/cache/keys")
+async def list_cache_keys(
+    prefix: str = "",
+    tag: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=100000)
+):
+    """Cached keys with stored size, seconds to expiry, pin state and tags (plan:<id>, task:<id>, ...)"""
+    admin = require_cache_admin()
+    
+    try:
+        return await admin.list_keys(prefix, tag, limit)
+    except Exception as e:
+        logger.error(f"Error listing cache keys: {e}")
+        raise HTTPException(status_code=admin_error_status(e), detail=str(e))
+
+
+@app.delete("/admin/cache/keys")
+async def purge_cache(
+    prefix: Optional[str] = None,
+    plan_id: Optional[str] = None,
+    tag: Optional[str] = None
+):
+    """Purge the keys matching all given filters, e.g. ?plan_id= for everything cached about one plan"""
+    admin = require_cache_admin()
+    
+    try:
+        return await admin.purge(prefix, plan_id, tag)
+    except Exception as e:
+        logger.error(f"Error purging cache: {e}")
+        raise HTTPException(status_code=admin_error_status(e), detail=str(e))
+
+
+@app.put("/admin/cache/pins")
+async def pin_cache_keys(keys: List[str]):
+    """Pin the keys in the body so they never expire"""
+    admin = require_cache_admin()
+    
+    try:
+        return await admin.pin(keys)
+    except Exception as e:
+        logger.error(f"Error pinning cache keys: {e}")
+        raise HTTPException(status_code=admin_error_status(e), detail=str(e))
+
+
+@app.delete("/admin/cache/pins")
+async def unpin_cache_keys(key: List[str] = Query(...)):
+    """Unpin keys (repeat ?key=); they expire normally again"""
+    admin = require_cache_admin()
+    
+    try:
+        return await admin.pin(key, pinned=False)
+    except Exception as e:
+        logger.error(f"Error unpinning cache keys: {e}")
+        raise HTTPException(status_code=admin_error_status(e), detail=str(e))
+
+
+@app.get("/admin/cache/export")
+async def export_cache(prefix: str = ""):
+    """Unexpired entries starting with the prefix, in cache snapshot format"""
+    admin = require_cache_admin()
+    
+    try:
+        data = await admin.export(prefix)
+    except Exception as e:
+        logger.error(f"Error exporting cache: {e}")
+        raise HTTPException(status_code=admin_error_status(e), detail=str(e))
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="planner-cache.snapshot"'}
+    )
+
+
+@app.post("/admin/cache/import")
+async def import_cache(request: Request):
+    """Load an export (the request body) into the cache, replacing existing entries"""
+    admin = require_cache_admin()
+    
+    try:
+        return await admin.import_(await request.body())
+    except Exception as e:
+        logger.error(f"Error importing cache: {e}")
+        raise HTTPException(status_code=admin_error_status(e), detail=str(e))
+
+
+def require_diagnostics() -> Diagnostics:
+    if diagnostics is None:
+        raise HTTPException(status_code=404, detail="Diagnostics are disabled. Set DIAGNOSTICS_ENABLED=true.")
+    return diagnostics
+
+
+@app.get("/admin/diagnostics/profile")
+async def profile_event_loop(
+    seconds: float = Query(5, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+    limit: int = Query(30, ge=1, le=500)
+):
+    """Sample the event loop thread's stack for a few seconds: hottest lines, functions and collapsed stacks"""
+    try:
+        return await require_diagnostics().profile(seconds, interval_ms / 1000, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/admin/diagnostics/memory")
+async def memory_top(limit: int = Query(20, ge=1, le=500), frames: int = Query(1, ge=1, le=50)):
+    """Top allocations by line; tracemalloc starts on the first call"""
+    return await require_diagnostics().memory(limit, frames)
+
+
+@app.get("/admin/diagnostics/memory/diff")
+async def memory_diff(limit: int = Query(20, ge=1, le=500), frames: int = Query(1, ge=1, le=50)):
+    """Allocation changes since the previous memory call"""
+    return await require_diagnostics().memory_diff(limit, frames)
+
+
+@app.delete("/admin/diagnostics/memory")
+async def stop_memory_tracing():
+    """Stop tracemalloc and its overhead"""
+    return {"stopped": require_diagnostics().stop_memory()}
+
+
+@app.get("/admin/diagnostics/loop")
+async def event_loop_status():
+    """Event loop lag percentiles and recent calls that blocked the loop, with their stacks"""
+    return require_diagnostics().loop_status()
+
+
+@app.get("/admin/diagnostics/tasks")
+async def running_tasks(stack_limit: int = Query(10, ge=1, le=100)):
+    """Running asyncio tasks and where each one is suspended"""
+    tasks = require_diagnostics().tasks(stack_limit)
+    return {"count": len(tasks), "tasks": tasks}
+
+
+def error_status(error: Exception) -> int:
+    """HTTP status for a failed request, so clients can tell throttling and missing IDs from failures"""
+    if isinstance(error, RateLimitError):
+        return 429
+    if isinstance(error, NotFoundError):
+        return 404
+    if isinstance(error, ConflictError):
+        return 409
+    if isinstance(error, CircuitOpenError):
+        return 503
+    if isinstance(error, ServerError):
+        return 502
+    return 500
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so a W/ prefix is ignored
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cached_json_response(request: Request, content: Any) -> Response:
+    """JSON response with a strong ETag and a Cache-Control max-age bound to the cache TTL.
+    
+    ``content`` is either JSON bytes from the cache or a value to encode the
+    same (compact) way, so a cache hit and a miss for the same data carry
+    the same ETag. Returns 304 without a body when the client's copy matches.
+    """
+    payload = content if isinstance(content, bytes) else json.dumps(content, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.cache_ttl_seconds}"
+    }
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+async def stream_ndjson(pages: AsyncIterator[List[Dict[str, Any]]]) -> StreamingResponse:
+    """Stream items as NDJSON, one line per item, written a page at a time.
+    
+    The first page is fetched before the response starts, so a failing
+    request (unknown ID, authentication) still gets an error status. A
+    failure later on ends the stream with an ``{"error": ...}`` line.
+    """
+    first = await anext(pages, None)
+    
+    async def body():
+        if first is None:
+            return
+        yield "".join(json.dumps(item) + "\n" for item in first)
+        try:
+            async for page in pages:
+                yield "".join(json.dumps(item) + "\n" for item in page)
+        except Exception as e:
+            logger.error(f"Error while streaming: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.post("/export")
+async def export_plans(
+    plan_ids: List[str] = Body([]),
+    group_ids: List[str] = Body([]),
+    include_details: bool = Body(False),
+    skip_plan_ids: List[str] = Body([])
+):
+    """Stream every plan, bucket, task and optionally task details of the given plans and groups.
+    
+    The response is NDJSON, one ``{"type", "planId", "data"}`` record per
+    line, plan by plan. Each plan ends with a ``plan_done`` record;
+    ``skip_plan_ids`` leaves out plans an interrupted export already has.
+    """
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    if not plan_ids and not group_ids:
+        raise HTTPException(status_code=400, detail="Give plan_ids or group_ids")
+    
+    records = exporter.export(plan_ids, group_ids, include_details, skip_plan_ids)
+    try:
+        # Fetched before the response starts, so an unknown group gets an error status
+        first = await anext(records, None)
+    except Exception as e:
+        logger.error(f"Error starting export: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+    
+    async def body():
+        if first is None:
+            return
+        yield json.dumps(first, separators=(",", ":")) + "\n"
+        try:
+            async for item in records:
+                yield json.dumps(item, separators=(",", ":")) + "\n"
+        except Exception as e:
+            logger.error(f"Error while exporting: {e}")
+            yield json.dumps({"type": "error", "error": str(e), "partial": True}) + "\n"
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @app.get("/planner/groups")
-async def list_groups():
-    """List all groups the app has access to"""
+async def list_groups(stream: bool = False):
+    """List all groups the app has access to.
+    
+    With stream=true the response is NDJSON, one group per line, written as
+    each page arrives from Graph.
+    """
     if not services_initialized:
         raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
     
     try:
-        response = await graph_client._make_request(
-            "GET",
-            "/groups?$select=id,displayName,description&$filter=groupTypes/any(c:c eq 'Unified')"
-        )
+        pages = graph_client.iter_groups(select=["id", "displayName", "description"])
+        if stream:
+            return await stream_ndjson(pages)
         
-        data = response.json()
-        groups = data.get("value", [])
+        groups = []
+        async for page in pages:
+            groups.extend(page)
         return {
             "count": len(groups),
             "groups": groups
         }
     except Exception as e:
         logger.error(f"Error listing groups: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
 @app.get("/planner/groups/{group_id}/plans")
@@ -142,73 +583,214 @@ async def list_group_plans(group_id: str):
         }
     except Exception as e:
         logger.error(f"Error listing group plans: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
-@app.get("/planner/plans/{plan_id}")
-async def get_plan(plan_id: str):
-    """Get plan details"""
+@app.get("/planner/groups/{group_id}/rollup")
+async def group_rollup(
+    group_id: str,
+    report: str = "overdue",
+    assignee_id: Optional[str] = None,
+    within_days: int = 3,
+    stream: bool = False
+):
+    """Roll up tasks across every plan of a group (overdue, at_risk, assigned, by_assignee).
+    
+    With stream=true the response is NDJSON: one line per plan, with its
+    matching tasks, as soon as it is loaded, followed by a summary line with
+    the counts.
+    """
     if not services_initialized:
         raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
     
     try:
-        cache_key = f"plan:{plan_id}"
-        cached = await cache_manager.get(cache_key)
+        if not stream:
+            return await aggregation_tools.rollup(group_id, report, assignee_id, within_days)
         
-        if cached:
-            return cached
+        events = aggregation_tools.iter_rollup(group_id, report, assignee_id, within_days)
+        # Fail before the 200 status is sent for an invalid report or an unknown group
+        first = await events.__anext__()
         
-        plan = await graph_client.get_plan(plan_id)
-        result = plan.to_dict()
-        await cache_manager.set(cache_key, result)
-        return result
+        async def ndjson():
+            yield json.dumps(first) + "\n"
+            try:
+                async for event in events:
+                    yield json.dumps(event) + "\n"
+            except Exception as e:
+                logger.error(f"Error while streaming rollup: {e}")
+                yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error building rollup: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/planner/plans/{plan_id}")
+async def get_plan(plan_id: str, request: Request):
+    """Get plan details"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        return cached_json_response(request, await plan_tools.get_plan_json(plan_id))
     except Exception as e:
         logger.error(f"Error getting plan: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
 @app.get("/planner/plans/{plan_id}/tasks")
-async def list_plan_tasks(plan_id: str):
-    """List all tasks in a plan"""
+async def list_plan_tasks(
+    plan_id: str,
+    request: Request,
+    stream: bool = False,
+    include_assignees: bool = False
+):
+    """List all tasks in a plan.
+    
+    With stream=true the response is NDJSON, one task per line, written as
+    each page arrives from Graph. include_assignees adds the assigned users'
+    display names to each task.
+    """
     if not services_initialized:
         raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
     
     try:
-        cache_key = f"plan_tasks:{plan_id}"
-        cached = await cache_manager.get(cache_key)
+        if stream:
+            pages = plan_tools.iter_plan_tasks(plan_id)
+            if include_assignees:
+                pages = (await user_directory.enrich(page) async for page in pages)
+            return await stream_ndjson(pages)
         
-        if cached:
-            return cached
-        
-        tasks = await graph_client.get_plan_tasks(plan_id)
-        result = [task.to_dict() for task in tasks]
-        await cache_manager.set(cache_key, result)
-        return result
+        if include_assignees:
+            tasks = await plan_tools.get_plan_tasks(plan_id)
+            return cached_json_response(request, await user_directory.enrich(tasks))
+        return cached_json_response(request, await plan_tools.get_plan_tasks_json(plan_id))
     except Exception as e:
         logger.error(f"Error listing tasks: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/directory/users")
+async def resolve_users(ids: List[str] = Query(...)):
+    """Resolve user IDs (e.g. task assignees) to display names, in bulk"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        return await user_directory.resolve(ids)
+    except Exception as e:
+        logger.error(f"Error resolving users: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/planner/plans/{plan_id}/tasks/find")
+async def find_plan_tasks(
+    plan_id: str,
+    bucket_id: Optional[str] = None,
+    assignee_id: Optional[str] = None,
+    due: Optional[str] = None,
+    state: Optional[str] = None,
+    include_details: bool = False,
+    include_assignees: bool = False
+):
+    """Filter a plan's tasks by bucket, assignee, due (overdue, today, this_week, later, none) and state"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        result = await plan_tools.find_tasks(plan_id, bucket_id, assignee_id, due, state)
+        if include_details:
+            result["tasks"] = await task_tools.with_details(result["tasks"])
+        if include_assignees:
+            result["tasks"] = await user_directory.enrich(result["tasks"])
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error finding tasks: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/planner/plans/{plan_id}/tasks/page")
+async def list_plan_tasks_page(
+    plan_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1)
+):
+    """A page of a plan's tasks in board order; pass nextCursor back as cursor for the next page"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        return cached_json_response(request, await plan_tools.get_tasks_page_json(plan_id, cursor, page_size))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing task page: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/planner/plans/{plan_id}/tasks/{task_id}")
+async def get_plan_task(plan_id: str, task_id: str):
+    """Get a task of a plan by ID from the plan's task index"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        task = await plan_tools.get_plan_task(plan_id, task_id)
+    except Exception as e:
+        logger.error(f"Error getting task: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+    
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found in plan {plan_id}")
+    return task
 
 
 @app.get("/planner/plans/{plan_id}/buckets")
-async def list_plan_buckets(plan_id: str):
+async def list_plan_buckets(plan_id: str, request: Request):
     """List all buckets in a plan"""
     if not services_initialized:
         raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
     
     try:
-        cache_key = f"plan_buckets:{plan_id}"
-        cached = await cache_manager.get(cache_key)
-        
-        if cached:
-            return cached
-        
-        buckets = await graph_client.get_plan_buckets(plan_id)
-        result = [bucket.to_dict() for bucket in buckets]
-        await cache_manager.set(cache_key, result)
-        return result
+        return cached_json_response(request, await plan_tools.get_plan_buckets_json(plan_id))
     except Exception as e:
         logger.error(f"Error listing buckets: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.put("/planner/plans/{plan_id}/buckets/{bucket_id}/order")
+async def reorder_tasks(plan_id: str, bucket_id: str, task_ids: List[str]):
+    """Order a bucket's tasks as listed in the body (top first); unlisted tasks follow"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        index = await plan_tools.task_index(plan_id)
+        return await task_tools.reorder_tasks(plan_id, bucket_id, task_ids, index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reordering tasks: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/planner/plans/{plan_id}/board")
+async def get_plan_board(plan_id: str, request: Request):
+    """Get the plan board: buckets with their tasks in board order, plus counts"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        return cached_json_response(request, await plan_tools.get_plan_board_json(plan_id))
+    except Exception as e:
+        logger.error(f"Error building plan board: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
 @app.post("/tools/create_task")
@@ -218,9 +800,11 @@ async def create_task(
     bucket_id: Optional[str] = None,
     due_date: Optional[str] = None,
     priority: Optional[int] = None,
-    assignee_ids: Optional[List[str]] = None
+    assignee_ids: Optional[List[str]] = None,
+    description: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Create a new task"""
+    """Create a new task; requests repeating an Idempotency-Key header get the first result"""
     if not services_initialized:
         raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
     
@@ -229,13 +813,15 @@ async def create_task(
                 plan_id=plan_id,
                 title=title,
                 bucket_id=bucket_id,
+                description=description,
                 due_date=due_date,
                 priority=priority,
-                assignee_ids=assignee_ids
+                assignee_ids=assignee_ids,
+                idempotency_key=idempotency_key
             )
     except Exception as e:
         logger.error(f"Error creating task: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
 @app.put("/tools/update_task/{task_id}")
@@ -245,9 +831,10 @@ async def update_task(
     bucket_id: Optional[str] = None,
     percent_complete: Optional[int] = None,
     priority: Optional[int] = None,
-    due_date: Optional[str] = None
+    due_date: Optional[str] = None,
+    wait: bool = True
 ):
-    """Update an existing task"""
+    """Update an existing task; with write-behind enabled and wait=false it is only queued"""
     if not services_initialized:
         raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
     
@@ -264,10 +851,36 @@ async def update_task(
         if due_date:
             updates["dueDateTime"] = due_date
         
-        return await task_tools.update_task(task_id, updates)
+        return await task_tools.update_task(task_id, updates, wait=wait)
     except Exception as e:
         logger.error(f"Error updating task: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/planner/tasks/details")
+async def get_tasks_details(task_ids: List[str] = Query(...)):
+    """Get details (description, checklist, references) of many tasks, fetched in batches"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        return await task_tools.get_tasks_details(task_ids)
+    except Exception as e:
+        logger.error(f"Error getting task details: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.patch("/planner/tasks/{task_id}/details")
+async def update_task_details(task_id: str, body: Dict[str, Any]):
+    """Update a task's details; the body uses Graph's plannerTaskDetails properties"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="Services not initialized. Check Azure credentials.")
+    
+    try:
+        return await task_tools.update_task_details(task_id, body)
+    except Exception as e:
+        logger.error(f"Error updating task details: {e}")
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
 @app.delete("/tools/delete_task/{task_id}")
@@ -280,12 +893,59 @@ async def delete_task(task_id: str):
         return await task_tools.delete_task(task_id)
     except Exception as e:
         logger.error(f"Error deleting task: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+def start_cache_daemon(socket_path: str, timeout: float = 5.0) -> multiprocessing.Process:
+    """Start the shared cache daemon and wait until its socket accepts connections"""
+    # Remove a stale socket so the readiness check waits for the new daemon
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    process = multiprocessing.Process(
+        target=run_cache_daemon,
+        args=(socket_path, settings.cache_ttl_seconds),
+        daemon=True
+    )
+    process.start()
+    
+    deadline = time.time() + timeout
+    while not os.path.exists(socket_path):
+        if time.time() > deadline or not process.is_alive():
+            raise RuntimeError(f"Shared cache daemon did not start on {socket_path}")
+        time.sleep(0.05)
+    
+    return process
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        app,
-        host=settings.mcp_server_host,
-        port=settings.mcp_server_port
-    )
\ No newline at end of file
+    if settings.http_workers > 1:
+        cache_daemon = None
+        if settings.cache_type.lower() == "memory":
+            # A process-local cache would be cold in every worker, so run a
+            # shared cache daemon for them instead
+            socket_path = settings.cache_socket_path or DEFAULT_SOCKET_PATH
+            cache_daemon = start_cache_daemon(socket_path)
+            
+            # Workers are fresh processes that read their settings from the environment
+            os.environ["CACHE_TYPE"] = "shared"
+            os.environ["CACHE_SOCKET_PATH"] = socket_path
+        
+        logger.info("starting_multi_worker_server", workers=settings.http_workers, cache_type=os.environ.get("CACHE_TYPE", settings.cache_type))
+        
+        try:
+            uvicorn.run(
+                "src.http_test_server:app",
+                host=settings.mcp_server_host,
+                port=settings.mcp_server_port,
+                workers=settings.http_workers
+            )
+        finally:
+            if cache_daemon:
+                cache_daemon.terminate()
+    else:
+        uvicorn.run(
+            app,
+            host=settings.mcp_server_host,
+            port=settings.mcp_server_port
+        )
\ No newline at end of file
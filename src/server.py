@@ -1,12 +1,23 @@
-from fastmcp import FastMCP
+import json
+from fastmcp import FastMCP, Context
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 from src.config import Settings as AppSettings
 from src.utils.logger import configure_logging
 from src.auth.microsoft import MicrosoftAuthManager
 from src.graph.client import GraphAPIClient
-from src.cache.memory import MemoryCache
+from src.graph.resilience import UNAVAILABLE_ERRORS
+from src.cache.factory import create_cache
 from src.tools.task_tools import TaskTools
+from src.tools.plan_tools import PlanTools
+from src.tools.aggregation_tools import AggregationTools
+from src.tools.task_index import TaskIndexes
+from src.tools.preload import CachePreloader
+from src.tools.refresh import RefreshScheduler
+from src.tools.user_directory import UserDirectory
+from src.tools.create_ledger import CreateLedger
+from src.utils.diagnostics import Diagnostics
+import asyncio
 import structlog
 
 load_dotenv()
@@ -20,10 +31,17 @@ auth_manager = None
 graph_client = None
 cache_manager = None
 task_tools = None
+plan_tools = None
+aggregation_tools = None
+preloader = None
+refresh_scheduler = None
+user_directory = None
+# Independent of Graph credentials, so an unconfigured server can be profiled too
+diagnostics = Diagnostics(settings.diagnostics_block_threshold_ms / 1000) if settings.diagnostics_enabled else None
 
 
 def initialize_services():
-    global auth_manager, graph_client, cache_manager, task_tools
+    global auth_manager, graph_client, cache_manager, task_tools, plan_tools, aggregation_tools, preloader, refresh_scheduler, user_directory
     
     if not settings.azure_tenant_id or not settings.azure_client_id or not settings.azure_client_secret:
         logger.warning("azure_credentials_not_configured")
@@ -35,9 +53,62 @@ def initialize_services():
         client_secret=settings.azure_client_secret
     )
     
-    graph_client = GraphAPIClient(auth_manager)
-    cache_manager = MemoryCache(settings.cache_ttl_seconds)
-    task_tools = TaskTools(graph_client, cache_manager)
+    graph_client = GraphAPIClient(
+        auth_manager,
+        breaker_threshold=settings.graph_breaker_threshold,
+        breaker_reset_seconds=settings.graph_breaker_reset_seconds,
+        hedge_reads=settings.graph_hedge_reads,
+        hedge_min_delay=settings.graph_hedge_min_delay_ms / 1000,
+        stream_pages=settings.graph_stream_pages
+    )
+    cache_manager = create_cache(settings)
+    # Cached reads answer from their last copy while Graph is unavailable
+    cache_manager.stale_errors = UNAVAILABLE_ERRORS
+    task_indexes = TaskIndexes(settings.cache_ttl_seconds, settings.task_index_max_plans)
+    task_tools = TaskTools(
+        graph_client,
+        cache_manager,
+        write_behind_window=settings.task_write_behind_ms / 1000,
+        indexes=task_indexes,
+        ledger=CreateLedger(settings.create_ledger_ttl_seconds, settings.create_ledger_path),
+        create_attempts=settings.create_max_attempts
+    )
+    plan_tools = PlanTools(
+        graph_client,
+        cache_manager,
+        task_indexes,
+        task_page_size=settings.task_page_size,
+        task_page_max_size=settings.task_page_max_size
+    )
+    user_directory = UserDirectory(
+        graph_client,
+        ttl=settings.user_directory_ttl_seconds,
+        max_users=settings.user_directory_max_users
+    )
+    aggregation_tools = AggregationTools(
+        graph_client,
+        cache_manager,
+        max_concurrency=settings.aggregation_max_concurrency,
+        batch_size=settings.aggregation_batch_size
+    )
+    preloader = CachePreloader(
+        plan_tools,
+        aggregation_tools,
+        plan_ids=settings.preload_plan_ids,
+        group_ids=settings.preload_group_ids,
+        concurrency=settings.preload_concurrency
+    )
+    if settings.refresh_enabled:
+        refresh_scheduler = RefreshScheduler(
+            graph_client,
+            cache_manager,
+            plan_tools,
+            min_interval=settings.refresh_min_interval_seconds,
+            max_interval=settings.refresh_max_interval_seconds,
+            max_plans=settings.refresh_max_plans,
+            budget_per_minute=settings.refresh_budget_per_minute,
+            ttl=settings.cache_ttl_seconds
+        )
     
     logger.info("services_initialized")
     return True
@@ -48,17 +119,8 @@ async def get_plan(plan_id: str) -> str:
     if not graph_client:
         return "MCP server not configured. Please set Azure credentials in .env file."
     
-    cache_key = f"plan:{plan_id}"
-    cached = await cache_manager.get(cache_key)
-    
-    if cached:
-        return str(cached)
-    
-    plan = await graph_client.get_plan(plan_id)
-    result = plan.to_dict()
-    await cache_manager.set(cache_key, result)
-    
-    return str(result)
+    result = await plan_tools.get_plan_json(plan_id)
+    return result.decode("utf-8")
 
 
 @mcp.resource("planner://plans/{plan_id}/tasks")
@@ -66,17 +128,21 @@ async def list_plan_tasks(plan_id: str) -> str:
     if not graph_client:
         return "MCP server not configured. Please set Azure credentials in .env file."
     
-    cache_key = f"plan_tasks:{plan_id}"
-    cached = await cache_manager.get(cache_key)
-    
-    if cached:
-        return str(cached)
-    
-    tasks = await graph_client.get_plan_tasks(plan_id)
-    result = [task.to_dict() for task in tasks]
-    await cache_manager.set(cache_key, result)
+    result = await plan_tools.get_plan_tasks_json(plan_id)
+    return result.decode("utf-8")
+
+
+@mcp.resource("planner://plans/{plan_id}/tasks/page/{cursor}")
+async def list_plan_tasks_page(plan_id: str, cursor: str) -> str:
+    """One page of the plan's tasks; cursor is "first" or the previous page's nextCursor"""
+    if not plan_tools:
+        return "MCP server not configured. Please set Azure credentials in .env file."
     
-    return str(result)
+    try:
+        result = await plan_tools.get_tasks_page_json(plan_id, None if cursor == "first" else cursor)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    return result.decode("utf-8")
 
 
 @mcp.resource("planner://plans/{plan_id}/buckets")
@@ -84,17 +150,104 @@ async def list_plan_buckets(plan_id: str) -> str:
     if not graph_client:
         return "MCP server not configured. Please set Azure credentials in .env file."
     
-    cache_key = f"plan_buckets:{plan_id}"
-    cached = await cache_manager.get(cache_key)
+    result = await plan_tools.get_plan_buckets_json(plan_id)
+    return result.decode("utf-8")
+
+
+@mcp.tool()
+async def get_plan_board(plan_id: str) -> Dict[str, Any]:
+    """Plan, buckets and tasks in one view: tasks grouped by bucket in board order, with counts"""
+    if not plan_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
+    
+    return await plan_tools.get_plan_board(plan_id)
+
+
+@mcp.tool()
+async def find_tasks(
+    plan_id: str,
+    bucket_id: Optional[str] = None,
+    assignee_id: Optional[str] = None,
+    due: Optional[str] = None,
+    state: Optional[str] = None,
+    include_details: bool = False,
+    include_assignees: bool = False
+) -> Dict[str, Any]:
+    """Tasks of a plan filtered by bucket, assignee, due (overdue, today, this_week, later, none) and state (not_started, in_progress, completed).
+    
+    include_details adds each task's description, checklist and references;
+    include_assignees adds the assigned users' display names.
+    """
+    if not plan_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
+    
+    try:
+        result = await plan_tools.find_tasks(plan_id, bucket_id, assignee_id, due, state)
+    except ValueError as e:
+        return {"error": str(e)}
+    
+    if include_details:
+        result["tasks"] = await task_tools.with_details(result["tasks"])
+    if include_assignees:
+        result["tasks"] = await user_directory.enrich(result["tasks"])
+    return result
+
+
+@mcp.tool()
+async def list_tasks_page(
+    plan_id: str,
+    cursor: Optional[str] = None,
+    page_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """A page of a plan's tasks in board order, for plans too large to read at once.
     
-    if cached:
-        return str(cached)
+    Returns total, nextCursor and tasks; pass nextCursor back to get the next
+    page until it is null. page_size defaults to TASK_PAGE_SIZE.
+    """
+    if not plan_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    buckets = await graph_client.get_plan_buckets(plan_id)
-    result = [bucket.to_dict() for bucket in buckets]
-    await cache_manager.set(cache_key, result)
+    try:
+        return json.loads(await plan_tools.get_tasks_page_json(plan_id, cursor, page_size))
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+async def resolve_users(user_ids: List[str]) -> Dict[str, Any]:
+    """Display name, mail and user principal name for user IDs, e.g. from task assignments"""
+    if not user_directory:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    return str(result)
+    return await user_directory.resolve(user_ids)
+
+
+@mcp.tool()
+async def group_task_rollup(
+    group_id: str,
+    ctx: Context,
+    report: str = "overdue",
+    assignee_id: Optional[str] = None,
+    within_days: int = 3
+) -> Dict[str, Any]:
+    """Tasks across every plan of a group.
+    
+    report: overdue, at_risk (due within `within_days`), assigned (open tasks
+    of `assignee_id`) or by_assignee (open task counts per user).
+    """
+    if not aggregation_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
+    
+    async def on_plan_done(done: int):
+        await ctx.report_progress(done)
+    
+    return await aggregation_tools.rollup(
+        group_id,
+        report=report,
+        assignee_id=assignee_id,
+        within_days=within_days,
+        on_plan_done=on_plan_done
+    )
 
 
 @mcp.tool()
@@ -104,8 +257,11 @@ async def create_task(
     bucket_id: Optional[str] = None,
     due_date: Optional[str] = None,
     priority: Optional[int] = None,
-    assignee_ids: Optional[List[str]] = None
+    assignee_ids: Optional[List[str]] = None,
+    description: Optional[str] = None,
+    idempotency_key: Optional[str] = None
 ) -> Dict[str, Any]:
+    """Create a task; repeating a call with the same idempotency_key returns the first result instead of a duplicate"""
     if not task_tools:
         return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
@@ -113,9 +269,11 @@ async def create_task(
         plan_id=plan_id,
         title=title,
         bucket_id=bucket_id,
+        description=description,
         due_date=due_date,
         priority=priority,
-        assignee_ids=assignee_ids
+        assignee_ids=assignee_ids,
+        idempotency_key=idempotency_key
     )
 
 
@@ -126,7 +284,8 @@ async def update_task(
     bucket_id: Optional[str] = None,
     percent_complete: Optional[int] = None,
     priority: Optional[int] = None,
-    due_date: Optional[str] = None
+    due_date: Optional[str] = None,
+    wait: bool = True
 ) -> Dict[str, Any]:
     if not task_tools:
         return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
@@ -143,7 +302,7 @@ async def update_task(
     if due_date:
         updates["dueDateTime"] = due_date
     
-    return await task_tools.update_task(task_id, updates)
+    return await task_tools.update_task(task_id, updates, wait=wait)
 
 
 @mcp.tool()
@@ -155,11 +314,11 @@ async def delete_task(task_id: str) -> Dict[str, Any]:
 
 
 @mcp.tool()
-async def move_task(task_id: str, target_bucket_id: str) -> Dict[str, Any]:
+async def move_task(task_id: str, target_bucket_id: str, wait: bool = True) -> Dict[str, Any]:
     if not task_tools:
         return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    return await task_tools.move_task(task_id, target_bucket_id)
+    return await task_tools.move_task(task_id, target_bucket_id, wait=wait)
 
 
 @mcp.tool()
@@ -167,22 +326,125 @@ async def get_task_details(task_id: str) -> Dict[str, Any]:
     if not graph_client:
         return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    cache_key = f"task:{task_id}"
-    cached = await cache_manager.get(cache_key)
+    return await task_tools.get_task_details(task_id)
+
+
+@mcp.tool()
+async def reorder_tasks(plan_id: str, bucket_id: str, task_ids: List[str]) -> Dict[str, Any]:
+    """Put tasks of a bucket in the given order (top first); unlisted tasks follow, listed tasks from other buckets are moved in"""
+    if not task_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    if cached:
-        return cached
+    try:
+        index = await plan_tools.task_index(plan_id)
+        return await task_tools.reorder_tasks(plan_id, bucket_id, task_ids, index)
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@mcp.tool()
+async def get_tasks_details(task_ids: List[str]) -> Dict[str, Any]:
+    """Description, checklist and references of many tasks, fetched in batches"""
+    if not task_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    task = await graph_client.get_task(task_id)
-    result = task.to_dict()
-    await cache_manager.set(cache_key, result)
+    return await task_tools.get_tasks_details(task_ids)
+
+
+@mcp.tool()
+async def update_task_details(
+    task_id: str,
+    description: Optional[str] = None,
+    preview_type: Optional[str] = None,
+    checklist: Optional[Dict[str, Any]] = None,
+    references: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Update a task's description, preview type, checklist or references (Graph plannerTaskDetails format)"""
+    if not task_tools:
+        return {"error": "MCP server not configured. Please set Azure credentials in .env file."}
     
-    return result
+    updates: Dict[str, Any] = {}
+    if description is not None:
+        updates["description"] = description
+    if preview_type:
+        updates["previewType"] = preview_type
+    if checklist:
+        updates["checklist"] = checklist
+    if references:
+        updates["references"] = references
+    
+    return await task_tools.update_task_details(task_id, updates)
+
+
+@mcp.tool()
+async def diagnostics_report(action: str = "loop", seconds: float = 5, limit: int = 20) -> Dict[str, Any]:
+    """Server diagnostics (needs DIAGNOSTICS_ENABLED): action is one of
+    loop (event loop lag and blocking calls), profile (CPU profile for
+    ``seconds``), memory (top allocations), memory_diff (changes since the
+    last memory call), memory_stop, tasks (running asyncio tasks)"""
+    if not diagnostics:
+        return {"error": "Diagnostics are disabled. Set DIAGNOSTICS_ENABLED=true."}
+    
+    if action == "loop":
+        return diagnostics.loop_status()
+    if action == "profile":
+        try:
+            return await diagnostics.profile(seconds, limit=limit)
+        except RuntimeError as e:
+            return {"error": str(e)}
+    if action == "memory":
+        return await diagnostics.memory(limit)
+    if action == "memory_diff":
+        return await diagnostics.memory_diff(limit)
+    if action == "memory_stop":
+        return {"stopped": diagnostics.stop_memory()}
+    if action == "tasks":
+        tasks = diagnostics.tasks()
+        return {"count": len(tasks), "tasks": tasks[:limit]}
+    return {"error": f"Unknown action '{action}'. Use loop, profile, memory, memory_diff, memory_stop or tasks."}
+
+
+async def warm_cache():
+    """Restore the cache snapshot, then preload configured plans and groups"""
+    if settings.cache_snapshot_path:
+        try:
+            await cache_manager.restore(settings.cache_snapshot_path)
+        except Exception as e:
+            logger.warning("cache_snapshot_restore_failed", error=str(e))
+    
+    if settings.preload_blocking:
+        await preloader.run()
+    else:
+        preloader.start()
+    if refresh_scheduler:
+        refresh_scheduler.start()
+
+
+async def run_stdio():
+    if diagnostics:
+        diagnostics.start()
+    if preloader:
+        await warm_cache()
+    try:
+        await mcp.run_stdio_async()
+    finally:
+        if preloader:
+            await preloader.stop()
+        if refresh_scheduler:
+            await refresh_scheduler.stop()
+        # Queued write-behind updates still have to reach Graph
+        if task_tools:
+            await task_tools.close()
+        if cache_manager and settings.cache_snapshot_path:
+            try:
+                await cache_manager.snapshot(settings.cache_snapshot_path)
+            except Exception as e:
+                logger.warning("cache_snapshot_write_failed", error=str(e))
+        if diagnostics:
+            diagnostics.stop()
 
 
 initialize_services()
 
 if __name__ == "__main__":
-    mcp.run(
-        transport="stdio"
-    )
+    asyncio.run(run_stdio())
@@ -0,0 +1,248 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+import httpx
+import structlog
+from src.graph.client import GraphAPIClient
+from src.graph.exceptions import GraphAPIError
+from src.graph.models import PLAN_FIELDS, TASK_LIST_FIELDS
+from src.cache.interface import CacheInterface
+
+logger = structlog.get_logger()
+
+REPORTS = ("overdue", "at_risk", "assigned", "by_assignee")
+
+# Graph accepts at most 20 sub-requests per $batch
+MAX_BATCH_SIZE = 20
+
+
+def _due(task: Dict[str, Any]) -> Optional[datetime]:
+    value = task.get("dueDateTime")
+    if not value:
+        return None
+    due = datetime.fromisoformat(value)
+    return due if due.tzinfo else due.replace(tzinfo=timezone.utc)
+
+
+def _is_open(task: Dict[str, Any]) -> bool:
+    return task.get("percentComplete", 0) < 100
+
+
+class AggregationTools:
+    """Rollups over every plan of a group.
+
+    Plan task lists come from the cache when present. The rest are fetched
+    concurrently, in $batch chunks, with at most ``max_concurrency`` Graph
+    requests in flight across all rollups. So the time taken follows the
+    slowest chunk, not the sum over all plans.
+    """
+    
+    def __init__(
+        self,
+        graph_client: GraphAPIClient,
+        cache: CacheInterface,
+        max_concurrency: int = 8,
+        batch_size: int = MAX_BATCH_SIZE
+    ):
+        self.graph = graph_client
+        self.cache = cache
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def get_group_plans(self, group_id: str) -> List[Dict[str, Any]]:
+        async def load():
+            async with self._semaphore:
+                plans = await self.graph.get_group_plans(group_id, select=PLAN_FIELDS)
+            return [plan.to_dict() for plan in plans]
+        
+        return await self.cache.get_or_load(f"group_plans:{group_id}", load)
+    
+    async def _load_chunk(
+        self,
+        plans: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]], Optional[str]]]:
+        plan_ids = [plan["id"] for plan in plans]
+        generations = await self.cache.generations([f"plan_tasks:{plan_id}" for plan_id in plan_ids])
+        
+        async with self._semaphore:
+            try:
+                if len(plan_ids) == 1:
+                    fetched = {plan_ids[0]: await self.graph.get_plan_tasks(plan_ids[0], select=TASK_LIST_FIELDS)}
+                else:
+                    fetched = await self.graph.get_plans_tasks(plan_ids, select=TASK_LIST_FIELDS)
+            except (GraphAPIError, httpx.TransportError, asyncio.TimeoutError) as e:
+                # Reported per plan, like a failed sub-request, so the rollup goes on
+                fetched = {plan_id: e for plan_id in plan_ids}
+        
+        results = []
+        to_cache = {}
+        for plan in plans:
+            outcome = fetched.get(plan["id"], GraphAPIError("No response for plan in batch"))
+            if isinstance(outcome, Exception):
+                error = str(outcome) or type(outcome).__name__
+                logger.warning("rollup_plan_failed", plan_id=plan["id"], error=error)
+                results.append((plan, None, error))
+            else:
+                tasks = [task.to_dict() for task in outcome]
+                to_cache[f"plan_tasks:{plan['id']}"] = tasks
+                results.append((plan, tasks, None))
+        
+        if to_cache:
+            await self.cache.set_many_if_unchanged(to_cache, generations)
+        return results
+    
+    async def iter_group_plan_tasks(
+        self,
+        group_id: str
+    ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]], Optional[str]]]:
+        """Yield ``(plan, tasks, error)`` for every plan of a group as soon as it is available"""
+        plans = await self.get_group_plans(group_id)
+        cached = await self.cache.get_many([f"plan_tasks:{plan['id']}" for plan in plans])
+        
+        missing = []
+        for plan in plans:
+            tasks = cached.get(f"plan_tasks:{plan['id']}")
+            if tasks is not None:
+                yield plan, tasks, None
+            else:
+                missing.append(plan)
+        
+        pending = [
+            asyncio.ensure_future(self._load_chunk(missing[i:i + self.batch_size]))
+            for i in range(0, len(missing), self.batch_size)
+        ]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                for result in await next_done:
+                    yield result
+        finally:
+            # The consumer stopped early (e.g. client disconnected)
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _matches(
+        task: Dict[str, Any],
+        report: str,
+        now: datetime,
+        within: timedelta,
+        assignee_id: Optional[str]
+    ) -> bool:
+        if assignee_id and assignee_id not in (task.get("assignments") or {}):
+            return False
+        
+        if report == "overdue":
+            due = _due(task)
+            return _is_open(task) and due is not None and due < now
+        if report == "at_risk":
+            due = _due(task)
+            return _is_open(task) and due is not None and now <= due <= now + within
+        # assigned, by_assignee: every open task
+        return _is_open(task)
+    
+    async def iter_rollup(
+        self,
+        group_id: str,
+        report: str = "overdue",
+        assignee_id: Optional[str] = None,
+        within_days: int = 3
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream one ``plan`` event per plan as it completes, then a ``summary`` event.
+        
+        Matching tasks are only sent in their plan's event; the summary
+        carries counts (and, for by_assignee, per-user totals), so nothing
+        is held back until the end.
+        """
+        if report not in REPORTS:
+            raise ValueError(f"Unknown report '{report}', expected one of {', '.join(REPORTS)}")
+        if report == "assigned" and not assignee_id:
+            raise ValueError("The 'assigned' report requires an assignee_id")
+        
+        now = datetime.now(timezone.utc)
+        within = timedelta(days=within_days)
+        failed: List[Dict[str, Any]] = []
+        plan_count = 0
+        matched = 0
+        assignees: Dict[str, Dict[str, Any]] = {}
+        unassigned = 0
+        
+        async for plan, tasks, error in self.iter_group_plan_tasks(group_id):
+            plan_count += 1
+            if error:
+                failed.append({"planId": plan["id"], "error": error})
+                yield {"type": "plan", "planId": plan["id"], "planTitle": plan.get("title"), "error": error}
+                continue
+            
+            plan_matches = [
+                {**task, "planTitle": plan.get("title")}
+                for task in tasks
+                if self._matches(task, report, now, within, assignee_id)
+            ]
+            matched += len(plan_matches)
+            if report == "by_assignee":
+                for task in plan_matches:
+                    users = list((task.get("assignments") or {}).keys())
+                    if not users:
+                        unassigned += 1
+                    for user_id in users:
+                        entry = assignees.setdefault(user_id, {"count": 0, "overdue": 0, "plans": set()})
+                        entry["count"] += 1
+                        entry["plans"].add(plan["id"])
+                        due = _due(task)
+                        if due is not None and due < now:
+                            entry["overdue"] += 1
+            yield {
+                "type": "plan",
+                "planId": plan["id"],
+                "planTitle": plan.get("title"),
+                "count": len(plan_matches),
+                "tasks": plan_matches
+            }
+        
+        summary: Dict[str, Any] = {
+            "type": "summary",
+            "groupId": group_id,
+            "report": report,
+            "generatedAt": now.isoformat(),
+            "plans": {"total": plan_count, "failed": failed},
+            "count": matched
+        }
+        if report == "by_assignee":
+            summary["assignees"] = {
+                user_id: {"count": e["count"], "overdue": e["overdue"], "plans": len(e["plans"])}
+                for user_id, e in sorted(assignees.items(), key=lambda item: -item[1]["count"])
+            }
+            summary["unassigned"] = unassigned
+        
+        logger.info("rollup_completed", group_id=group_id, report=report, plans=plan_count, matched=matched)
+        yield summary
+    
+    async def rollup(
+        self,
+        group_id: str,
+        report: str = "overdue",
+        assignee_id: Optional[str] = None,
+        within_days: int = 3,
+        on_plan_done=None
+    ) -> Dict[str, Any]:
+        """Run a rollup to completion; ``on_plan_done(done)`` is awaited after each plan.
+        
+        Returns the summary with the matching tasks of all plans under
+        ``tasks`` (earliest due first), except for by_assignee.
+        """
+        done = 0
+        summary: Dict[str, Any] = {}
+        tasks: List[Dict[str, Any]] = []
+        async for event in self.iter_rollup(group_id, report, assignee_id, within_days):
+            if event["type"] == "summary":
+                summary = event
+                continue
+            if report != "by_assignee":
+                tasks.extend(event.get("tasks", ()))
+            done += 1
+            if on_plan_done:
+                await on_plan_done(done)
+        
+        if report != "by_assignee":
+            summary["tasks"] = sorted(tasks, key=lambda task: task.get("dueDateTime") or "~")
+        return summary
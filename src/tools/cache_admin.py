@@ -0,0 +1,111 @@
+from typing import Any, Dict, Iterable, List, Optional
+import structlog
+from src.cache.interface import CacheInterface
+from src.tools.plan_tools import PlanTools
+from src.tools.refresh import PLAN_KEY_PREFIXES
+
+logger = structlog.get_logger()
+
+# Keys of one task; a plan purge includes them for the plan's cached tasks
+TASK_KEY_PREFIXES = ("task:", "task_details:")
+
+
+def key_tags(key: str) -> List[str]:
+    """Tags of a cache key: its kind (the prefix, e.g. ``plan_board``) and what it belongs to.
+
+    ``plan:<id>`` marks a plan's plan, bucket, task and board entries,
+    ``group:<id>`` a group's plan list and ``task:<id>`` a task and its details.
+    """
+    kind, _, ident = key.partition(":")
+    tags = [kind]
+    if key.startswith(PLAN_KEY_PREFIXES):
+        tags.append(f"plan:{ident}")
+    elif key.startswith("group_plans:"):
+        tags.append(f"group:{ident}")
+    elif key.startswith(TASK_KEY_PREFIXES):
+        tags.append(f"task:{ident}")
+    return tags
+
+
+class CacheAdmin:
+    """Inspect and repair the cache without clearing all of it.
+
+    Purges go through ``invalidate``, so loads already in flight for the
+    purged keys do not put the old data back, and a purged plan's task
+    index is dropped with it; imports do the same for the keys they store.
+    Every backend supports listing, pins, export and import; with Redis a
+    pin lasts until the key is written again.
+    """
+    
+    def __init__(self, cache: CacheInterface, plan_tools: Optional[PlanTools] = None):
+        self.cache = cache
+        self.plan_tools = plan_tools
+    
+    async def list_keys(self, prefix: str = "", tag: Optional[str] = None, limit: int = 1000) -> Dict[str, Any]:
+        # A tag filter is applied after the prefix, so the limit counts matching keys
+        entries = await self.cache.entries(prefix, limit if tag is None else None)
+        if tag is not None:
+            entries = [entry for entry in entries if tag in key_tags(entry["key"])][:limit]
+        for entry in entries:
+            entry["tags"] = key_tags(entry["key"])
+        return {
+            "count": len(entries),
+            "bytes": sum(entry["bytes"] for entry in entries),
+            "entries": entries
+        }
+    
+    async def _plan_task_keys(self, plan_id: str) -> List[str]:
+        tasks = await self.cache.get(f"plan_tasks:{plan_id}") or []
+        return [f"{prefix}{task['id']}" for task in tasks for prefix in TASK_KEY_PREFIXES]
+    
+    async def purge(
+        self,
+        prefix: Optional[str] = None,
+        plan_id: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Delete the keys matching all given filters; at least one is required"""
+        if prefix is None and plan_id is None and tag is None:
+            raise ValueError("Give a prefix, plan_id or tag to purge")
+        
+        stored = await self.cache.keys(prefix or "")
+        keys = stored
+        if tag is not None:
+            keys = [key for key in keys if tag in key_tags(key)]
+        if plan_id is not None:
+            plan_keys = {key for key in keys if f"plan:{plan_id}" in key_tags(key)}
+            # The plan's tasks, as far as the cache knows them
+            if prefix is None and tag is None:
+                stored_keys = set(stored)
+                plan_keys.update(key for key in await self._plan_task_keys(plan_id) if key in stored_keys)
+            keys = sorted(plan_keys)
+            if self.plan_tools:
+                self.plan_tools.indexes.discard(plan_id)
+        
+        await self.cache.invalidate(keys)
+        logger.info("cache_purged", prefix=prefix, plan_id=plan_id, tag=tag, keys=len(keys))
+        return {"purged": len(keys), "keys": keys}
+    
+    async def pin(self, keys: Iterable[str], pinned: bool = True) -> Dict[str, Any]:
+        keys = list(keys)
+        changed = await self.cache.pin(keys, pinned)
+        return {"keys": keys, "pinned": pinned, "changed": changed}
+    
+    async def export(self, prefix: str = "") -> bytes:
+        return await self.cache.export_entries(prefix)
+    
+    async def import_(self, data: bytes) -> Dict[str, Any]:
+        """Store exported entries, replacing existing ones.
+
+        As with a purge, loads already in flight for the imported keys do
+        not overwrite them, and the task indexes of the plans they belong
+        to are dropped, to be rebuilt from the imported tasks.
+        """
+        keys = await self.cache.import_entries(data)
+        await self.cache.bump_generations(keys)
+        plan_ids = {tag.partition(":")[2] for key in keys for tag in key_tags(key) if tag.startswith("plan:")}
+        if self.plan_tools:
+            for plan_id in plan_ids:
+                self.plan_tools.indexes.discard(plan_id)
+        logger.info("cache_imported", entries=len(keys), plans=len(plan_ids))
+        return {"imported": len(keys)}
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set
+import structlog
+from src.cache.interface import CacheInterface
+
+logger = structlog.get_logger()
+
+
+def new_entry(plan_id: str, title: str, bucket_id: Optional[str]) -> Dict[str, Any]:
+    """A pending create: what reconciliation needs to find the task it made"""
+    return {
+        "state": "pending",
+        "planId": plan_id,
+        "title": title,
+        "bucketId": bucket_id,
+        "startedAt": time.time(),
+        "task": None
+    }
+
+
+class CreateLedger:
+    """Recent task creates by idempotency key.
+
+    An entry is ``pending`` from the first attempt until the task is known
+    to exist, then ``created`` with the task. A created entry keeps the
+    task's ``description`` until it is written to the task's details, so a
+    replay can finish a create whose details write failed. Entries are kept for ``ttl``
+    seconds, at most ``max_entries`` of them. With a ``path`` the ledger is
+    saved after every change and loaded on startup, so a create that was
+    interrupted by a restart is reconciled instead of repeated. Saves run
+    in a thread, and changes made while one runs are written together by
+    the next; each change returns once a save that includes it is done.
+    """
+    
+    def __init__(self, ttl: int = 86400, path: str = "", max_entries: int = 10000):
+        self.ttl = ttl
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty = False
+        self._saver: Optional[asyncio.Future] = None
+        if path:
+            self._load()
+    
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self._entries = OrderedDict(json.load(f))
+            self._expire()
+            logger.info("loaded_create_ledger", entries=len(self._entries))
+        except Exception as e:
+            logger.warning("failed_to_load_create_ledger", error=str(e))
+    
+    def _write(self, data: str) -> None:
+        # Write-then-rename so a crash never leaves a partial ledger
+        tmp_file = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(data)
+        os.replace(tmp_file, self.path)
+    
+    async def _save_changes(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, json.dumps(self._entries))
+            except Exception as e:
+                logger.warning("failed_to_save_create_ledger", error=str(e))
+    
+    async def _save(self) -> None:
+        if not self.path:
+            return
+        self._dirty = True
+        if self._saver is None or self._saver.done():
+            self._saver = asyncio.ensure_future(self._save_changes())
+        # The saver runs until nothing is left unsaved, so this change is on disk when it ends
+        await asyncio.shield(self._saver)
+    
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry["startedAt"] >= cutoff and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self._expire()
+        return self._entries.get(key)
+    
+    async def start(self, key: str, plan_id: str, title: str, bucket_id: Optional[str]) -> Dict[str, Any]:
+        entry = new_entry(plan_id, title, bucket_id)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._expire()
+        await self._save()
+        return entry
+    
+    async def complete(self, key: str, task: Dict[str, Any], description: Optional[str] = None) -> None:
+        """Record the created task, with the description still to be written (if any)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry["state"] = "created"
+            entry["task"] = task
+            entry["description"] = description
+            await self._save()
+    
+    async def described(self, key: str) -> None:
+        """The created task's description has been written"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.get("description") is not None:
+            entry["description"] = None
+            await self._save()
+    
+    async def discard(self, key: str) -> None:
+        """Forget a create that definitely failed, so the key can be used again"""
+        if self._entries.pop(key, None) is not None:
+            await self._save()
+    
+    async def claimed(self, task_ids: Iterable[str]) -> Set[str]:
+        """Those of ``task_ids`` already matched to a key; reconciliation must not match them again"""
+        task_ids = set(task_ids)
+        return {
+            entry["task"]["id"] for entry in self._entries.values()
+            if entry.get("task") and entry["task"]["id"] in task_ids
+        }
+
+
+class CacheCreateLedger:
+    """A CreateLedger kept in a shared cache, for several worker processes.
+
+    Workers behind one port get a client's retries in turn, so each must
+    see the keys the others recorded. Entries are stored as
+    ``create_ledger:<key>`` and each created task as ``create_claim:<task
+    id>``, both expiring ``ttl`` seconds after the create started; the
+    methods are those of CreateLedger.
+    """
+    
+    ENTRY_PREFIX = "create_ledger:"
+    CLAIM_PREFIX = "create_claim:"
+    
+    def __init__(self, cache: CacheInterface, ttl: int = 86400):
+        self.cache = cache
+        self.ttl = ttl
+    
+    def _ttl(self, entry: Dict[str, Any]) -> int:
+        return max(1, int(entry["startedAt"] + self.ttl - time.time()))
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.cache.get(self.ENTRY_PREFIX + key)
+    
+    async def start(self, key: str, plan_id: str, title: str, bucket_id: Optional[str]) -> Dict[str, Any]:
+        entry = new_entry(plan_id, title, bucket_id)
+        await self.cache.set(self.ENTRY_PREFIX + key, entry, self._ttl(entry))
+        return entry
+    
+    async def complete(self, key: str, task: Dict[str, Any], description: Optional[str] = None) -> None:
+        entry = await self.get(key)
+        if entry is not None:
+            entry["state"] = "created"
+            entry["task"] = task
+            entry["description"] = description
+            await self.cache.set(self.ENTRY_PREFIX + key, entry, self._ttl(entry))
+            await self.cache.set(self.CLAIM_PREFIX + task["id"], key, self._ttl(entry))
+    
+    async def described(self, key: str) -> None:
+        entry = await self.get(key)
+        if entry is not None and entry.get("description") is not None:
+            entry["description"] = None
+            await self.cache.set(self.ENTRY_PREFIX + key, entry, self._ttl(entry))
+    
+    async def discard(self, key: str) -> None:
+        await self.cache.delete(self.ENTRY_PREFIX + key)
+    
+    async def claimed(self, task_ids: Iterable[str]) -> Set[str]:
+        found = await self.cache.get_many([self.CLAIM_PREFIX + task_id for task_id in task_ids])
+        return {key[len(self.CLAIM_PREFIX):] for key in found}
@@ -0,0 +1,162 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Tuple
+import structlog
+from src.graph.client import GraphAPIClient
+from src.graph.exceptions import GraphAPIError
+from src.graph.models import PLAN_FIELDS, BUCKET_FIELDS, TASK_LIST_FIELDS
+
+logger = structlog.get_logger()
+
+# Records of a plan, in the order they are emitted
+RECORD_TYPES = ("plan", "bucket", "task", "task_details")
+
+# Graph accepts at most 20 sub-requests per $batch
+DETAILS_BATCH_SIZE = 20
+
+_END = object()
+
+
+def record(kind: str, plan_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": kind, "planId": plan_id, "data": data}
+
+
+class PlanExporter:
+    """Streams every plan, bucket, task and (optionally) task details of a set of plans.
+
+    Records come straight from Graph through the paginated client, so an
+    export neither reads stale data from the cache nor pushes the working
+    set out of it. Up to ``concurrency`` plans are fetched at once, each
+    into a queue of at most ``buffer_pages`` pages, and the output is
+    written one plan at a time: a plan's records are followed by a
+    ``plan_done`` record with its counts before the next plan's begin. A
+    consumer can therefore checkpoint at each ``plan_done``, and memory use
+    stays bounded by the queues whatever the size of the plans.
+
+    A plan that fails before any of its records went out gives an ``error``
+    record and the export moves on. A failure part way through a plan gives
+    an ``error`` record with ``partial: true`` and ends the export, as the
+    records already sent for that plan are incomplete. A task whose details
+    cannot be read gives an ``error`` record with its ``taskId`` in place
+    of the details, and the plan carries on.
+    """
+    
+    def __init__(
+        self,
+        graph_client: GraphAPIClient,
+        concurrency: int = 4,
+        buffer_pages: int = 4
+    ):
+        self.graph = graph_client
+        self.concurrency = max(1, concurrency)
+        self.buffer_pages = max(1, buffer_pages)
+    
+    async def _plan_ids(self, plan_ids: Iterable[str], group_ids: Iterable[str]) -> AsyncIterator[str]:
+        seen = set()
+        for plan_id in plan_ids:
+            if plan_id not in seen:
+                seen.add(plan_id)
+                yield plan_id
+        for group_id in group_ids:
+            for plan in await self.graph.get_group_plans(group_id, select=["id"]):
+                if plan.id not in seen:
+                    seen.add(plan.id)
+                    yield plan.id
+    
+    async def _details(self, plan_id: str, task_ids: List[str]) -> List[Dict[str, Any]]:
+        """Details records of the tasks; an ``error`` record for each task whose sub-request failed"""
+        chunks = [task_ids[i:i + DETAILS_BATCH_SIZE] for i in range(0, len(task_ids), DETAILS_BATCH_SIZE)]
+        results = await asyncio.gather(*(self.graph.get_tasks_details(chunk) for chunk in chunks))
+        records = []
+        for result in results:
+            for task_id, details in result.items():
+                if isinstance(details, GraphAPIError):
+                    logger.warning("export_task_details_failed", plan_id=plan_id, task_id=task_id, error=str(details))
+                    records.append({"type": "error", "planId": plan_id, "taskId": task_id, "error": str(details), "partial": False})
+                else:
+                    records.append(record("task_details", plan_id, details.to_dict()))
+        return records
+    
+    async def _fetch_plan(self, plan_id: str, include_details: bool, queue: asyncio.Queue) -> None:
+        """Put the plan's records on ``queue`` a page at a time, then its counts (or the error)"""
+        counts = {kind: 0 for kind in RECORD_TYPES}
+        
+        async def put(records: List[Dict[str, Any]]):
+            if records:
+                for item in records:
+                    if item["type"] in counts:
+                        counts[item["type"]] += 1
+                await queue.put(records)
+        
+        try:
+            plan, buckets = await asyncio.gather(
+                self.graph.get_plan(plan_id, select=PLAN_FIELDS),
+                self.graph.get_plan_buckets(plan_id, select=BUCKET_FIELDS)
+            )
+            await put([record("plan", plan_id, plan.to_dict())])
+            await put([record("bucket", plan_id, bucket.to_dict()) for bucket in buckets])
+            
+            async for page in self.graph.iter_plan_tasks(plan_id, select=TASK_LIST_FIELDS):
+                await put([record("task", plan_id, task.to_dict()) for task in page])
+                if include_details and page:
+                    await put(await self._details(plan_id, [task.id for task in page]))
+            await queue.put(counts)
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(_END)
+    
+    async def export(
+        self,
+        plan_ids: Iterable[str] = (),
+        group_ids: Iterable[str] = (),
+        include_details: bool = False,
+        skip_plan_ids: Iterable[str] = ()
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the records of the given plans and every plan of the given groups, in plan order.
+
+        Plans in ``skip_plan_ids`` (e.g. those a resumed export already has)
+        are left out.
+        """
+        skip = set(skip_plan_ids)
+        plans = (plan_id async for plan_id in self._plan_ids(plan_ids, group_ids) if plan_id not in skip)
+        running: Deque[Tuple[str, asyncio.Queue, asyncio.Task]] = deque()
+        exhausted = False
+        exported = failed = 0
+        
+        try:
+            while True:
+                # Keep up to `concurrency` plans fetching ahead of the one being written
+                while not exhausted and len(running) < self.concurrency:
+                    try:
+                        plan_id = await plans.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    queue: asyncio.Queue = asyncio.Queue(self.buffer_pages)
+                    running.append((plan_id, queue, asyncio.create_task(self._fetch_plan(plan_id, include_details, queue))))
+                if not running:
+                    break
+                
+                plan_id, queue, _ = running[0]
+                sent = False
+                while (item := await queue.get()) is not _END:
+                    if isinstance(item, Exception):
+                        failed += 1
+                        logger.warning("export_plan_failed", plan_id=plan_id, error=str(item), partial=sent)
+                        yield {"type": "error", "planId": plan_id, "error": str(item), "partial": sent}
+                        if sent:
+                            return
+                    elif isinstance(item, dict):
+                        exported += 1
+                        yield {"type": "plan_done", "planId": plan_id, "counts": item}
+                    else:
+                        sent = True
+                        for item_record in item:
+                            yield item_record
+                running.popleft()
+        finally:
+            # Finished, failed, or the consumer went away
+            for _, _, task in running:
+                task.cancel()
+            await asyncio.gather(*(task for _, _, task in running), return_exceptions=True)
+            logger.info("export_finished", plans=exported, failed=failed)
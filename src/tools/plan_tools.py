@@ -0,0 +1,239 @@
+import asyncio
+import base64
+import binascii
+import json
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+import structlog
+from src.graph.client import GraphAPIClient
+from src.graph.models import (
+    PlannerPlan,
+    PlannerBucket,
+    PlannerTask,
+    PLAN_FIELDS,
+    BUCKET_FIELDS,
+    TASK_LIST_FIELDS
+)
+from src.cache.interface import CacheInterface
+from src.tools.task_index import PlanTaskIndex, TaskIndexes, order_key
+
+logger = structlog.get_logger()
+
+
+def encode_cursor(plan_id: str, after: Tuple) -> str:
+    """Opaque cursor for the task page after order key ``after``"""
+    data = json.dumps({"plan": plan_id, "after": list(after)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(plan_id: str, cursor: str) -> Tuple:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        no_hint, hint, task_id = data["after"]
+        if data["plan"] != plan_id:
+            raise ValueError
+        return (bool(no_hint), str(hint), str(task_id))
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError):
+        raise ValueError("Invalid cursor for this plan") from None
+
+
+def build_board(
+    plan: PlannerPlan,
+    buckets: List[PlannerBucket],
+    tasks: List[PlannerTask]
+) -> Dict[str, Any]:
+    """Join a plan's buckets and tasks into a board: tasks grouped per bucket in display order"""
+    columns: Dict[Optional[str], Dict[str, Any]] = {}
+    for bucket in sorted((b.to_dict() for b in buckets), key=order_key):
+        columns[bucket["id"]] = {**bucket, "taskCount": 0, "completedCount": 0, "tasks": []}
+    
+    counts = {"tasks": 0, "completed": 0, "inProgress": 0, "notStarted": 0}
+    for task in tasks:
+        task_dict = task.to_dict()
+        # Tasks without a (known) bucket are collected in a trailing column
+        bucket_id = task.bucket_id if task.bucket_id in columns else None
+        if bucket_id is None and None not in columns:
+            columns[None] = {"id": None, "name": "No bucket", "taskCount": 0, "completedCount": 0, "tasks": []}
+        
+        column = columns[bucket_id]
+        column["tasks"].append(task_dict)
+        column["taskCount"] += 1
+        
+        counts["tasks"] += 1
+        if task.percent_complete >= 100:
+            counts["completed"] += 1
+            column["completedCount"] += 1
+        elif task.percent_complete > 0:
+            counts["inProgress"] += 1
+        else:
+            counts["notStarted"] += 1
+    
+    for column in columns.values():
+        column["tasks"].sort(key=order_key)
+    
+    counts["buckets"] = len(buckets)
+    return {
+        "plan": plan.to_dict(),
+        "buckets": list(columns.values()),
+        "counts": counts
+    }
+
+
+class PlanTools:
+    def __init__(
+        self,
+        graph_client: GraphAPIClient,
+        cache: CacheInterface,
+        indexes: Optional[TaskIndexes] = None,
+        task_page_size: int = 100,
+        task_page_max_size: int = 1000
+    ):
+        self.graph = graph_client
+        self.cache = cache
+        self.indexes = indexes or TaskIndexes()
+        self.task_page_size = task_page_size
+        self.task_page_max_size = task_page_max_size
+    
+    async def _load_plan(self, plan_id: str) -> Dict[str, Any]:
+        plan = await self.graph.get_plan(plan_id, select=PLAN_FIELDS)
+        return plan.to_dict()
+    
+    async def _load_tasks(self, plan_id: str) -> List[Dict[str, Any]]:
+        tasks = await self.graph.get_plan_tasks(plan_id, select=TASK_LIST_FIELDS)
+        return [task.to_dict() for task in tasks]
+    
+    async def _load_buckets(self, plan_id: str) -> List[Dict[str, Any]]:
+        buckets = await self.graph.get_plan_buckets(plan_id, select=BUCKET_FIELDS)
+        return [bucket.to_dict() for bucket in buckets]
+    
+    # The *_json variants return the cached JSON bytes, for handlers that
+    # send them on as they are
+    
+    async def get_plan_json(self, plan_id: str) -> bytes:
+        return await self.cache.get_or_load_raw(f"plan:{plan_id}", lambda: self._load_plan(plan_id))
+    
+    async def get_plan_tasks_json(self, plan_id: str) -> bytes:
+        return await self.cache.get_or_load_raw(f"plan_tasks:{plan_id}", lambda: self._load_tasks(plan_id))
+    
+    async def get_plan_buckets_json(self, plan_id: str) -> bytes:
+        return await self.cache.get_or_load_raw(f"plan_buckets:{plan_id}", lambda: self._load_buckets(plan_id))
+    
+    async def get_plan_tasks(self, plan_id: str) -> List[Dict[str, Any]]:
+        return await self.cache.get_or_load(f"plan_tasks:{plan_id}", lambda: self._load_tasks(plan_id))
+    
+    async def _load_board(self, plan_id: str) -> Dict[str, Any]:
+        views = {
+            f"plan:{plan_id}": None,
+            f"plan_buckets:{plan_id}": None,
+            f"plan_tasks:{plan_id}": None
+        }
+        generations = await self.cache.generations(views)
+        
+        plan, buckets, tasks = await asyncio.gather(
+            self.graph.get_plan(plan_id, select=PLAN_FIELDS),
+            self.graph.get_plan_buckets(plan_id, select=BUCKET_FIELDS),
+            self.graph.get_plan_tasks(plan_id, select=TASK_LIST_FIELDS)
+        )
+        board = build_board(plan, buckets, tasks)
+        
+        # The individual views were fetched with the same projections, so
+        # populate them too
+        views[f"plan:{plan_id}"] = plan.to_dict()
+        views[f"plan_buckets:{plan_id}"] = [bucket.to_dict() for bucket in buckets]
+        views[f"plan_tasks:{plan_id}"] = [task.to_dict() for task in tasks]
+        await self.cache.set_many_if_unchanged(views, generations)
+        
+        logger.info("plan_board_built", plan_id=plan_id, buckets=len(buckets), tasks=len(tasks))
+        return board
+    
+    async def get_plan_board(self, plan_id: str) -> Dict[str, Any]:
+        return await self.cache.get_or_load(f"plan_board:{plan_id}", lambda: self._load_board(plan_id))
+    
+    async def get_plan_board_json(self, plan_id: str) -> bytes:
+        return await self.cache.get_or_load_raw(f"plan_board:{plan_id}", lambda: self._load_board(plan_id))
+    
+    async def refresh_plan(self, plan_id: str) -> None:
+        """Re-fetch a plan's board and views, replacing the cached copies"""
+        key = f"plan_board:{plan_id}"
+        generation = await self.cache.generation(key)
+        board = await self._load_board(plan_id)
+        await self.cache.set_if_unchanged(key, board, generation)
+        # Rebuilt from the fresh task list on next use
+        self.indexes.discard(plan_id)
+    
+    async def iter_plan_tasks(self, plan_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield a plan's tasks page by page as Graph returns them.
+        
+        A cached list is yielded as a single page. A listing that ran to the
+        end is cached, so the next call does not go to Graph.
+        """
+        cache_key = f"plan_tasks:{plan_id}"
+        cached = await self.cache.get(cache_key)
+        
+        if cached is not None:
+            yield cached
+            return
+        
+        generation = await self.cache.generation(cache_key)
+        tasks: List[Dict[str, Any]] = []
+        async for page in self.graph.iter_plan_tasks(plan_id, select=TASK_LIST_FIELDS):
+            items = [task.to_dict() for task in page]
+            tasks.extend(items)
+            yield items
+        
+        await self.cache.set_if_unchanged(cache_key, tasks, generation)
+    
+    async def find_tasks(
+        self,
+        plan_id: str,
+        bucket_id: Optional[str] = None,
+        assignee_id: Optional[str] = None,
+        due: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Tasks of a plan matching every given filter, served from the plan's task index.
+        
+        ``due`` is one of overdue, today, this_week, later or none; ``state``
+        one of not_started, in_progress or completed.
+        """
+        index = await self.task_index(plan_id)
+        tasks = sorted(index.query(bucket_id, assignee_id, due, state), key=order_key)
+        return {"planId": plan_id, "count": len(tasks), "tasks": tasks}
+    
+    async def get_tasks_page_json(
+        self,
+        plan_id: str,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None
+    ) -> bytes:
+        """One page of a plan's tasks in board order, as JSON bytes.
+        
+        ``{"planId", "total", "pageSize", "nextCursor", "tasks"}``; pass
+        ``nextCursor`` back for the following page, it is None on the last.
+        Pages are cut from the plan's task index and joined from each task's
+        cached encoding, so the full list is not serialized per read.
+        Raises ValueError for a cursor that is malformed or from another plan.
+        """
+        after = decode_cursor(plan_id, cursor) if cursor else None
+        size = min(max(page_size or self.task_page_size, 1), self.task_page_max_size)
+        index = await self.task_index(plan_id)
+        task_ids, last = index.page(after, size)
+        head = json.dumps({
+            "planId": plan_id,
+            "total": len(index.tasks),
+            "pageSize": size,
+            "nextCursor": encode_cursor(plan_id, last) if last is not None else None
+        }, separators=(",", ":"))
+        return b"".join([
+            head[:-1].encode("utf-8"),
+            b',"tasks":[',
+            b",".join(index.encoded(task_id) for task_id in task_ids),
+            b"]}"
+        ])
+    
+    async def get_plan_task(self, plan_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        """A task of the plan by ID, from the plan's task index"""
+        index = await self.task_index(plan_id)
+        return index.get(task_id)
+    
+    async def task_index(self, plan_id: str) -> PlanTaskIndex:
+        return await self.indexes.get(plan_id, lambda: self.get_plan_tasks(plan_id))
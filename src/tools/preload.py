@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import structlog
+from src.tools.plan_tools import PlanTools
+from src.tools.aggregation_tools import AggregationTools
+
+logger = structlog.get_logger()
+
+
+class CachePreloader:
+    """Warms the cache with configured plans and groups after startup.
+
+    Group plan lists are loaded first and their plans added to the
+    configured ones; every plan's board is then loaded, which also fills
+    the plan, bucket and task views. At most ``concurrency`` plans are
+    loaded at a time. Everything goes through the cache's ``get_or_load``,
+    so entries restored from a snapshot are not fetched again, and requests
+    arriving meanwhile share loads with the preload instead of repeating
+    them.
+    """
+    
+    def __init__(
+        self,
+        plan_tools: PlanTools,
+        aggregation_tools: AggregationTools,
+        plan_ids: Iterable[str] = (),
+        group_ids: Iterable[str] = (),
+        concurrency: int = 4
+    ):
+        self.plan_tools = plan_tools
+        self.aggregation_tools = aggregation_tools
+        self.plan_ids = list(plan_ids)
+        self.group_ids = list(group_ids)
+        self.concurrency = max(1, concurrency)
+        self.status: Dict[str, Any] = {
+            "state": "idle",
+            "groups": {"total": len(self.group_ids), "done": 0, "failed": 0},
+            "plans": {"total": len(self.plan_ids), "done": 0, "failed": 0},
+            "errors": []
+        }
+        self._task: Optional[asyncio.Task] = None
+    
+    def _failed(self, kind: str, item_id: str, error: Exception) -> None:
+        self.status[kind]["failed"] += 1
+        # Keep the health payload small
+        if len(self.status["errors"]) < 20:
+            self.status["errors"].append({"type": kind[:-1], "id": item_id, "error": str(error)})
+        logger.warning("preload_failed", kind=kind[:-1], id=item_id, error=str(error))
+    
+    async def _preload_group(self, group_id: str, semaphore: asyncio.Semaphore) -> List[str]:
+        async with semaphore:
+            try:
+                plans = await self.aggregation_tools.get_group_plans(group_id)
+            except Exception as e:
+                self._failed("groups", group_id, e)
+                return []
+        self.status["groups"]["done"] += 1
+        return [plan["id"] for plan in plans]
+    
+    async def _preload_plan(self, plan_id: str, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                await self.plan_tools.get_plan_board(plan_id)
+            except Exception as e:
+                self._failed("plans", plan_id, e)
+                return
+        self.status["plans"]["done"] += 1
+    
+    async def run(self) -> Dict[str, Any]:
+        """Preload everything configured; returns the final status"""
+        if not self.plan_ids and not self.group_ids:
+            self.status["state"] = "disabled"
+            return self.status
+        
+        started = time.monotonic()
+        self.status["state"] = "running"
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        group_plans = await asyncio.gather(*(self._preload_group(group_id, semaphore) for group_id in self.group_ids))
+        # dict.fromkeys keeps the configured order and drops duplicates
+        plan_ids = list(dict.fromkeys(self.plan_ids + [plan_id for ids in group_plans for plan_id in ids]))
+        self.status["plans"]["total"] = len(plan_ids)
+        
+        await asyncio.gather(*(self._preload_plan(plan_id, semaphore) for plan_id in plan_ids))
+        
+        self.status["state"] = "done"
+        self.status["seconds"] = round(time.monotonic() - started, 3)
+        logger.info(
+            "preload_completed",
+            plans=self.status["plans"]["done"],
+            failed=self.status["plans"]["failed"] + self.status["groups"]["failed"],
+            seconds=self.status["seconds"]
+        )
+        return self.status
+    
+    def start(self) -> asyncio.Task:
+        """Run the preload in the background"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+    
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self.status["state"] = "cancelled"
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+import structlog
+from src.graph.client import GraphAPIClient
+from src.graph.exceptions import RateLimitError
+from src.cache.interface import CacheInterface
+from src.tools.plan_tools import PlanTools
+
+logger = structlog.get_logger()
+
+# Cache key prefixes that belong to a plan; reads of any of them count for it
+PLAN_KEY_PREFIXES = ("plan:", "plan_tasks:", "plan_buckets:", "plan_board:")
+
+# A board refresh fetches the plan, its buckets and its tasks
+REFRESH_REQUESTS = 3
+
+# Refreshes are due by this fraction of the cache TTL, so a refreshed plan
+# is re-fetched before its entries expire rather than after
+TTL_FRACTION = 0.8
+
+
+def _plan_id(key: str) -> Optional[str]:
+    for prefix in PLAN_KEY_PREFIXES:
+        if key.startswith(prefix):
+            return key[len(prefix):]
+    return None
+
+
+class _PlanActivity:
+    def __init__(self):
+        self.rate = 0.0  # Reads per minute, exponentially smoothed
+        self.next_refresh: Optional[float] = None
+
+
+class RefreshScheduler:
+    """Keeps the most read plans warm by re-fetching them in the background.
+
+    Every ``tick`` seconds the cache's read counts are folded into a
+    reads-per-minute rate per plan, smoothed over ``half_life`` seconds.
+    Plans due for a refresh are re-fetched hottest first; a plan's next
+    refresh is ``max_interval`` divided by (1 + its rate), clamped to
+    ``min_interval``, so busy plans refresh often and idle ones back off
+    until they are dropped. Both intervals are capped at ``TTL_FRACTION``
+    of the cache ``ttl`` (when entries expire), so a tracked plan never
+    falls out of the cache between refreshes. Refreshes
+    draw from a token bucket of ``budget_per_minute`` Graph requests, and
+    the scheduler stays paused while Graph's Retry-After from any 429 runs.
+
+    Read counts are the memory backend's reads of plan keys, hits and misses (kept by
+    the daemon with the shared backend, so they cover every worker),
+    counted only while the scheduler runs; with Redis the scheduler has
+    nothing to go on and stays idle.
+    """
+    
+    def __init__(
+        self,
+        graph_client: GraphAPIClient,
+        cache: CacheInterface,
+        plan_tools: PlanTools,
+        min_interval: float = 30,
+        max_interval: float = 600,
+        max_plans: int = 20,
+        budget_per_minute: int = 60,
+        tick: float = 5,
+        half_life: float = 300,
+        ttl: float = 0
+    ):
+        self.graph = graph_client
+        self.cache = cache
+        self.plan_tools = plan_tools
+        if ttl > 0:
+            min_interval = min(min_interval, ttl * TTL_FRACTION)
+            max_interval = min(max_interval, ttl * TTL_FRACTION)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.max_plans = max_plans
+        self.budget_per_minute = budget_per_minute
+        self.tick = tick
+        self.half_life = half_life
+        self._plans: Dict[str, _PlanActivity] = {}
+        self._tokens = float(budget_per_minute)
+        self._tokens_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self.status: Dict[str, Any] = {
+            "state": "idle",
+            "tracked": 0,
+            "refreshed": 0,
+            "failed": 0,
+            "deferred": 0,
+            "paused_seconds": 0.0
+        }
+    
+    def interval(self, rate: float) -> float:
+        return max(self.min_interval, self.max_interval / (1 + rate))
+    
+    async def _observe(self, now: float, elapsed: float) -> None:
+        reads: Dict[str, int] = {}
+        for key, count in (await self.cache.take_accesses()).items():
+            plan_id = _plan_id(key)
+            if plan_id is not None:
+                reads[plan_id] = reads.get(plan_id, 0) + count
+        
+        for plan_id in reads:
+            self._plans.setdefault(plan_id, _PlanActivity())
+        
+        elapsed = max(elapsed, 1e-6)
+        weight = 1 - 0.5 ** (elapsed / self.half_life)
+        for plan_id, activity in list(self._plans.items()):
+            observed = reads.get(plan_id, 0) * 60 / elapsed
+            activity.rate += weight * (observed - activity.rate)
+            if activity.next_refresh is None:
+                # Just read, so just loaded; the first refresh is one interval away
+                activity.next_refresh = now + self.interval(activity.rate)
+            # Idle plans are dropped once they average under half a read per max interval
+            elif plan_id not in reads and activity.rate * self.max_interval / 60 < 0.5:
+                del self._plans[plan_id]
+        self.status["tracked"] = len(self._plans)
+    
+    def _take_budget(self, now: float, cost: int) -> bool:
+        self._tokens = min(
+            float(self.budget_per_minute),
+            self._tokens + (now - self._tokens_at) * self.budget_per_minute / 60
+        )
+        self._tokens_at = now
+        if self._tokens < cost:
+            return False
+        self._tokens -= cost
+        return True
+    
+    async def run_once(self, elapsed: Optional[float] = None) -> None:
+        """One scheduling round: observe reads, then refresh the plans that are due"""
+        now = time.monotonic()
+        await self._observe(now, self.tick if elapsed is None else elapsed)
+        
+        paused = self.graph.rate_limit_remaining()
+        self.status["paused_seconds"] = round(paused, 1)
+        if paused > 0:
+            self.status["state"] = "paused"
+            return
+        self.status["state"] = "running"
+        
+        hottest = sorted(self._plans.items(), key=lambda item: -item[1].rate)[:self.max_plans]
+        for plan_id, activity in hottest:
+            if activity.next_refresh is None or activity.next_refresh > now:
+                continue
+            if not self._take_budget(time.monotonic(), REFRESH_REQUESTS):
+                self.status["deferred"] += 1
+                break
+            
+            try:
+                await self.plan_tools.refresh_plan(plan_id)
+            except RateLimitError:
+                self.status["state"] = "paused"
+                logger.warning("plan_refresh_paused", plan_id=plan_id, seconds=self.graph.rate_limit_remaining())
+                return
+            except Exception as e:
+                self.status["failed"] += 1
+                logger.warning("plan_refresh_failed", plan_id=plan_id, error=str(e))
+            else:
+                self.status["refreshed"] += 1
+                logger.debug("plan_refreshed", plan_id=plan_id, rate=round(activity.rate, 2))
+            activity.next_refresh = time.monotonic() + self.interval(activity.rate)
+    
+    async def _loop(self) -> None:
+        try:
+            await self.cache.track_accesses(PLAN_KEY_PREFIXES)
+        except Exception as e:
+            logger.error("refresh_tracking_failed", error=str(e))
+            self.status["state"] = "failed"
+            return
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick)
+            now = time.monotonic()
+            try:
+                await self.run_once(now - last)
+            except Exception as e:
+                logger.error("refresh_round_failed", error=str(e))
+            last = now
+    
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+        return self._task
+    
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await self.cache.track_accesses(())
+            except Exception as e:
+                # e.g. the shared cache daemon already stopped
+                logger.warning("refresh_tracking_not_stopped", error=str(e))
+            self.status["state"] = "stopped"
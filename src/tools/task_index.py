@@ -0,0 +1,268 @@
+import json
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+DUE_FILTERS = ("overdue", "today", "this_week", "later", "none")
+STATES = ("not_started", "in_progress", "completed")
+
+
+def order_key(item: Dict[str, Any]):
+    # Planner orders items by ordinal comparison of their order hints; items
+    # without a hint go last, ties are broken by ID for a stable result
+    hint = item.get("orderHint")
+    return (hint is None, hint or "", item.get("id", ""))
+
+
+def _state(task: Dict[str, Any]) -> str:
+    percent = task.get("percentComplete", 0)
+    if percent >= 100:
+        return "completed"
+    return "in_progress" if percent > 0 else "not_started"
+
+
+def _due_day(task: Dict[str, Any]) -> Optional[date]:
+    value = task.get("dueDateTime")
+    if not value:
+        return None
+    due = datetime.fromisoformat(value)
+    if due.tzinfo:
+        due = due.astimezone(timezone.utc)
+    return due.date()
+
+
+class PlanTaskIndex:
+    """Secondary indexes over one plan's tasks.
+
+    Maps bucket, assignee, due day and completion state to task IDs, plus
+    the tasks by ID, so filtered reads intersect a few small sets instead of
+    scanning the plan. Due dates are indexed per calendar day (UTC) and
+    grouped into overdue / today / this week at query time, so the index
+    does not go stale as the days pass.
+
+    For paging, the tasks' board order and each task's JSON encoding are
+    kept too. The order is sorted on first use and then updated in place
+    on writes (found by binary search, so a write shifts the list but never
+    re-sorts it); an encoding is dropped when its task changes. A page
+    costs a binary search plus its own tasks.
+    """
+    
+    def __init__(self, tasks: Iterable[Dict[str, Any]] = ()):
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.by_bucket: Dict[Optional[str], Set[str]] = {}
+        self.by_assignee: Dict[Optional[str], Set[str]] = {}
+        self.by_due_day: Dict[Optional[date], Set[str]] = {}
+        self.by_state: Dict[str, Set[str]] = {state: set() for state in STATES}
+        self.built_at = time.monotonic()
+        self._order: Optional[Tuple[List[Tuple], List[str]]] = None
+        self._encoded: Dict[str, bytes] = {}
+        for task in tasks:
+            self.upsert(task)
+    
+    def _entries(self, task: Dict[str, Any]):
+        yield self.by_bucket, task.get("bucketId")
+        for user_id in (task.get("assignments") or {None: None}):
+            yield self.by_assignee, user_id
+        yield self.by_due_day, _due_day(task)
+        yield self.by_state, _state(task)
+    
+    def upsert(self, task: Dict[str, Any]) -> None:
+        self.remove(task["id"])
+        self.tasks[task["id"]] = task
+        if self._order is not None:
+            keys, ids = self._order
+            key = order_key(task)
+            position = bisect_left(keys, key)
+            keys.insert(position, key)
+            ids.insert(position, task["id"])
+        for index, value in self._entries(task):
+            index.setdefault(value, set()).add(task["id"])
+    
+    def remove(self, task_id: str) -> None:
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return
+        if self._order is not None:
+            keys, ids = self._order
+            key = order_key(task)
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+                del ids[position]
+            else:
+                # The task dict was changed in place; sort again on next use
+                self._order = None
+        self._encoded.pop(task_id, None)
+        for index, value in self._entries(task):
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids and index is not self.by_state:
+                    del index[value]
+    
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self.tasks.get(task_id)
+    
+    def _ordered(self) -> Tuple[List[Tuple], List[str]]:
+        """(order keys, task IDs) of all tasks in board order"""
+        if self._order is None:
+            keyed = sorted((order_key(task), task_id) for task_id, task in self.tasks.items())
+            self._order = ([key for key, _ in keyed], [task_id for _, task_id in keyed])
+        return self._order
+    
+    def page(self, after: Optional[Tuple], size: int) -> Tuple[List[str], Optional[Tuple]]:
+        """IDs of up to ``size`` tasks following order key ``after`` (None: from the start).
+        
+        Returns the order key to continue after, or None on the last page.
+        Paging by key rather than position means tasks added or removed
+        between pages do not shift the later pages.
+        """
+        keys, ids = self._ordered()
+        start = bisect_right(keys, after) if after is not None else 0
+        end = start + size
+        return ids[start:end], keys[end - 1] if end < len(ids) else None
+    
+    def encoded(self, task_id: str) -> bytes:
+        """A task's JSON, encoded once until the task changes"""
+        data = self._encoded.get(task_id)
+        if data is None:
+            data = json.dumps(self.tasks[task_id], separators=(",", ":")).encode("utf-8")
+            self._encoded[task_id] = data
+        return data
+    
+    def _due_ids(self, due: str) -> Set[str]:
+        if due == "none":
+            return set(self.by_due_day.get(None, ()))
+        
+        today = datetime.now(timezone.utc).date()
+        ranges = {
+            "overdue": lambda day: day < today,
+            "today": lambda day: day == today,
+            "this_week": lambda day: today <= day < today + timedelta(days=7),
+            "later": lambda day: day >= today + timedelta(days=7)
+        }
+        in_range = ranges[due]
+        ids: Set[str] = set()
+        # One check per distinct due day, not per task
+        for day, day_ids in self.by_due_day.items():
+            if day is not None and in_range(day):
+                ids |= day_ids
+        return ids
+    
+    def query(
+        self,
+        bucket_id: Optional[str] = None,
+        assignee_id: Optional[str] = None,
+        due: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Tasks matching every given filter"""
+        if due is not None and due not in DUE_FILTERS:
+            raise ValueError(f"Unknown due filter '{due}', expected one of {', '.join(DUE_FILTERS)}")
+        if state is not None and state not in STATES:
+            raise ValueError(f"Unknown state '{state}', expected one of {', '.join(STATES)}")
+        
+        candidates: List[Set[str]] = []
+        if bucket_id is not None:
+            candidates.append(self.by_bucket.get(bucket_id, set()))
+        if assignee_id is not None:
+            candidates.append(self.by_assignee.get(assignee_id, set()))
+        if state is not None:
+            candidates.append(self.by_state[state])
+        if due is not None:
+            candidates.append(self._due_ids(due))
+        
+        if not candidates:
+            return list(self.tasks.values())
+        
+        # Intersect starting from the smallest set
+        candidates.sort(key=len)
+        ids = set(candidates[0])
+        for other in candidates[1:]:
+            ids &= other
+        return [self.tasks[task_id] for task_id in ids]
+
+
+class _Build:
+    def __init__(self):
+        self.stale = False
+
+
+class TaskIndexes:
+    """Per-plan task indexes, built from the cached task list on first use.
+
+    Writes are applied to existing indexes incrementally. Indexes expire
+    after ``ttl`` seconds like the task lists they were built from, so
+    changes made outside this server are picked up, and at most
+    ``max_plans`` are kept (least recently used are dropped).
+    """
+    
+    def __init__(self, ttl: int = 300, max_plans: int = 256):
+        self.ttl = ttl
+        self.max_plans = max_plans
+        self._indexes: "OrderedDict[str, PlanTaskIndex]" = OrderedDict()
+        # Builds in flight per plan; a write marks them stale, and a build
+        # that overlapped one is not kept. Entries go when their builds end.
+        self._builds: Dict[str, List[_Build]] = {}
+    
+    def _current(self, plan_id: str) -> Optional[PlanTaskIndex]:
+        index = self._indexes.get(plan_id)
+        if index is None:
+            return None
+        if self.ttl > 0 and time.monotonic() - index.built_at > self.ttl:
+            del self._indexes[plan_id]
+            return None
+        self._indexes.move_to_end(plan_id)
+        return index
+    
+    async def get(
+        self,
+        plan_id: str,
+        load_tasks: Callable[[], Awaitable[List[Dict[str, Any]]]]
+    ) -> PlanTaskIndex:
+        index = self._current(plan_id)
+        if index is not None:
+            return index
+        
+        build = _Build()
+        self._builds.setdefault(plan_id, []).append(build)
+        try:
+            tasks = await load_tasks()
+        finally:
+            builds = self._builds[plan_id]
+            builds.remove(build)
+            if not builds:
+                del self._builds[plan_id]
+        
+        index = PlanTaskIndex(tasks)
+        if not build.stale:
+            self._indexes[plan_id] = index
+            while len(self._indexes) > self.max_plans:
+                self._indexes.popitem(last=False)
+            logger.debug("task_index_built", plan_id=plan_id, tasks=len(index.tasks))
+        return index
+    
+    def _written(self, plan_id: str) -> Optional[PlanTaskIndex]:
+        for build in self._builds.get(plan_id, ()):
+            build.stale = True
+        return self._current(plan_id)
+    
+    def upsert_task(self, plan_id: str, task: Dict[str, Any]) -> None:
+        index = self._written(plan_id)
+        if index is not None:
+            index.upsert(task)
+    
+    def remove_task(self, plan_id: str, task_id: str) -> None:
+        index = self._written(plan_id)
+        if index is not None:
+            index.remove(task_id)
+    
+    def discard(self, plan_id: str) -> None:
+        """Drop a plan's index, e.g. when a write's result is not known in full"""
+        self._written(plan_id)
+        self._indexes.pop(plan_id, None)
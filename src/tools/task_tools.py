@@ -1,15 +1,90 @@
-from typing import Dict, Any, Optional, List
+import asyncio
+from typing import Dict, Any, Iterable, Optional, List, Union
+import httpx
 import structlog
 from src.graph.client import GraphAPIClient
+from src.graph.exceptions import ConflictError, GraphAPIError, RateLimitError, ServerError
+from src.graph.models import PlannerTask, PlannerTaskDetails, TASK_LIST_FIELDS
+from src.graph import order_hint
 from src.cache.memory import MemoryCache
+from src.tools.plan_tools import order_key
+from src.tools.task_index import PlanTaskIndex, TaskIndexes
+from src.tools.create_ledger import CacheCreateLedger, CreateLedger, new_entry
+from src.tools.write_queue import WriteQueue
 
 logger = structlog.get_logger()
 
+# Graph accepts at most 20 sub-requests per $batch
+BATCH_SIZE = 20
+BATCH_CONCURRENCY = 4
+
+# Allowance for clock differences when matching a task's createdDateTime
+# against the time a create started
+CREATE_CLOCK_SKEW_SECONDS = 120
+
+# Task properties whose values can be compared between two reads. A write
+# that conflicts on any other property is never applied again.
+COMPARABLE_FIELDS = {
+    "title", "bucketId", "percentComplete", "priority",
+    "startDateTime", "dueDateTime", "assignments", "orderHint"
+}
+
+
+def _changed_fields(before: Dict[str, Any], after: Dict[str, Any], fields: Iterable[str]) -> List[str]:
+    """Those of ``fields`` that differ between two reads of a task (or cannot be compared)"""
+    return sorted(name for name in fields if name not in COMPARABLE_FIELDS or before.get(name) != after.get(name))
+
+
+def _changed_details(before: Dict[str, Any], after: Dict[str, Any], updates: Dict[str, Any]) -> List[str]:
+    """The parts of task details that ``updates`` writes and that differ between two reads.
+    
+    Checklist and references are maps that Graph patches per item, so they
+    are compared item by item (``checklist/<id>``); other fields whole.
+    """
+    changed = []
+    for name, value in updates.items():
+        if name in ("checklist", "references") and isinstance(value, dict):
+            old, new = before.get(name) or {}, after.get(name) or {}
+            changed.extend(f"{name}/{item}" for item in value if old.get(item) != new.get(item))
+        elif before.get(name) != after.get(name):
+            changed.append(name)
+    return sorted(changed)
+
+
+def _hint_updates(order: List[str], state: Dict[str, Dict[str, Any]], bucket_id: str) -> Dict[str, Dict[str, Any]]:
+    """The writes that put the tasks of ``order`` in that order in the bucket"""
+    # Tasks moving in from other buckets have no usable hint here
+    hints = order_hint.plan_reorder([
+        (task_id, state[task_id].get("orderHint") if state[task_id].get("bucketId") == bucket_id else None)
+        for task_id in order
+    ])
+    updates: Dict[str, Dict[str, Any]] = {}
+    for task_id, hint in hints.items():
+        updates[task_id] = {"orderHint": hint}
+        if state[task_id].get("bucketId") != bucket_id:
+            updates[task_id]["bucketId"] = bucket_id
+    return updates
+
 
 class TaskTools:
-    def __init__(self, graph_client: GraphAPIClient, cache: MemoryCache):
+    def __init__(
+        self,
+        graph_client: GraphAPIClient,
+        cache: MemoryCache,
+        write_behind_window: float = 0,
+        indexes: Optional[TaskIndexes] = None,
+        ledger: Optional[Union[CreateLedger, CacheCreateLedger]] = None,
+        create_attempts: int = 3
+    ):
         self.graph = graph_client
         self.cache = cache
+        self.indexes = indexes
+        self.ledger = ledger or CreateLedger()
+        self.create_attempts = max(1, create_attempts)
+        self._creates: Dict[str, asyncio.Future] = {}
+        # With a window, bursts of updates to one task become a single PATCH
+        self.write_queue = WriteQueue(self._write_update, write_behind_window) if write_behind_window > 0 else None
+        self._batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
     
     async def create_task(
         self,
@@ -19,8 +94,30 @@ class TaskTools:
         description: Optional[str] = None,
         assignee_ids: Optional[List[str]] = None,
         due_date: Optional[str] = None,
-        priority: Optional[int] = None
+        priority: Optional[int] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
+        """Create a task, at most once per ``idempotency_key``.
+        
+        Repeating a key returns the task its first use created. Without a key
+        nothing is recorded in the ledger, though this call's own retries
+        still look for the task before creating it again. If the task was
+        created but its description could not be written, the result carries
+        ``detailsError`` and a repeat with the key writes the description again.
+        """
+        key = idempotency_key
+        entry = await self.ledger.get(key) if key else None
+        if entry and entry["state"] == "created":
+            logger.info("task_create_replayed", key=key, task_id=entry["task"]["id"])
+            result = {**entry["task"], "idempotencyKey": key, "replayed": True}
+            if entry.get("description") is not None:
+                result.update(await self._write_description(key, entry["task"]["id"], entry["description"]))
+            return result
+        
+        # The same key in flight: wait for that create instead of racing it
+        if key in self._creates:
+            return await asyncio.shield(self._creates[key])
+        
         task_data: Dict[str, Any] = {
             "planId": plan_id,
             "title": title
@@ -33,45 +130,456 @@ class TaskTools:
         if priority is not None:
             task_data["priority"] = priority
         if assignee_ids:
+            # Assignees are shown in the order given
+            hints = order_hint.spread(len(assignee_ids))
             task_data["assignments"] = {
-                user_id: {"@odata.type": "#microsoft.graph.plannerAssignment", "orderHint": " !"}
-                for user_id in assignee_ids
+                user_id: {"@odata.type": "#microsoft.graph.plannerAssignment", "orderHint": hint}
+                for user_id, hint in zip(assignee_ids, hints)
             }
         
-        task = await self.graph.create_task(task_data)
+        future = asyncio.ensure_future(self._create(key, entry, task_data, description))
+        if key:
+            self._creates[key] = future
+            future.add_done_callback(lambda _: self._creates.pop(key, None))
+        # A caller that goes away does not abort the create half-way
+        return await asyncio.shield(future)
+    
+    async def _find_created(self, entry: Dict[str, Any]) -> Optional[PlannerTask]:
+        """The task an earlier attempt created, if Graph applied it"""
+        tasks = await self.graph.get_plan_tasks(entry["planId"], select=TASK_LIST_FIELDS + ["createdDateTime"])
+        since = entry["startedAt"] - CREATE_CLOCK_SKEW_SECONDS
+        matches = [
+            task for task in tasks
+            if task.title == entry["title"]
+            and (entry["bucketId"] is None or task.bucket_id == entry["bucketId"])
+            and task.created_date_time is not None
+            and task.created_date_time.timestamp() >= since
+        ]
+        claimed = await self.ledger.claimed([task.id for task in matches])
+        matches = [task for task in matches if task.id not in claimed]
+        return min(matches, key=lambda task: task.created_date_time) if matches else None
+    
+    async def _create(
+        self,
+        key: Optional[str],
+        entry: Optional[Dict[str, Any]],
+        task_data: Dict[str, Any],
+        description: Optional[str]
+    ) -> Dict[str, Any]:
+        plan_id = task_data["planId"]
+        # A pending entry is an earlier attempt (perhaps before a restart)
+        # whose outcome is unknown
+        uncertain = entry is not None
+        if entry is None and key:
+            entry = await self.ledger.start(key, plan_id, task_data["title"], task_data.get("bucketId"))
+        elif entry is None:
+            entry = new_entry(plan_id, task_data["title"], task_data.get("bucketId"))
         
-        await self.cache.delete(f"plan_tasks:{plan_id}")
+        task = None
+        for attempt in range(1, self.create_attempts + 1):
+            if uncertain:
+                task = await self._find_created(entry)
+                if task is not None:
+                    logger.info("task_create_reconciled", key=key, task_id=task.id)
+                    break
+            
+            try:
+                task = await self.graph.create_task(task_data)
+                break
+            except RateLimitError as e:
+                # Rejected before it was applied
+                uncertain = False
+                error: Exception = e
+                delay = min(e.retry_after, 30)
+            except (ServerError, httpx.TimeoutException, httpx.TransportError) as e:
+                # May have been applied; look before trying again
+                uncertain = True
+                error = e
+                delay = min(2 ** attempt, 10)
+            except Exception:
+                if key:
+                    await self.ledger.discard(key)
+                raise
+            
+            logger.warning("task_create_attempt_failed", key=key, attempt=attempt, uncertain=uncertain, error=str(error))
+            if attempt == self.create_attempts:
+                if key and not uncertain:
+                    await self.ledger.discard(key)
+                # An uncertain entry stays pending, so a retry with the key reconciles first
+                raise error
+            await asyncio.sleep(delay)
         
+        await self.cache.invalidate([f"plan_tasks:{plan_id}", f"plan_board:{plan_id}"])
+        if self.indexes:
+            self.indexes.upsert_task(plan_id, task.to_dict())
+        
+        result = task.to_dict()
+        # The task exists from here on: a failed description write is reported, not raised
+        if key:
+            await self.ledger.complete(key, result, description or None)
         logger.info("task_created", task_id=task.id, plan_id=plan_id)
-        return task.to_dict()
+        if description:
+            result = {**result, **await self._write_description(key, task.id, description)}
+        return {**result, "idempotencyKey": key} if key else result
+    
+    async def _write_description(self, key: Optional[str], task_id: str, description: str) -> Dict[str, Any]:
+        """Write a created task's description; ``{"details"}`` or ``{"detailsError"}``"""
+        try:
+            # The description lives on the details object Graph creates with the task
+            details = await self.update_task_details(task_id, {"description": description})
+        except Exception as e:
+            # Kept in the ledger, so a repeat with the key tries again
+            logger.warning("task_description_write_failed", key=key, task_id=task_id, error=str(e))
+            return {"detailsError": str(e)}
+        if key:
+            await self.ledger.described(key)
+        return {"details": details}
+    
+    # Details (description, checklist, references) are cached per task under
+    # task_details:{id} together with their etag, so writes need no extra read.
+    
+    async def _cache_details(self, details: PlannerTaskDetails, generation: Optional[int] = None) -> Dict[str, Any]:
+        entry = {"etag": details.odata_etag, "details": details.to_dict()}
+        key = f"task_details:{details.id}"
+        if generation is None:
+            await self.cache.set(key, entry)
+        else:
+            await self.cache.set_if_unchanged(key, entry, generation)
+        return entry["details"]
+    
+    async def get_task_details(self, task_id: str) -> Dict[str, Any]:
+        """A task with its details"""
+        
+        async def load():
+            details_generation = await self.cache.generation(f"task_details:{task_id}")
+            # Description, checklist and references arrive in the same response
+            task = await self.graph.get_task(task_id, expand=["details"])
+            if task.details and task.details.odata_etag:
+                await self._cache_details(task.details, details_generation)
+            return task.to_dict()
+        
+        return await self.cache.get_or_load(f"task:{task_id}", load)
+    
+    async def _load_details_chunk(self, task_ids: List[str]) -> Dict[str, Any]:
+        generations = await self.cache.generations([f"task_details:{task_id}" for task_id in task_ids])
+        async with self._batch_semaphore:
+            try:
+                fetched = await self.graph.get_tasks_details(task_ids)
+            except GraphAPIError as e:
+                fetched = {task_id: e for task_id in task_ids}
+        
+        results: Dict[str, Any] = {}
+        for task_id in task_ids:
+            outcome = fetched.get(task_id, GraphAPIError("No response for task in batch"))
+            if isinstance(outcome, Exception):
+                logger.warning("task_details_failed", task_id=task_id, error=str(outcome))
+                results[task_id] = outcome
+            else:
+                results[task_id] = await self._cache_details(outcome, generations[f"task_details:{task_id}"])
+        return results
+    
+    async def get_tasks_details(self, task_ids: List[str]) -> Dict[str, Any]:
+        """Details of many tasks: cached ones first, the rest in $batch requests of 20.
+        
+        Returns ``{"details": {task_id: details}, "errors": {task_id: message}}``.
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        cached = await self.cache.get_many([f"task_details:{task_id}" for task_id in task_ids])
+        details = {
+            task_id: cached[f"task_details:{task_id}"]["details"]
+            for task_id in task_ids
+            if f"task_details:{task_id}" in cached
+        }
+        
+        missing = [task_id for task_id in task_ids if task_id not in details]
+        chunks = await asyncio.gather(*(
+            self._load_details_chunk(missing[i:i + BATCH_SIZE])
+            for i in range(0, len(missing), BATCH_SIZE)
+        ))
+        
+        errors: Dict[str, str] = {}
+        for chunk in chunks:
+            for task_id, outcome in chunk.items():
+                if isinstance(outcome, Exception):
+                    errors[task_id] = str(outcome)
+                else:
+                    details[task_id] = outcome
+        
+        logger.info("task_details_loaded", tasks=len(task_ids), cached=len(task_ids) - len(missing), batches=len(chunks))
+        return {"details": details, "errors": errors}
+    
+    async def with_details(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of ``tasks`` with their details attached"""
+        loaded = await self.get_tasks_details([task["id"] for task in tasks])
+        result = []
+        for task in tasks:
+            if task["id"] in loaded["errors"]:
+                result.append({**task, "detailsError": loaded["errors"][task["id"]]})
+            else:
+                result.append({**task, "details": loaded["details"].get(task["id"])})
+        return result
+    
+    async def update_task_details(self, task_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Patch a task's details (description, checklist, references, previewType).
+        
+        When the details changed since the etag was read (412), the update
+        is applied to the new version only if the other write left the
+        fields and checklist or reference items it writes alone; otherwise
+        that write stands and the ConflictError is raised.
+        """
+        key = f"task_details:{task_id}"
+        cached = await self.cache.get(key)
+        if cached and cached.get("etag"):
+            etag, base = cached["etag"], cached["details"]
+        else:
+            read = await self.graph.get_task_details(task_id)
+            etag, base = read.odata_etag, read.to_dict()
+        
+        try:
+            details = await self.graph.update_task_details(task_id, updates, etag)
+        except ConflictError:
+            current = await self.graph.get_task_details(task_id)
+            overlap = _changed_details(base, current.to_dict(), updates)
+            if overlap:
+                await self.cache.invalidate([key])
+                logger.warning("task_details_conflict", task_id=task_id, fields=overlap)
+                raise ConflictError(f"Task details of {task_id} were changed by someone else: {', '.join(overlap)}")
+            # Graph merges checklist and reference items, so the other write's items are kept
+            details = await self.graph.update_task_details(task_id, updates, current.odata_etag)
+        
+        await self.cache.invalidate([key, f"task:{task_id}"])
+        if details.odata_etag:
+            result = await self._cache_details(details)
+        else:
+            # No representation came back; report what was written
+            result = {"id": task_id, **updates}
+        
+        logger.info("task_details_updated", task_id=task_id, fields=sorted(updates))
+        return result
     
-    async def update_task(self, task_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-        task = await self.graph.get_task(task_id)
+    async def _write_update(self, task_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """PATCH a task against the etag read just before.
+        
+        When someone else changes the task in between (412), the update is
+        applied to the new version only if they changed other fields than
+        the ones it writes; otherwise their change stands and the
+        ConflictError is raised.
+        """
+        # The etag (always returned), the plan and the fields being written
+        select = ["id", "planId"] + [name for name in updates if name not in ("id", "planId")]
+        task = await self.graph.get_task(task_id, select=select)
         
         if not task.odata_etag:
             raise ValueError("Task etag not found")
         
-        updated_task = await self.graph.update_task(task_id, updates, task.odata_etag)
+        try:
+            updated_task = await self.graph.update_task(task_id, updates, task.odata_etag)
+        except ConflictError:
+            current = await self.graph.get_task(task_id, select=select)
+            overlap = _changed_fields(task.to_dict(), current.to_dict(), updates)
+            if overlap:
+                logger.warning("task_update_conflict", task_id=task_id, fields=overlap)
+                raise ConflictError(f"Task {task_id} was changed by someone else: {', '.join(overlap)}")
+            task = current
+            updated_task = await self.graph.update_task(task_id, updates, task.odata_etag)
         
-        await self.cache.delete(f"task:{task_id}")
-        await self.cache.delete(f"plan_tasks:{updated_task.plan_id}")
+        await self.cache.invalidate([
+            f"task:{task_id}",
+            f"plan_tasks:{task.plan_id}",
+            f"plan_board:{task.plan_id}"
+        ])
+        if self.indexes:
+            if "plan_id" in updated_task.model_fields_set:
+                self.indexes.upsert_task(task.plan_id, updated_task.to_dict())
+            else:
+                # Graph sent no representation, so the new state is unknown
+                self.indexes.discard(task.plan_id)
         
-        logger.info("task_updated", task_id=task_id)
+        logger.info("task_updated", task_id=task_id, fields=sorted(updates))
         return updated_task.to_dict()
     
-    async def move_task(self, task_id: str, target_bucket_id: str) -> Dict[str, Any]:
-        return await self.update_task(task_id, {"bucketId": target_bucket_id})
+    async def _write_chunk(self, updates: Dict[str, Dict[str, Any]], etags: Dict[str, str]) -> Dict[str, Any]:
+        async with self._batch_semaphore:
+            try:
+                written = await self.graph.update_tasks({
+                    task_id: (changes, etags[task_id]) for task_id, changes in updates.items()
+                })
+            except GraphAPIError as e:
+                written = {task_id: e for task_id in updates}
+        return {
+            task_id: written.get(task_id, GraphAPIError("No response for task in batch"))
+            for task_id in updates
+        }
+    
+    async def _read_chunk(self, task_ids: List[str]) -> Dict[str, Any]:
+        async with self._batch_semaphore:
+            try:
+                return await self.graph.get_tasks(task_ids, select=["id", "bucketId", "orderHint"])
+            except GraphAPIError as e:
+                return {task_id: e for task_id in task_ids}
+    
+    async def _batched(self, call, items: List[str]) -> Dict[str, Any]:
+        """Run ``call`` on chunks of at most BATCH_SIZE items and merge the results"""
+        chunks = await asyncio.gather(*(
+            call(items[i:i + BATCH_SIZE]) for i in range(0, len(items), BATCH_SIZE)
+        ))
+        return {key: value for chunk in chunks for key, value in chunk.items()}
+    
+    async def reorder_tasks(
+        self,
+        plan_id: str,
+        bucket_id: str,
+        task_ids: List[str],
+        index: PlanTaskIndex
+    ) -> Dict[str, Any]:
+        """Put a bucket's tasks in a new order, given by ``task_ids`` from the top.
+        
+        Tasks of the bucket that are not listed follow in their current order;
+        listed tasks from other buckets are moved in. New order hints are
+        computed from the cached view (``index``) and only tasks whose hint
+        must change are written, 20 per $batch request. Tasks someone else
+        changed meanwhile (412) are read again. If their bucket or hint
+        changed, that move stands and they are reported under ``errors``;
+        otherwise the hints are recomputed and written once more.
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        unknown = [task_id for task_id in task_ids if index.get(task_id) is None]
+        if unknown:
+            raise ValueError(f"Tasks not found in plan {plan_id}: {', '.join(unknown)}")
+        
+        # Queued updates go out first, so the cached etags are current
+        if self.write_queue:
+            for task_id in task_ids:
+                await self.write_queue.flush(task_id)
+        
+        listed = set(task_ids)
+        current = sorted(index.by_bucket.get(bucket_id, ()), key=lambda task_id: order_key(index.get(task_id)))
+        order = task_ids + [task_id for task_id in current if task_id not in listed]
+        # Latest known bucket, hint and etag of each task
+        state = {task_id: dict(index.get(task_id)) for task_id in order}
+        
+        errors: Dict[str, str] = {}
+        written: Dict[str, PlannerTask] = {}
+        changed = set()
+        conflicted: List[str] = []
+        for attempt in range(2):
+            if conflicted:
+                # The cached view is out of date: reload those tasks and plan again
+                if self.indexes:
+                    self.indexes.discard(plan_id)
+                for task_id, task in (await self._batched(self._read_chunk, conflicted)).items():
+                    if isinstance(task, Exception):
+                        errors[task_id] = str(task)
+                        continue
+                    current = task.to_dict()
+                    moved = _changed_fields(state[task_id], current, ("bucketId", "orderHint"))
+                    if moved:
+                        errors[task_id] = f"Task {task_id} was changed by someone else: {', '.join(moved)}"
+                    else:
+                        state[task_id] = current
+            
+            updates = _hint_updates([task_id for task_id in order if task_id not in errors], state, bucket_id)
+            changed.update(updates)
+            stale = [task_id for task_id in updates if not state[task_id].get("@odata.etag")]
+            for task_id, task in (await self._batched(self._read_chunk, stale)).items():
+                if isinstance(task, Exception):
+                    errors[task_id] = str(task)
+                    del updates[task_id]
+                else:
+                    state[task_id]["@odata.etag"] = task.odata_etag
+            
+            results = await self._batched(
+                lambda chunk: self._write_chunk(
+                    {task_id: updates[task_id] for task_id in chunk},
+                    {task_id: state[task_id]["@odata.etag"] for task_id in chunk}
+                ),
+                list(updates)
+            )
+            conflicted = []
+            for task_id, outcome in results.items():
+                if isinstance(outcome, ConflictError) and attempt == 0:
+                    conflicted.append(task_id)
+                elif isinstance(outcome, Exception):
+                    errors[task_id] = str(outcome)
+                else:
+                    written[task_id] = outcome
+                    state[task_id].update(updates[task_id])
+                    state[task_id]["@odata.etag"] = outcome.odata_etag
+            if not conflicted:
+                break
+        
+        await self.cache.invalidate(
+            [f"task:{task_id}" for task_id in changed]
+            + [f"plan_tasks:{plan_id}", f"plan_board:{plan_id}"]
+        )
+        if self.indexes:
+            for task in written.values():
+                if "plan_id" in task.model_fields_set:
+                    self.indexes.upsert_task(plan_id, task.to_dict())
+                else:
+                    self.indexes.discard(plan_id)
+        
+        logger.info("tasks_reordered", plan_id=plan_id, bucket_id=bucket_id, tasks=len(order), written=len(written), failed=len(errors))
+        return {
+            "planId": plan_id,
+            "bucketId": bucket_id,
+            "order": order,
+            "updated": len(written),
+            "unchanged": len(order) - len(changed),
+            "errors": errors
+        }
+    
+    def submit_update(self, task_id: str, updates: Dict[str, Any]) -> asyncio.Future:
+        """Queue an update; the future resolves to the updated task once it is written"""
+        if self.write_queue is None:
+            return asyncio.ensure_future(self._write_update(task_id, updates))
+        return self.write_queue.submit(task_id, updates)
+    
+    async def update_task(self, task_id: str, updates: Dict[str, Any], wait: bool = True) -> Dict[str, Any]:
+        """Update a task.
+        
+        With write-behind enabled and ``wait`` false this returns as soon as
+        the update is queued, with the merged updates still pending for the
+        task; a failed write (e.g. a conflict) is then only logged.
+        """
+        future = self.submit_update(task_id, updates)
+        if wait or self.write_queue is None:
+            return await future
+        return {"id": task_id, "queued": True, "pendingUpdates": self.write_queue.pending(task_id) or updates}
+    
+    async def move_task(self, task_id: str, target_bucket_id: str, wait: bool = True) -> Dict[str, Any]:
+        return await self.update_task(task_id, {"bucketId": target_bucket_id}, wait)
+    
+    async def flush(self) -> None:
+        """Write all queued updates now"""
+        if self.write_queue:
+            await self.write_queue.flush()
+    
+    async def close(self) -> None:
+        if self.write_queue:
+            await self.write_queue.close()
     
     async def delete_task(self, task_id: str) -> Dict[str, Any]:
-        task = await self.graph.get_task(task_id)
+        # Queued updates go out first to keep the task's writes in order
+        if self.write_queue:
+            await self.write_queue.flush(task_id)
+        
+        # Only the etag (always returned) and plan are needed
+        task = await self.graph.get_task(task_id, select=["id", "planId"])
         
         if not task.odata_etag:
             raise ValueError("Task etag not found")
         
         success = await self.graph.delete_task(task_id, task.odata_etag)
         
-        await self.cache.delete(f"task:{task_id}")
-        await self.cache.delete(f"plan_tasks:{task.plan_id}")
+        await self.cache.invalidate([
+            f"task:{task_id}",
+            f"task_details:{task_id}",
+            f"plan_tasks:{task.plan_id}",
+            f"plan_board:{task.plan_id}"
+        ])
+        if self.indexes:
+            self.indexes.remove_task(task.plan_id, task_id)
         
         logger.info("task_deleted", task_id=task_id)
         return {"success": success, "task_id": task_id}
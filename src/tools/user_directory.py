@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+import structlog
+from src.graph.client import GraphAPIClient
+
+logger = structlog.get_logger()
+
+# directoryObjects/getByIds accepts at most 1000 IDs per request
+MAX_IDS_PER_REQUEST = 1000
+USER_FIELDS = ["id", "displayName", "mail", "userPrincipalName"]
+
+
+class UserDirectory:
+    """Resolves user IDs (e.g. task assignees) to names, in bulk.
+
+    Unknown IDs are looked up through ``directoryObjects/getByIds``, up to
+    1000 per request. Results are kept for ``ttl`` seconds, up to
+    ``max_users`` of them (least recently used are dropped). IDs the
+    directory does not return, such as deleted users, are remembered too,
+    so they are not asked for again on every listing.
+    """
+    
+    def __init__(self, graph_client: GraphAPIClient, ttl: int = 86400, max_users: int = 10000):
+        self.graph = graph_client
+        self.ttl = ttl
+        self.max_users = max_users
+        self._users: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # User ID -> the lookup fetching it, so concurrent listings do not ask
+        # for the same users while lookups of different users run side by side
+        self._pending: Dict[str, asyncio.Future] = {}
+    
+    def _cached(self, user_id: str) -> Any:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        stored_at, user = entry
+        if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return user
+    
+    def _store(self, user_id: str, user: Dict[str, Any]) -> None:
+        self._users[user_id] = (time.monotonic(), user)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+    
+    async def _fetch(self, user_ids: List[str]) -> None:
+        for i in range(0, len(user_ids), MAX_IDS_PER_REQUEST):
+            chunk = user_ids[i:i + MAX_IDS_PER_REQUEST]
+            found = await self.graph.get_directory_objects(chunk, types=["user"], select=USER_FIELDS)
+            by_id = {item["id"]: item for item in found}
+            for user_id in chunk:
+                item = by_id.get(user_id)
+                self._store(user_id, {
+                    "id": user_id,
+                    "displayName": item.get("displayName") if item else None,
+                    "mail": item.get("mail") if item else None,
+                    "userPrincipalName": item.get("userPrincipalName") if item else None
+                })
+        logger.info("users_resolved", users=len(user_ids), requests=-(-len(user_ids) // MAX_IDS_PER_REQUEST))
+    
+    def _start_fetch(self, user_ids: List[str]) -> asyncio.Future:
+        fetch = asyncio.ensure_future(self._fetch(user_ids))
+        for user_id in user_ids:
+            self._pending[user_id] = fetch
+        
+        def done(future: asyncio.Future) -> None:
+            for user_id in user_ids:
+                if self._pending.get(user_id) is future:
+                    del self._pending[user_id]
+            # Failures are raised to the waiting callers; mark them retrieved
+            # in case every caller was cancelled meanwhile
+            if not future.cancelled():
+                future.exception()
+        
+        fetch.add_done_callback(done)
+        return fetch
+    
+    async def resolve(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """User ID -> ``{id, displayName, mail, userPrincipalName}``; names are None for unknown IDs"""
+        user_ids = list(dict.fromkeys(user_ids))
+        missing = [user_id for user_id in user_ids if self._cached(user_id) is None]
+        
+        if missing:
+            # Wait for lookups already fetching some of them, fetch the rest
+            lookups = {self._pending[user_id] for user_id in missing if user_id in self._pending}
+            new = [user_id for user_id in missing if user_id not in self._pending]
+            if new:
+                lookups.add(self._start_fetch(new))
+            # Shielded, so a cancelled caller does not cancel a lookup others wait for
+            await asyncio.gather(*(asyncio.shield(lookup) for lookup in lookups))
+        return {user_id: self._cached(user_id) or {"id": user_id, "displayName": None} for user_id in user_ids}
+    
+    async def enrich(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of ``tasks`` with an ``assignees`` list of ``{id, displayName}``"""
+        user_ids = [user_id for task in tasks for user_id in (task.get("assignments") or {})]
+        users = await self.resolve(user_ids)
+        return [
+            {
+                **task,
+                "assignees": [
+                    {"id": user_id, "displayName": users[user_id]["displayName"]}
+                    for user_id in (task.get("assignments") or {})
+                ]
+            }
+            for task in tasks
+        ]
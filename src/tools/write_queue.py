@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+
+def merge_updates(target: Dict[str, Any], updates: Dict[str, Any]) -> None:
+    """Merge a PATCH body into a pending one; later values win.
+
+    Open-type properties (assignments, appliedCategories) are patched per key
+    by Graph, so their entries are merged instead of replaced.
+    """
+    for name, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(name), dict):
+            target[name] = {**target[name], **value}
+        else:
+            target[name] = value
+
+
+class _PendingWrite:
+    def __init__(self):
+        self.updates: Dict[str, Any] = {}
+        self.futures: List[asyncio.Future] = []
+        self.ready = asyncio.Event()
+
+
+class WriteQueue:
+    """Write-behind queue that coalesces updates per key.
+
+    Updates submitted for the same key within ``window`` seconds are merged
+    and written with a single ``write(key, updates)`` call. Writes for one key
+    run one at a time in submission order; updates arriving while a write is
+    in flight form the next batch. Every submitter gets a future that
+    resolves to the result (or error) of the write its update went into.
+    """
+    
+    def __init__(
+        self,
+        write: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        window: float = 0.25
+    ):
+        self._write = write
+        self.window = window
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._flushers: Dict[str, asyncio.Task] = {}
+        self._closed = False
+    
+    def submit(self, key: str, updates: Dict[str, Any]) -> asyncio.Future:
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingWrite()
+        merge_updates(pending.updates, updates)
+        
+        future = asyncio.get_running_loop().create_future()
+        # Failures are logged here, so fire-and-forget callers need not retrieve them
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        pending.futures.append(future)
+        
+        if key not in self._flushers:
+            self._flushers[key] = asyncio.ensure_future(self._run(key))
+        return future
+    
+    def pending(self, key: str) -> Optional[Dict[str, Any]]:
+        """Merged updates for ``key`` that have not been sent yet"""
+        pending = self._pending.get(key)
+        return dict(pending.updates) if pending else None
+    
+    async def _run(self, key: str) -> None:
+        try:
+            while key in self._pending:
+                try:
+                    await asyncio.wait_for(self._pending[key].ready.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+                
+                pending = self._pending.pop(key)
+                try:
+                    result = await self._write(key, pending.updates)
+                except Exception as e:
+                    logger.error("queued_write_failed", key=key, updates=len(pending.futures), error=str(e))
+                    for future in pending.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    if len(pending.futures) > 1:
+                        logger.info("queued_writes_coalesced", key=key, updates=len(pending.futures))
+                    for future in pending.futures:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            self._flushers.pop(key, None)
+    
+    async def flush(self, key: Optional[str] = None) -> None:
+        """Write pending updates now, for one key or all of them"""
+        keys = [key] if key is not None else list(set(self._pending) | set(self._flushers))
+        for name in keys:
+            if name in self._pending:
+                self._pending[name].ready.set()
+        
+        flushers = [self._flushers[name] for name in keys if name in self._flushers]
+        if flushers:
+            await asyncio.gather(*flushers, return_exceptions=True)
+    
+    async def close(self) -> None:
+        """Flush everything and refuse further updates"""
+        self._closed = True
+        await self.flush()
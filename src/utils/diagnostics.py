@@ -0,0 +1,303 @@
+import asyncio
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+# Upper bound on a requested CPU profile, so a typo cannot tie up the sampler
+MAX_PROFILE_SECONDS = 60
+
+# Frames the loop thread sits in while waiting for I/O; samples ending here are idle time
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "kqueue"}
+
+
+def _location(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename}:{frame.f_lineno} {code.co_name}"
+
+
+def _function(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename}:{code.co_firstlineno} {code.co_name}"
+
+
+class _Samples:
+    """Stack samples of the loop thread, aggregated as they are taken"""
+    
+    def __init__(self):
+        self.count = 0
+        self.idle = 0
+        self.own: Counter = Counter()
+        self.cumulative: Counter = Counter()
+        self.stacks: Counter = Counter()
+    
+    def add(self, frame) -> None:
+        self.count += 1
+        if frame.f_code.co_name in _IDLE_FUNCTIONS:
+            self.idle += 1
+            return
+        self.own[_location(frame)] += 1
+        functions = []
+        while frame is not None:
+            functions.append(_function(frame))
+            frame = frame.f_back
+        # Recursive functions count once per sample
+        self.cumulative.update(set(functions))
+        self.stacks[";".join(reversed(functions))] += 1
+
+
+def _stack(frame, limit: int = 30) -> List[str]:
+    """Innermost-last frame locations of a thread's current stack"""
+    frames = []
+    while frame is not None and len(frames) < limit:
+        frames.append(_location(frame))
+        frame = frame.f_back
+    return frames[::-1]
+
+
+class Diagnostics:
+    """On-demand profiling for a running server, on the event loop's thread.
+
+    Servers only create it with DIAGNOSTICS_ENABLED, so by default none of
+    this costs anything:
+
+    * a watchdog thread posts a callback to the loop every half
+      ``block_threshold`` and times how long the loop takes to run it. That
+      delay is the loop lag; when it passes ``block_threshold`` the loop
+      thread's stack is captured, which names the blocking call (e.g. a
+      synchronous token refresh).
+    * ``profile`` samples the loop thread's stack for a few seconds.
+    * ``memory`` / ``memory_diff`` start tracemalloc on first use and report
+      top allocations, or the change since the previous call.
+    * ``tasks`` lists the asyncio tasks with their current stacks.
+    """
+    
+    def __init__(self, block_threshold: float = 0.1, max_events: int = 50):
+        self.block_threshold = block_threshold
+        self.blocked_calls: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._lags: Deque[float] = deque(maxlen=1000)
+        self._max_lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._pending: Optional[float] = None
+        self._blocked: Optional[Dict[str, Any]] = None
+        self._profiling = False
+        self._memory_baseline: Optional[tracemalloc.Snapshot] = None
+    
+    def start(self) -> None:
+        """Start the loop watchdog; call from the event loop"""
+        if self._watchdog is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("diagnostics_started", block_threshold=self.block_threshold)
+    
+    def stop(self) -> None:
+        self.stop_memory()
+        if self._watchdog is None:
+            return
+        self._stopped.set()
+        self._watchdog.join(timeout=1)
+        self._watchdog = None
+    
+    # Loop lag and blocked calls
+    
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.block_threshold / 2):
+            now = time.monotonic()
+            if self._pending is None:
+                self._pending = now
+                try:
+                    self._loop.call_soon_threadsafe(self._answer, now)
+                except RuntimeError:  # loop closed
+                    return
+            elif now - self._pending >= self.block_threshold and self._blocked is None:
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = _stack(frame) if frame is not None else []
+                self._blocked = {
+                    "detected_at": time.time(),
+                    "blocked_ms": None,  # Filled in once the loop runs again
+                    "call": stack[-1] if stack else None,
+                    "stack": stack
+                }
+                self.blocked_calls.append(self._blocked)
+    
+    def _answer(self, sent: float) -> None:
+        lag = time.monotonic() - sent
+        self._lags.append(lag)
+        self._max_lag = max(self._max_lag, lag)
+        if self._blocked is not None:
+            self._blocked["blocked_ms"] = round(lag * 1000, 1)
+            logger.warning("event_loop_blocked", blocked_ms=self._blocked["blocked_ms"], call=self._blocked["call"])
+            self._blocked = None
+        self._pending = None
+    
+    def loop_status(self) -> Dict[str, Any]:
+        lags = sorted(self._lags)
+        
+        def percentile(p: float) -> Optional[float]:
+            if not lags:
+                return None
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))] * 1000, 2)
+        
+        return {
+            "watching": self._watchdog is not None,
+            "block_threshold_ms": self.block_threshold * 1000,
+            "samples": len(lags),
+            "lag_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max": round(self._max_lag * 1000, 2)},
+            "blocked_calls": list(self.blocked_calls)
+        }
+    
+    # CPU profile
+    
+    def _sample_thread(self, samples: "_Samples", thread_id: int, seconds: float, interval: float) -> None:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                samples.add(frame)
+            time.sleep(interval)
+    
+    async def profile(self, seconds: float = 5, interval: float = 0.005, limit: int = 30) -> Dict[str, Any]:
+        """Sample the loop thread's stack every ``interval`` of CPU time for ``seconds``.
+        
+        Returns the hottest lines (own time), functions (including callees)
+        and collapsed stacks (``outer;...;inner``, as flame graph tools read
+        them). With the loop on the main thread a SIGPROF timer interrupts
+        the loop itself, so samples land on the code that is running. Elsewhere
+        a thread samples the loop's stack, which favours the points where the
+        loop releases the GIL, such as its I/O wait.
+        """
+        if self._profiling:
+            raise RuntimeError("A profile is already running")
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        samples = _Samples()
+        self._profiling = True
+        try:
+            if threading.current_thread() is threading.main_thread() and hasattr(signal, "SIGPROF"):
+                mode = "signal"
+                previous = signal.signal(signal.SIGPROF, lambda signum, frame: samples.add(frame))
+                signal.setitimer(signal.ITIMER_PROF, interval, interval)
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    signal.setitimer(signal.ITIMER_PROF, 0)
+                    signal.signal(signal.SIGPROF, previous)
+            else:
+                mode = "thread"
+                await asyncio.to_thread(self._sample_thread, samples, threading.get_ident(), seconds, interval)
+        finally:
+            self._profiling = False
+        
+        busy = samples.count - samples.idle
+        if mode == "signal":
+            # One sample per interval of process CPU time; idle samples are other threads' CPU
+            busy_percent = min(100.0, 100 * busy * interval / seconds)
+        else:
+            busy_percent = 100 * busy / samples.count if samples.count else 0.0
+        
+        def top(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"location": location, "samples": count, "percent": round(100 * count / samples.count, 1)}
+                for location, count in counter.most_common(limit)
+            ]
+        
+        return {
+            "mode": mode,
+            "seconds": seconds,
+            "samples": samples.count,
+            "loop_busy_percent": round(busy_percent, 1),
+            "top_own": top(samples.own),
+            "top_cumulative": top(samples.cumulative),
+            "stacks": [{"stack": stack, "samples": count} for stack, count in samples.stacks.most_common(limit)]
+        }
+    
+    # Memory
+    
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ])
+    
+    def _start_tracing(self, frames: int) -> bool:
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        self._memory_baseline = None
+        logger.info("tracemalloc_started", frames=frames)
+        return True
+    
+    async def memory(self, limit: int = 20, frames: int = 1) -> Dict[str, Any]:
+        """Top allocations by line. Tracing starts on the first call, so earlier allocations are not seen."""
+        started = self._start_tracing(frames)
+        snapshot = await asyncio.to_thread(self._snapshot)
+        if self._memory_baseline is None:
+            self._memory_baseline = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing_started": started,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:limit]
+            ]
+        }
+    
+    async def memory_diff(self, limit: int = 20, frames: int = 1) -> Dict[str, Any]:
+        """Allocation changes by line since the previous ``memory``/``memory_diff`` call"""
+        started = self._start_tracing(frames)
+        snapshot = await asyncio.to_thread(self._snapshot)
+        baseline, self._memory_baseline = self._memory_baseline, snapshot
+        if baseline is None:
+            return {"tracing_started": started, "baseline_taken": True, "diff": []}
+        return {
+            "tracing_started": started,
+            "baseline_taken": False,
+            "diff": [
+                {
+                    "location": str(stat.traceback),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count_diff": stat.count_diff
+                }
+                for stat in snapshot.compare_to(baseline, "lineno")[:limit]
+            ]
+        }
+    
+    def stop_memory(self) -> bool:
+        """Stop tracemalloc, removing its overhead; returns whether it was tracing"""
+        self._memory_baseline = None
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        logger.info("tracemalloc_stopped")
+        return True
+    
+    # Tasks
+    
+    def tasks(self, stack_limit: int = 10) -> List[Dict[str, Any]]:
+        """The running loop's asyncio tasks, with where each one is suspended"""
+        result = []
+        for task in asyncio.all_tasks():
+            coro = task.get_coro()
+            result.append({
+                "name": task.get_name(),
+                "coroutine": getattr(coro, "__qualname__", repr(coro)),
+                "cancelling": task.cancelling() if hasattr(task, "cancelling") else None,
+                "stack": [_location(frame) for frame in task.get_stack(limit=stack_limit)]
+            })
+        return sorted(result, key=lambda task: task["name"])
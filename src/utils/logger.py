@@ -6,7 +6,7 @@ import sys
 def configure_logging(log_level: str = "INFO", log_format: str = "json"):
     logging.basicConfig(
         format="%(message)s",
-        stream=sys.stdout,
+        stream=sys.stderr,  # stdout carries the MCP stdio transport
         level=getattr(logging, log_level.upper())
     )
     
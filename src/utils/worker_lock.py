@@ -0,0 +1,41 @@
+"""
+Election of the worker that runs background jobs.
+
+With several HTTP workers, the cache preload and the refresh scheduler
+should run once, not once per worker. Every worker tries to take an
+exclusive lock on the same file; the one that gets it runs the jobs and
+holds the lock until it exits, at which point the operating system
+releases it and another worker can take over.
+"""
+import fcntl
+import os
+from typing import Optional
+
+
+class WorkerLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+    
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+    
+    def acquire(self) -> bool:
+        """Take the lock without waiting; returns whether this process holds it"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+    
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
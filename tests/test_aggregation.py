@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.exceptions import NotFoundError
+from src.graph.models import PlannerPlan, PlannerTask
+from src.tools.aggregation_tools import AggregationTools
+
+NOW = datetime.now(timezone.utc)
+
+
+def due_in(days):
+    return (NOW + timedelta(days=days)).isoformat()
+
+
+class FakeGraph:
+    def __init__(self, plans):
+        # plan ID -> task dicts, or an exception to raise for that plan
+        self.plans = plans
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batches = []
+        self.failures = {}
+    
+    async def get_group_plans(self, group_id, select=None):
+        return [PlannerPlan.from_dict({"id": plan_id, "title": plan_id.upper()}) for plan_id in self.plans]
+    
+    async def _fetch(self, plan_ids):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            for plan_id in plan_ids:
+                if plan_id in self.failures:
+                    raise self.failures[plan_id]
+        finally:
+            self.in_flight -= 1
+    
+    async def get_plan_tasks(self, plan_id, select=None):
+        self.batches.append([plan_id])
+        await self._fetch([plan_id])
+        return [PlannerTask.from_dict(task) for task in self.plans[plan_id]]
+    
+    async def get_plans_tasks(self, plan_ids, select=None):
+        self.batches.append(list(plan_ids))
+        await self._fetch(plan_ids)
+        return {
+            plan_id: NotFoundError(f"Resource not found: {plan_id}") if self.plans[plan_id] is None
+            else [PlannerTask.from_dict(task) for task in self.plans[plan_id]]
+            for plan_id in plan_ids
+        }
+
+
+def plans(count):
+    return {
+        f"p{i}": [
+            {"id": f"p{i}-late", "planId": f"p{i}", "dueDateTime": due_in(-1), "percentComplete": 0, "assignments": {"u1": {}}},
+            {"id": f"p{i}-soon", "planId": f"p{i}", "dueDateTime": due_in(1), "percentComplete": 50, "assignments": {"u2": {}}},
+            {"id": f"p{i}-done", "planId": f"p{i}", "dueDateTime": due_in(-1), "percentComplete": 100}
+        ]
+        for i in range(count)
+    }
+
+
+@pytest.mark.asyncio
+async def test_overdue_and_at_risk_reports():
+    tools = AggregationTools(FakeGraph(plans(2)), MemoryCache())
+    overdue = await tools.rollup("g1", "overdue")
+    assert sorted(task["id"] for task in overdue["tasks"]) == ["p0-late", "p1-late"]
+    assert overdue["plans"] == {"total": 2, "failed": []}
+    at_risk = await tools.rollup("g1", "at_risk")
+    assert sorted(task["id"] for task in at_risk["tasks"]) == ["p0-soon", "p1-soon"]
+
+
+@pytest.mark.asyncio
+async def test_by_assignee_counts_per_user():
+    tools = AggregationTools(FakeGraph(plans(3)), MemoryCache())
+    summary = await tools.rollup("g1", "by_assignee")
+    assert summary["assignees"] == {
+        "u1": {"count": 3, "overdue": 3, "plans": 3},
+        "u2": {"count": 3, "overdue": 0, "plans": 3}
+    }
+    assert "tasks" not in summary
+
+
+@pytest.mark.asyncio
+async def test_invalid_reports_are_rejected():
+    tools = AggregationTools(FakeGraph(plans(1)), MemoryCache())
+    with pytest.raises(ValueError):
+        await tools.rollup("g1", "everything")
+    with pytest.raises(ValueError):
+        await tools.rollup("g1", "assigned")
+
+
+@pytest.mark.asyncio
+async def test_plans_are_fetched_in_batches_under_the_concurrency_limit():
+    graph = FakeGraph(plans(10))
+    tools = AggregationTools(graph, MemoryCache(), max_concurrency=2, batch_size=3)
+    summary = await tools.rollup("g1", "overdue")
+    assert summary["count"] == 10
+    assert sorted(len(batch) for batch in graph.batches) == [1, 3, 3, 3]
+    assert graph.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_plans_are_not_fetched_again():
+    graph = FakeGraph(plans(4))
+    cache = MemoryCache()
+    tools = AggregationTools(graph, cache)
+    await tools.rollup("g1", "overdue")
+    graph.batches.clear()
+    await tools.rollup("g1", "overdue")
+    assert graph.batches == []
+    assert len(await cache.get("plan_tasks:p2")) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("connection refused"),
+    httpx.ReadTimeout("timed out"),
+    asyncio.TimeoutError()
+])
+async def test_transport_failures_are_reported_per_plan(error):
+    graph = FakeGraph(plans(3))
+    graph.failures["p0"] = error
+    tools = AggregationTools(graph, MemoryCache(), batch_size=1)
+    summary = await tools.rollup("g1", "overdue")
+    assert [failure["planId"] for failure in summary["plans"]["failed"]] == ["p0"]
+    assert summary["plans"]["failed"][0]["error"]
+    assert summary["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_sub_request_is_reported_and_the_rest_are_kept():
+    graph = FakeGraph(plans(3))
+    graph.plans["p1"] = None
+    tools = AggregationTools(graph, MemoryCache())
+    events = [event async for event in tools.iter_rollup("g1", "overdue")]
+    assert [event.get("planId") for event in events if "error" in event] == ["p1"]
+    assert events[-1]["type"] == "summary"
+    assert events[-1]["count"] == 2
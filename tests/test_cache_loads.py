@@ -0,0 +1,147 @@
+import asyncio
+import fakeredis
+import pytest
+import pytest_asyncio
+from src.cache.codecs import CodecCache
+from src.cache.memory import MemoryCache
+from src.cache.redis_cache import RedisCache
+from src.cache.shared import SharedCacheClient, SharedCacheServer
+
+
+@pytest_asyncio.fixture(params=["memory", "codecs", "redis", "shared"])
+async def caches(request, tmp_path):
+    """Two cache instances over the same store, as two worker processes would have"""
+    if request.param == "memory":
+        cache = MemoryCache()
+        yield cache, cache
+    elif request.param == "codecs":
+        backend = MemoryCache()
+        yield CodecCache(backend, {"plan_tasks:": "json"}), CodecCache(backend, {"plan_tasks:": "json"})
+    elif request.param == "redis":
+        server = fakeredis.FakeServer()
+        yield tuple(RedisCache(fakeredis.FakeAsyncRedis(server=server)) for _ in range(2))
+    else:
+        server = SharedCacheServer(str(tmp_path / "cache.sock"))
+        await server.start()
+        clients = SharedCacheClient(server.socket_path), SharedCacheClient(server.socket_path)
+        yield clients
+        for client in clients:
+            await client.close()
+        await server.close()
+
+
+class Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+    
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_load(caches):
+    cache, _ = caches
+    loader = Loader([{"id": "t1"}])
+    callers = [asyncio.ensure_future(cache.get_or_load("plan_tasks:p1", loader)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    loader.release.set()
+    assert await asyncio.gather(*callers) == [[{"id": "t1"}]] * 5
+    assert loader.calls == 1
+    assert await cache.get("plan_tasks:p1") == [{"id": "t1"}]
+
+
+@pytest.mark.asyncio
+async def test_load_that_raced_an_invalidation_is_not_stored(caches):
+    cache, other = caches
+    loader = Loader([{"id": "old"}])
+    load = asyncio.ensure_future(cache.get_or_load("plan_tasks:p1", loader))
+    await asyncio.sleep(0.01)
+    # A write in (possibly) another process invalidates the key mid-load
+    await other.invalidate(["plan_tasks:p1"])
+    loader.release.set()
+    assert await load == [{"id": "old"}]
+    assert await cache.get("plan_tasks:p1") is None
+
+
+@pytest.mark.asyncio
+async def test_callers_after_an_invalidation_start_a_new_load(caches):
+    cache, _ = caches
+    old, new = Loader([{"id": "old"}]), Loader([{"id": "new"}])
+    first = asyncio.ensure_future(cache.get_or_load("plan_tasks:p1", old))
+    await asyncio.sleep(0.01)
+    await cache.invalidate(["plan_tasks:p1"])
+    second = asyncio.ensure_future(cache.get_or_load("plan_tasks:p1", new))
+    await asyncio.sleep(0.01)
+    new.release.set()
+    assert await second == [{"id": "new"}]
+    old.release.set()
+    assert await first == [{"id": "old"}]
+    assert await cache.get("plan_tasks:p1") == [{"id": "new"}]
+
+
+@pytest.mark.asyncio
+async def test_conditional_store_compares_the_shared_generation(caches):
+    cache, other = caches
+    generations = await cache.generations(["plan_tasks:p1", "plan:p1"])
+    await other.bump_generations(["plan_tasks:p1"])
+    await cache.set_many_if_unchanged({"plan_tasks:p1": [1], "plan:p1": {"id": "p1"}}, generations)
+    assert await other.get("plan_tasks:p1") is None
+    assert await other.get("plan:p1") == {"id": "p1"}
+    assert not await cache.set_if_unchanged("plan_tasks:p1", [1], generations["plan_tasks:p1"])
+    assert await cache.set_if_unchanged("plan_tasks:p1", [2], await cache.generation("plan_tasks:p1"))
+    assert await other.get("plan_tasks:p1") == [2]
+
+
+@pytest.mark.asyncio
+async def test_loads_of_other_keys_do_not_wait_for_each_other():
+    cache = MemoryCache()
+    
+    async def outer():
+        # Any key could share a stripe with this one
+        inner = [cache.get_or_load(f"plan:p{i}", lambda i=i: asyncio.sleep(0, i)) for i in range(cache.GENERATION_STRIPES + 1)]
+        return sum(await asyncio.gather(*inner))
+    
+    total = await asyncio.wait_for(cache.get_or_load("plan_tasks:p1", outer), 2)
+    assert total == sum(range(cache.GENERATION_STRIPES + 1))
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = MemoryCache()
+    loader = Loader({"id": "p1"})
+    first = asyncio.ensure_future(cache.get_or_load("plan:p1", loader))
+    second = asyncio.ensure_future(cache.get_or_load("plan:p1", loader))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    loader.release.set()
+    assert await second == {"id": "p1"}
+    assert await cache.get("plan:p1") == {"id": "p1"}
+
+
+@pytest.mark.asyncio
+async def test_failed_load_reaches_every_caller_and_is_not_kept():
+    cache = MemoryCache()
+    calls = 0
+    
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Graph down")
+    
+    results = await asyncio.gather(*(cache.get_or_load("plan:p1", failing) for _ in range(3)), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache._loads == {}
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("plan:p1", failing)
+    assert calls == 2
+
+
+def test_stripes_are_the_same_in_every_process():
+    # hash() of a str differs between processes; the stripe must not
+    assert MemoryCache()._stripe("plan_tasks:p1") == 593436643 % MemoryCache.GENERATION_STRIPES
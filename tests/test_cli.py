@@ -0,0 +1,179 @@
+import asyncio
+import json
+import httpx
+import pytest
+from click.testing import CliRunner
+import cli.mcp_cli as mcp_cli
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Routes the CLI's requests to a handler; records every request made"""
+    state = {"requests": [], "handler": None}
+    
+    def make_client(options):
+        def handler(request):
+            state["requests"].append(request)
+            return state["handler"](request)
+        return httpx.AsyncClient(base_url=options["base_url"], transport=httpx.MockTransport(handler))
+    
+    monkeypatch.setattr(mcp_cli, "make_client", make_client)
+    return state
+
+
+def plan_handler(request):
+    plan_id = request.url.path.rsplit("/", 1)[-1]
+    if plan_id == "missing":
+        return httpx.Response(404, json={"detail": "not found"})
+    return httpx.Response(200, json={"id": plan_id, "title": f"Plan {plan_id}", "owner": "g1"})
+
+
+def test_ids_come_from_arguments_options_and_stdin(server):
+    server["handler"] = plan_handler
+    result = CliRunner().invoke(mcp_cli.cli, ["get-plan", "--plan-id", "p1", "p2", "-"], input="p3\n\np2\n")
+    assert result.exit_code == 0, result.output
+    assert sorted(request.url.path for request in server["requests"]) == [
+        "/planner/plans/p1", "/planner/plans/p2", "/planner/plans/p3"
+    ]
+    assert "Plan p3" in result.output
+
+
+def test_piped_ids_are_read_without_a_dash(server):
+    server["handler"] = plan_handler
+    result = CliRunner().invoke(mcp_cli.cli, ["get-plan"], input="p1\np2\n")
+    assert result.exit_code == 0, result.output
+    assert len(server["requests"]) == 2
+
+
+def test_no_ids_is_a_usage_error(server):
+    result = CliRunner().invoke(mcp_cli.cli, ["get-plan"], input="")
+    assert result.exit_code == 2
+    assert "Give at least one plan ID" in result.output
+
+
+def test_failed_ids_are_reported_and_the_rest_still_run(server):
+    server["handler"] = plan_handler
+    result = CliRunner().invoke(mcp_cli.cli, ["get-plan", "p1", "missing", "p2"])
+    assert result.exit_code == 1
+    assert "Plan ID 'missing' not found" in result.output
+    assert "Plan p1" in result.output and "Plan p2" in result.output
+
+
+def test_base_url_option_is_used(server):
+    server["handler"] = plan_handler
+    CliRunner().invoke(mcp_cli.cli, ["--base-url", "http://planner.test:9000/", "get-plan", "p1"])
+    assert str(server["requests"][0].url) == "http://planner.test:9000/planner/plans/p1"
+
+
+def test_list_tasks_renders_streamed_rows(server):
+    def handler(request):
+        plan_id = request.url.path.split("/")[3]
+        assert request.url.params["stream"] == "true"
+        lines = [{"id": f"{plan_id}-t{i}", "title": f"Task {i}", "percentComplete": 0} for i in range(2)]
+        return httpx.Response(200, text="".join(json.dumps(line) + "\n" for line in lines))
+    
+    server["handler"] = handler
+    result = CliRunner().invoke(mcp_cli.cli, ["list-tasks", "p1", "p2"])
+    assert result.exit_code == 0, result.output
+    assert "4 tasks" in result.output
+
+
+def test_list_tasks_reports_a_stream_that_stopped_early(server):
+    server["handler"] = lambda request: httpx.Response(200, text='{"id": "t1"}\n{"error": "Graph API error"}\n')
+    result = CliRunner().invoke(mcp_cli.cli, ["list-tasks", "p1"])
+    assert result.exit_code == 1
+    assert "Listing stopped early: Graph API error" in result.output
+
+
+@pytest.mark.asyncio
+async def test_fan_out_bounds_concurrency_and_yields_in_completion_order():
+    in_flight = 0
+    most = 0
+    
+    async def call(item_id):
+        nonlocal in_flight, most
+        in_flight += 1
+        most = max(most, in_flight)
+        await asyncio.sleep(0.1 if item_id == "slow" else 0.01)
+        in_flight -= 1
+        if item_id == "bad":
+            raise ValueError("bad ID")
+        return item_id.upper()
+    
+    results = [item async for item in mcp_cli.fan_out(["slow", "a", "bad", "b"], call, 2)]
+    assert most == 2
+    assert results[-1] == ("slow", "SLOW", None)
+    errors = {item_id: error for item_id, _, error in results if error}
+    assert list(errors) == ["bad"] and isinstance(errors["bad"], ValueError)
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert mcp_cli.percentile(values, 50) == 50
+    assert mcp_cli.percentile(values, 99) == 99
+    assert mcp_cli.percentile(values, 100) == 100
+    assert mcp_cli.percentile([7.0], 1) == 7
+    assert mcp_cli.percentile([], 50) is None
+
+
+def test_summarize_counts_errors_and_throttling():
+    samples = [("get_plan", 0.010, 200), ("get_plan", 0.020, 200), ("get_plan", 0.030, 429), ("get_plan", 0.040, 500)]
+    summary = mcp_cli.summarize(samples, 2.0)
+    assert summary["requests"] == 4
+    assert summary["throughput_rps"] == 2.0
+    assert summary["latency_ms"]["p50"] == 20.0
+    assert summary["latency_ms"]["max"] == 40.0
+    assert summary["latency_ms"]["mean"] == 25.0
+    assert summary["error_rate"] == 0.5
+    assert summary["rate_limited_rate"] == 0.25
+
+
+def bench_handler():
+    counters = {"hits": 100, "misses": 50}
+    
+    def handler(request):
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"cache": dict(counters)})
+        if request.method == "PUT":
+            return httpx.Response(429, json={"detail": "Rate limited"})
+        counters["hits"] += 3
+        counters["misses"] += 1
+        return httpx.Response(200, json={"id": "p1"})
+    
+    return handler
+
+
+def test_bench_reports_a_mix_of_reads_and_writes(server, tmp_path):
+    server["handler"] = bench_handler()
+    output = tmp_path / "bench.json"
+    result = CliRunner().invoke(mcp_cli.cli, [
+        "--concurrency", "2", "bench", "--plan-id", "p1", "--task-id", "t1",
+        "--read-op", "get_plan", "--write-ratio", "0.5", "--duration", "0.2", "--seed", "1",
+        "--output", str(output)
+    ])
+    assert result.exit_code == 0, result.output
+    
+    results = json.loads(output.read_text())
+    assert set(results["operations"]) == {"get_plan", "update_task"}
+    assert results["operations"]["update_task"]["rate_limited_rate"] == 1
+    assert results["operations"]["get_plan"]["error_rate"] == 0
+    assert results["requests"] == sum(int(count) for count in results["statuses"].values())
+    assert results["cache"]["hit_ratio"] == 0.75
+    assert results["config"]["concurrency"] == 2
+
+
+def test_bench_at_a_target_rate_sends_on_schedule(server, tmp_path):
+    server["handler"] = bench_handler()
+    output = tmp_path / "bench.json"
+    result = CliRunner().invoke(mcp_cli.cli, [
+        "bench", "--plan-id", "p1", "--read-op", "get_plan", "--rps", "50", "--duration", "0.2",
+        "--output", str(output)
+    ])
+    assert result.exit_code == 0, result.output
+    assert json.loads(output.read_text())["requests"] == 10
+
+
+def test_bench_writes_need_task_ids(server):
+    result = CliRunner().invoke(mcp_cli.cli, ["bench", "--plan-id", "p1", "--write-ratio", "0.5"])
+    assert result.exit_code == 2
+    assert "--write-ratio needs at least one --task-id" in result.output
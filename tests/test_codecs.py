@@ -0,0 +1,75 @@
+import json
+import pytest
+from src.cache.codecs import CodecCache, Codec, Compression, JSONCodec, ZlibCompression
+from src.cache.memory import MemoryCache
+
+
+def make_cache(**kwargs) -> CodecCache:
+    return CodecCache(MemoryCache(), {"plan:": "json", "plan_tasks:": "json"}, **kwargs)
+
+
+def test_base_classes_are_abstract():
+    with pytest.raises(TypeError):
+        Codec()
+    with pytest.raises(TypeError):
+        Compression()
+
+
+def test_small_value_is_stored_uncompressed_with_header():
+    cache = make_cache()
+    encoded = cache.encode("plan:p1", {"id": "p1"})
+    assert encoded[:2] == JSONCodec.tag + b"-"
+    assert json.loads(encoded[2:]) == {"id": "p1"}
+    assert cache.decode("plan:p1", encoded) == {"id": "p1"}
+
+
+def test_large_value_is_compressed_and_round_trips():
+    cache = make_cache(compress_min_bytes=64)
+    tasks = [{"id": f"t{i}", "title": "x" * 50} for i in range(50)]
+    encoded = cache.encode("plan_tasks:p1", tasks)
+    assert encoded[:2] == JSONCodec.tag + ZlibCompression.tag
+    assert len(encoded) < len(json.dumps(tasks))
+    assert cache.decode("plan_tasks:p1", encoded) == tasks
+
+
+def test_longest_prefix_selects_the_codec():
+    cache = CodecCache(MemoryCache(), {"plan": "json", "plan_tasks:": "json"})
+    assert cache._codec_for("plan_tasks:p1") is cache._codecs[0][1]
+    assert cache._codec_for("task:t1") is None
+
+
+def test_keys_without_codec_are_stored_as_is():
+    cache = make_cache()
+    value = {"id": "t1"}
+    assert cache.encode("task:t1", value) is value
+    assert cache.decode("task:t1", value) is value
+
+
+def test_unknown_header_is_rejected():
+    cache = make_cache()
+    with pytest.raises(ValueError):
+        cache.decode("plan:p1", b"?-{}")
+
+
+@pytest.mark.parametrize("value", [b"z\x00{}", b"jj{}", b"j?{}", b"j", b""])
+def test_malformed_headers_are_rejected(value):
+    cache = make_cache()
+    with pytest.raises(ValueError):
+        cache.decode("plan:p1", value)
+
+
+def test_entries_written_with_other_compression_settings_decode():
+    writer = make_cache(compress_min_bytes=1)
+    reader = make_cache(compression="none")
+    encoded = writer.encode("plan:p1", {"id": "p1"})
+    assert reader.decode("plan:p1", encoded) == {"id": "p1"}
+
+
+@pytest.mark.asyncio
+async def test_get_raw_returns_json_bytes_for_compressed_entries():
+    cache = make_cache(compress_min_bytes=16)
+    value = {"id": "p1", "title": "A long enough title"}
+    await cache.set("plan:p1", value)
+    raw = await cache.get_raw("plan:p1")
+    assert json.loads(raw) == value
+    assert await cache.get("plan:p1") == value
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.exceptions import GraphAPIError, ServerError
+from src.graph.models import PlannerTask, PlannerTaskDetails
+from src.tools.create_ledger import CacheCreateLedger, CreateLedger
+from src.tools.task_tools import TaskTools
+
+
+class FakeGraph:
+    def __init__(self):
+        self.tasks = []
+        self.create_failures = []
+        self.details_failures = 0
+        self.creates = 0
+    
+    async def create_task(self, task_data):
+        self.creates += 1
+        task = PlannerTask.from_dict({
+            "id": f"t{len(self.tasks) + 1}",
+            "createdDateTime": datetime.now(timezone.utc).isoformat(),
+            **task_data
+        })
+        # The create may be applied even though the call fails
+        self.tasks.append(task)
+        if self.create_failures:
+            raise self.create_failures.pop(0)
+        return task
+    
+    async def get_plan_tasks(self, plan_id, select=None):
+        return [task for task in self.tasks if task.plan_id == plan_id]
+    
+    async def get_task_details(self, task_id):
+        return PlannerTaskDetails.from_dict({"id": task_id, "@odata.etag": "e1"})
+    
+    async def update_task_details(self, task_id, updates, etag):
+        if self.details_failures:
+            self.details_failures -= 1
+            raise GraphAPIError("details unavailable")
+        return PlannerTaskDetails.from_dict({"id": task_id, "@odata.etag": "e2", **updates})
+
+
+async def _no_sleep(delay):
+    return None
+
+
+@pytest.fixture(params=["memory", "cache"])
+def ledger(request):
+    """The in-process ledger, and the one shared by workers through the cache"""
+    if request.param == "cache":
+        return CacheCreateLedger(MemoryCache())
+    return CreateLedger()
+
+
+def make_tools(graph, ledger):
+    return TaskTools(graph, MemoryCache(), ledger=ledger, create_attempts=2)
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl():
+    ledger = CreateLedger(ttl=60)
+    await ledger.start("k1", "p1", "Title", None)
+    assert (await ledger.get("k1"))["state"] == "pending"
+    ledger._entries["k1"]["startedAt"] = time.time() - 61
+    assert await ledger.get("k1") is None
+
+
+@pytest.mark.asyncio
+async def test_oldest_entries_go_beyond_max_entries():
+    ledger = CreateLedger(max_entries=2)
+    for key in ("k1", "k2", "k3"):
+        await ledger.start(key, "p1", key, None)
+    assert await ledger.get("k1") is None
+    assert await ledger.get("k3") is not None
+
+
+@pytest.mark.asyncio
+async def test_ledger_survives_a_restart(tmp_path):
+    path = str(tmp_path / "ledger.json")
+    ledger = CreateLedger(path=path)
+    await ledger.start("k1", "p1", "Title", "b1")
+    await ledger.complete("k1", {"id": "t1"}, "Notes")
+    reloaded = CreateLedger(path=path)
+    assert (await reloaded.get("k1"))["task"] == {"id": "t1"}
+    assert (await reloaded.get("k1"))["description"] == "Notes"
+    assert await reloaded.claimed(["t1", "t2"]) == {"t1"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_changes_are_saved_together(tmp_path, monkeypatch):
+    path = str(tmp_path / "ledger.json")
+    ledger = CreateLedger(path=path)
+    writes = []
+    write = ledger._write
+    monkeypatch.setattr(ledger, "_write", lambda data: writes.append(data) or write(data))
+    
+    await asyncio.gather(*(ledger.start(f"k{i}", "p1", "Title", None) for i in range(10)))
+    # Changes made before the save starts are written together
+    assert len(writes) == 1
+    with open(path) as f:
+        assert sorted(json.load(f)) == sorted(f"k{i}" for i in range(10))
+
+
+@pytest.mark.asyncio
+async def test_cache_ledger_is_seen_by_every_worker():
+    cache = MemoryCache()
+    first, second = CacheCreateLedger(cache), CacheCreateLedger(cache)
+    await first.start("k1", "p1", "Title", None)
+    await first.complete("k1", {"id": "t1"})
+    assert (await second.get("k1"))["task"] == {"id": "t1"}
+    assert await second.claimed(["t1", "t2"]) == {"t1"}
+    await second.discard("k1")
+    assert await first.get("k1") is None
+
+
+@pytest.mark.asyncio
+async def test_repeated_key_replays_the_created_task(ledger):
+    graph = FakeGraph()
+    tools = make_tools(graph, ledger)
+    first = await tools.create_task("p1", "Title", idempotency_key="k1")
+    again = await tools.create_task("p1", "Title", idempotency_key="k1")
+    assert again["id"] == first["id"]
+    assert again["replayed"] is True
+    assert graph.creates == 1
+
+
+@pytest.mark.asyncio
+async def test_uncertain_failure_is_reconciled_instead_of_repeated(monkeypatch, ledger):
+    monkeypatch.setattr("src.tools.task_tools.asyncio.sleep", _no_sleep)
+    graph = FakeGraph()
+    graph.create_failures = [ServerError("timeout after apply")]
+    tools = make_tools(graph, ledger)
+    result = await tools.create_task("p1", "Title", idempotency_key="k1")
+    assert result["id"] == "t1"
+    assert graph.creates == 1
+    assert len(graph.tasks) == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_entry_from_a_restart_is_reconciled(ledger):
+    graph = FakeGraph()
+    await ledger.start("k1", "p1", "Title", None)
+    await graph.create_task({"planId": "p1", "title": "Title"})
+    tools = make_tools(graph, ledger)
+    result = await tools.create_task("p1", "Title", idempotency_key="k1")
+    assert result["id"] == "t1"
+    assert graph.creates == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_description_is_reported_and_written_on_replay(ledger):
+    graph = FakeGraph()
+    graph.details_failures = 1
+    tools = make_tools(graph, ledger)
+    
+    result = await tools.create_task("p1", "Title", description="Notes", idempotency_key="k1")
+    assert result["id"] == "t1"
+    assert "detailsError" in result
+    assert (await ledger.get("k1"))["state"] == "created"
+    assert (await ledger.get("k1"))["description"] == "Notes"
+    
+    again = await tools.create_task("p1", "Title", description="Notes", idempotency_key="k1")
+    assert again["id"] == "t1"
+    assert again["details"]["description"] == "Notes"
+    assert (await ledger.get("k1"))["description"] is None
+    assert graph.creates == 1
+
+
+@pytest.mark.asyncio
+async def test_creates_without_a_key_are_not_recorded(monkeypatch):
+    monkeypatch.setattr("src.tools.task_tools.asyncio.sleep", _no_sleep)
+    graph = FakeGraph()
+    graph.create_failures = [ServerError("timeout after apply")]
+    ledger = CreateLedger()
+    tools = make_tools(graph, ledger)
+    
+    result = await tools.create_task("p1", "Title", description="Notes")
+    # The call's own retry still finds the task instead of creating another
+    assert result["id"] == "t1"
+    assert graph.creates == 1
+    assert "idempotencyKey" not in result
+    assert ledger._entries == {}
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import tracemalloc
+import httpx
+import pytest
+import pytest_asyncio
+import src.http_test_server as http_server
+import src.server as mcp_server
+from src.utils.diagnostics import Diagnostics
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(http_server, "services_initialized", True)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=http_server.app), base_url="http://test") as client:
+        yield client
+
+
+@pytest_asyncio.fixture
+async def diagnostics():
+    diagnostics = Diagnostics(block_threshold=0.05)
+    diagnostics.start()
+    yield diagnostics
+    diagnostics.stop()
+
+
+def spin(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", [
+    "/admin/diagnostics/loop",
+    "/admin/diagnostics/tasks",
+    "/admin/diagnostics/memory",
+    "/admin/diagnostics/memory/diff",
+    "/admin/diagnostics/profile"
+])
+async def test_routes_are_not_found_while_disabled(client, monkeypatch, path):
+    monkeypatch.setattr(http_server, "diagnostics", None)
+    response = await client.get(path)
+    assert response.status_code == 404
+    assert "DIAGNOSTICS_ENABLED" in response.json()["detail"]
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.asyncio
+async def test_tool_reports_that_diagnostics_are_disabled(monkeypatch):
+    monkeypatch.setattr(mcp_server, "diagnostics", None)
+    result = await mcp_server.diagnostics_report("memory")
+    assert "DIAGNOSTICS_ENABLED" in result["error"]
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.asyncio
+async def test_nothing_runs_until_started():
+    diagnostics = Diagnostics()
+    assert diagnostics.loop_status()["watching"] is False
+    diagnostics.start()
+    assert diagnostics.loop_status()["watching"] is True
+    diagnostics.stop()
+    assert diagnostics.loop_status()["watching"] is False
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_reported_with_its_stack(diagnostics):
+    await asyncio.sleep(0.1)
+    spin(0.3)
+    await asyncio.sleep(0.1)
+    
+    status = diagnostics.loop_status()
+    assert status["samples"] > 0
+    assert status["lag_ms"]["max"] >= 200
+    blocked = status["blocked_calls"][0]
+    assert blocked["blocked_ms"] >= 200
+    assert "spin" in blocked["call"]
+
+
+@pytest.mark.asyncio
+async def test_memory_tracing_starts_on_first_use_and_stops_on_request():
+    diagnostics = Diagnostics()
+    try:
+        first = await diagnostics.memory(limit=5)
+        assert first["tracing_started"] is True
+        assert tracemalloc.is_tracing()
+        
+        blocks = [bytearray(1024) for _ in range(1000)]
+        diff = await diagnostics.memory_diff(limit=5)
+        assert diff["tracing_started"] is False
+        assert diff["baseline_taken"] is False
+        assert any(entry["size_diff_kb"] > 500 for entry in diff["diff"])
+        del blocks
+    finally:
+        assert diagnostics.stop_memory() is True
+    assert not tracemalloc.is_tracing()
+    assert diagnostics.stop_memory() is False
+
+
+@pytest.mark.asyncio
+async def test_profile_finds_the_busy_function(monkeypatch, client):
+    diagnostics = Diagnostics()
+    monkeypatch.setattr(http_server, "diagnostics", diagnostics)
+    
+    async def busy():
+        await asyncio.sleep(0.02)
+        spin(0.3)
+    
+    profile, _ = await asyncio.gather(diagnostics.profile(0.1, interval=0.005), busy())
+    assert profile["samples"] > 0
+    assert any("spin" in entry["location"] for entry in profile["top_cumulative"])
+    
+    # One profile at a time
+    running = asyncio.ensure_future(diagnostics.profile(0.2))
+    await asyncio.sleep(0.01)
+    response = await client.get("/admin/diagnostics/profile", params={"seconds": 0.1})
+    assert response.status_code == 409
+    await running
+
+
+@pytest.mark.asyncio
+async def test_tasks_are_listed_through_the_tool(monkeypatch):
+    monkeypatch.setattr(mcp_server, "diagnostics", Diagnostics())
+    waiter = asyncio.ensure_future(asyncio.sleep(1))
+    waiter.set_name("sleeper")
+    try:
+        result = await mcp_server.diagnostics_report("tasks", limit=100)
+        assert "sleeper" in [task["name"] for task in result["tasks"]]
+        assert (await mcp_server.diagnostics_report("nope"))["error"].startswith("Unknown action")
+    finally:
+        waiter.cancel()
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from src.graph.exceptions import NotFoundError
+from src.graph.models import PlannerBucket, PlannerPlan, PlannerTask, PlannerTaskDetails
+from src.tools.export import PlanExporter
+
+
+class FakeGraph:
+    def __init__(self, tasks_per_plan=3, pages=1, missing_details=()):
+        self.tasks_per_plan = tasks_per_plan
+        self.pages = pages
+        self.missing_details = set(missing_details)
+    
+    async def get_plan(self, plan_id, select=None):
+        return PlannerPlan.from_dict({"id": plan_id, "title": plan_id})
+    
+    async def get_plan_buckets(self, plan_id, select=None):
+        return [PlannerBucket.from_dict({"id": f"{plan_id}-b1", "planId": plan_id, "name": "Bucket"})]
+    
+    async def iter_plan_tasks(self, plan_id, select=None):
+        for page in range(self.pages):
+            await asyncio.sleep(0)
+            yield [
+                PlannerTask.from_dict({"id": f"{plan_id}-p{page}-t{i}", "planId": plan_id, "title": "Task"})
+                for i in range(self.tasks_per_plan)
+            ]
+    
+    async def get_tasks_details(self, task_ids):
+        return {
+            task_id: NotFoundError(f"Resource not found: {task_id}") if task_id in self.missing_details
+            else PlannerTaskDetails.from_dict({"id": task_id, "description": ""})
+            for task_id in task_ids
+        }
+
+
+async def collect(records):
+    return [item async for item in records]
+
+
+@pytest.mark.asyncio
+async def test_plans_are_exported_in_order_with_counts():
+    exporter = PlanExporter(FakeGraph(pages=2), concurrency=2, buffer_pages=1)
+    records = await collect(exporter.export(["p1", "p2", "p1"], include_details=True))
+    
+    assert [item["planId"] for item in records if item["type"] == "plan_done"] == ["p1", "p2"]
+    done = next(item for item in records if item["type"] == "plan_done")
+    assert done["counts"] == {"plan": 1, "bucket": 1, "task": 6, "task_details": 6}
+    # A plan's records all come before the next plan's
+    plan_order = [item["planId"] for item in records]
+    assert plan_order == sorted(plan_order)
+
+
+@pytest.mark.asyncio
+async def test_failed_task_details_give_an_error_record_and_the_plan_goes_on():
+    exporter = PlanExporter(FakeGraph(missing_details={"p1-p0-t1"}))
+    records = await collect(exporter.export(["p1"], include_details=True))
+    
+    errors = [item for item in records if item["type"] == "error"]
+    assert errors == [{
+        "type": "error",
+        "planId": "p1",
+        "taskId": "p1-p0-t1",
+        "error": "Resource not found: p1-p0-t1",
+        "partial": False
+    }]
+    assert records[-1]["type"] == "plan_done"
+    assert records[-1]["counts"]["task_details"] == 2
+
+
+@pytest.mark.asyncio
+async def test_closing_the_export_early_stops_the_plans_fetching_ahead():
+    exporter = PlanExporter(FakeGraph(pages=50), concurrency=3, buffer_pages=1)
+    records = exporter.export(["p1", "p2", "p3"])
+    while (await records.__anext__())["type"] != "task":
+        pass
+    await records.aclose()
+    assert asyncio.all_tasks() == {asyncio.current_task()}
@@ -0,0 +1,118 @@
+import json
+import httpx
+import pytest
+from src.graph.client import GraphAPIClient
+from src.graph.exceptions import NotFoundError
+from src.graph.models import PlannerTask, TASK_LIST_FIELDS
+
+
+class StaticAuth:
+    def get_token(self):
+        return "token"
+
+
+def make_client(handler) -> GraphAPIClient:
+    client = GraphAPIClient(auth_manager=StaticAuth())
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_query_adds_expanded_properties_to_the_projection():
+    assert GraphAPIClient._query() == {}
+    assert GraphAPIClient._query(["id", "title"]) == {"$select": "id,title"}
+    assert GraphAPIClient._query(["id"], ["details"]) == {"$select": "id,details", "$expand": "details"}
+    assert GraphAPIClient._query(None, ["details"]) == {"$expand": "details"}
+
+
+@pytest.mark.asyncio
+async def test_get_task_sends_select_and_expand():
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={
+            "id": "t1",
+            "title": "Write report",
+            "details": {"id": "t1", "description": "Q3", "checklist": {"c1": {"title": "Draft"}}}
+        })
+    
+    client = make_client(handler)
+    task = await client.get_task("t1", select=["id", "title"], expand=["details"])
+    await client.client.aclose()
+    
+    assert requests[0].url.params["$select"] == "id,title,details"
+    assert requests[0].url.params["$expand"] == "details"
+    assert task.details.description == "Q3"
+    assert task.to_dict() == {
+        "id": "t1",
+        "title": "Write report",
+        "details": {"id": "t1", "description": "Q3", "checklist": {"c1": {"title": "Draft"}}}
+    }
+
+
+@pytest.mark.asyncio
+async def test_plan_tasks_follow_next_links_with_the_projection():
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        if "skiptoken" in str(request.url):
+            return httpx.Response(200, json={"value": [{"id": "t2", "title": "B"}]})
+        return httpx.Response(200, json={
+            "value": [{"id": "t1", "title": "A"}],
+            "@odata.nextLink": "https://graph.microsoft.com/v1.0/planner/plans/p1/tasks?$select=id,title&$skiptoken=x"
+        })
+    
+    client = make_client(handler)
+    tasks = await client.get_plan_tasks("p1", select=TASK_LIST_FIELDS)
+    await client.client.aclose()
+    
+    assert [task.id for task in tasks] == ["t1", "t2"]
+    assert requests[0].url.params["$select"] == ",".join(TASK_LIST_FIELDS)
+    assert len(requests) == 2
+
+
+def test_partial_tasks_leave_out_fields_that_were_not_fetched():
+    assert PlannerTask.from_dict({"id": "t1"}).to_dict() == {"id": "t1"}
+    task = PlannerTask.from_dict({"id": "t1", "percentComplete": 0, "planId": "p1"})
+    assert task.to_dict() == {"id": "t1", "percentComplete": 0, "planId": "p1"}
+
+
+@pytest.mark.asyncio
+async def test_batched_reads_map_each_id_to_its_result_or_error():
+    batches = []
+    
+    def handler(request):
+        body = json.loads(request.content)
+        batches.append(body["requests"])
+        return httpx.Response(200, json={"responses": [
+            {"id": "1", "status": 404, "body": {"error": {"message": "gone"}}},
+            {"id": "0", "status": 200, "body": {"id": "t1", "title": "A"}}
+        ]})
+    
+    client = make_client(handler)
+    results = await client.get_tasks(["t1", "t2"], select=["id", "title"])
+    await client.client.aclose()
+    
+    assert [item["url"] for item in batches[0]] == [
+        "/planner/tasks/t1?$select=id,title",
+        "/planner/tasks/t2?$select=id,title"
+    ]
+    assert results["t1"].title == "A"
+    assert isinstance(results["t2"], NotFoundError)
+
+
+@pytest.mark.asyncio
+async def test_batched_plan_tasks_follow_sub_request_next_links():
+    def handler(request):
+        if request.url.path.endswith("$batch"):
+            return httpx.Response(200, json={"responses": [{"id": "0", "status": 200, "body": {
+                "value": [{"id": "t1"}],
+                "@odata.nextLink": "https://graph.microsoft.com/v1.0/planner/plans/p1/tasks?$skiptoken=x"
+            }}]})
+        return httpx.Response(200, json={"value": [{"id": "t2"}]})
+    
+    client = make_client(handler)
+    results = await client.get_plans_tasks(["p1"])
+    await client.client.aclose()
+    assert [task.id for task in results["p1"]] == ["t1", "t2"]
@@ -0,0 +1,133 @@
+import json
+import httpx
+import pytest
+import pytest_asyncio
+import src.http_test_server as server
+from src.graph.exceptions import NotFoundError, ServerError
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(server, "services_initialized", True)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        yield client
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class FailingRollup:
+    async def iter_rollup(self, group_id, report, assignee_id, within_days):
+        yield {"type": "plan", "planId": "p1", "count": 0, "tasks": []}
+        raise RuntimeError("cache backend went away")
+
+
+@pytest.mark.asyncio
+async def test_streamed_rollup_failure_ends_with_an_error_line(client, monkeypatch):
+    monkeypatch.setattr(server, "aggregation_tools", FailingRollup())
+    response = await client.get("/planner/groups/g1/rollup", params={"stream": "true"})
+    assert response.status_code == 200
+    assert ndjson(response) == [
+        {"type": "plan", "planId": "p1", "count": 0, "tasks": []},
+        {"type": "error", "error": "cache backend went away"}
+    ]
+
+
+class FakePlanTools:
+    def __init__(self, pages, error=None):
+        self.pages = pages
+        self.error = error
+    
+    async def iter_plan_tasks(self, plan_id):
+        for page in self.pages:
+            yield page
+        if self.error:
+            raise self.error
+
+
+@pytest.mark.asyncio
+async def test_streamed_tasks_are_written_one_per_line(client, monkeypatch):
+    monkeypatch.setattr(server, "plan_tools", FakePlanTools([[{"id": "t1"}, {"id": "t2"}], [{"id": "t3"}]]))
+    response = await client.get("/planner/plans/p1/tasks", params={"stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert ndjson(response) == [{"id": "t1"}, {"id": "t2"}, {"id": "t3"}]
+
+
+@pytest.mark.asyncio
+async def test_empty_listing_streams_an_empty_body(client, monkeypatch):
+    monkeypatch.setattr(server, "plan_tools", FakePlanTools([]))
+    response = await client.get("/planner/plans/p1/tasks", params={"stream": "true"})
+    assert response.status_code == 200
+    assert response.text == ""
+
+
+@pytest.mark.asyncio
+async def test_failure_before_the_first_page_gets_an_error_status(client, monkeypatch):
+    monkeypatch.setattr(server, "plan_tools", FakePlanTools([], NotFoundError("Resource not found: p1")))
+    response = await client.get("/planner/plans/p1/tasks", params={"stream": "true"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_failure_after_the_first_page_ends_with_an_error_line(client, monkeypatch):
+    monkeypatch.setattr(server, "plan_tools", FakePlanTools([[{"id": "t1"}]], ServerError("Graph API error")))
+    response = await client.get("/planner/plans/p1/tasks", params={"stream": "true"})
+    assert response.status_code == 200
+    assert ndjson(response) == [{"id": "t1"}, {"error": "Graph API error"}]
+
+
+class CachedPlanTools:
+    def __init__(self, payload):
+        self.payload = payload
+    
+    async def get_plan_json(self, plan_id):
+        return self.payload
+
+
+def test_cached_bytes_and_values_get_the_same_etag():
+    request = server.Request({"type": "http", "headers": []})
+    value = {"id": "p1", "title": "Launch"}
+    from_bytes = server.cached_json_response(request, json.dumps(value, separators=(",", ":")).encode())
+    from_value = server.cached_json_response(request, value)
+    assert from_bytes.headers["etag"] == from_value.headers["etag"]
+    assert from_bytes.body == from_value.body
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_gets_not_modified(client, monkeypatch):
+    monkeypatch.setattr(server, "plan_tools", CachedPlanTools(b'{"id":"p1"}'))
+    response = await client.get("/planner/plans/p1")
+    etag = response.headers["etag"]
+    assert response.json() == {"id": "p1"}
+    assert response.headers["cache-control"] == f"private, max-age={server.settings.cache_ttl_seconds}"
+    
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = await client.get("/planner/plans/p1", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    
+    response = await client.get("/planner/plans/p1", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_large_bodies_are_compressed_when_accepted(client, monkeypatch):
+    payload = json.dumps({"id": "p1", "title": "x" * (server.settings.http_compress_min_bytes * 2)}).encode()
+    monkeypatch.setattr(server, "plan_tools", CachedPlanTools(payload))
+    response = await client.get("/planner/plans/p1", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == payload
+    
+    response = await client.get("/planner/plans/p1", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == payload
+
+
+@pytest.mark.asyncio
+async def test_small_bodies_are_sent_uncompressed(client, monkeypatch):
+    monkeypatch.setattr(server, "plan_tools", CachedPlanTools(b'{"id":"p1"}'))
+    response = await client.get("/planner/plans/p1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
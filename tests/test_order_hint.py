@@ -0,0 +1,91 @@
+import random
+import pytest
+from src.graph.order_hint import between, spread, plan_reorder
+
+
+def test_between_respects_bounds():
+    assert between() > ""
+    assert between("a") > "a"
+    assert between(None, "b") < "b"
+    hint = between("a", "b")
+    assert "a" < hint < "b"
+
+
+def test_between_goes_deeper_when_neighbours_are_adjacent():
+    hint = between("a", "a#")
+    assert "a" < hint < "a#"
+    assert not hint.endswith("!")
+
+
+@pytest.mark.parametrize("after", ["!", '"', "#", "!!", " !", "!#", '"!'])
+def test_between_extends_below_the_lowest_hint_characters(after):
+    hint = between(None, after)
+    assert hint < after
+    assert ord(hint[-1]) > ord('"')
+    assert between(hint, after) < after
+
+
+def test_repeated_inserts_at_the_top_of_a_service_hint_stay_ordered():
+    hints = ["!"]
+    for _ in range(100):
+        hints.insert(0, between(None, hints[0]))
+    assert hints == sorted(hints)
+    assert len(set(hints)) == len(hints)
+    assert not any(hint.endswith("!") for hint in hints[:-1])
+
+
+def test_between_rejects_unordered_bounds():
+    with pytest.raises(ValueError):
+        between("b", "a")
+    with pytest.raises(ValueError):
+        between("a", "a")
+
+
+def test_repeated_inserts_stay_ordered():
+    rng = random.Random(7)
+    hints = [between()]
+    for _ in range(500):
+        position = rng.randint(0, len(hints))
+        before = hints[position - 1] if position else None
+        after = hints[position] if position < len(hints) else None
+        hints.insert(position, between(before, after))
+    assert hints == sorted(hints)
+    assert len(set(hints)) == len(hints)
+
+
+def test_spread_is_increasing_and_short():
+    hints = spread(1000, "a", "b")
+    assert hints == sorted(hints)
+    assert len(set(hints)) == 1000
+    assert all("a" < hint < "b" for hint in hints)
+    assert max(len(hint) for hint in hints) <= 4
+
+
+def test_plan_reorder_keeps_hints_already_in_order():
+    items = [("t1", "a"), ("t2", "b"), ("t3", "c")]
+    assert plan_reorder(items) == {}
+
+
+def test_plan_reorder_moves_only_out_of_place_items():
+    items = [("t3", "c"), ("t1", "a"), ("t2", "b")]
+    changes = plan_reorder(items)
+    assert set(changes) == {"t3"}
+    assert changes["t3"] < "a"
+
+
+def test_plan_reorder_places_items_without_hint():
+    items = [("t1", "a"), ("new", None), ("t2", "b")]
+    changes = plan_reorder(items)
+    assert set(changes) == {"new"}
+    assert "a" < changes["new"] < "b"
+
+
+def test_plan_reorder_result_sorts_in_the_given_order():
+    rng = random.Random(3)
+    hints = spread(50)
+    items = [(f"t{i}", hint) for i, hint in enumerate(hints)]
+    rng.shuffle(items)
+    changes = plan_reorder(items)
+    final = [changes.get(item_id, hint) for item_id, hint in items]
+    assert final == sorted(final)
+    assert len(changes) < len(items)
@@ -0,0 +1,95 @@
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.models import PlannerBucket, PlannerPlan, PlannerTask
+from src.tools.plan_tools import PlanTools, build_board
+from src.tools.task_tools import TaskTools
+
+PLAN = {"id": "p1", "title": "Launch"}
+BUCKETS = [
+    {"id": "b2", "name": "Doing", "planId": "p1", "orderHint": "8"},
+    {"id": "b1", "name": "To do", "planId": "p1", "orderHint": "4"}
+]
+TASKS = [
+    {"id": "t1", "title": "C", "planId": "p1", "bucketId": "b1", "orderHint": "9", "percentComplete": 0},
+    {"id": "t2", "title": "A", "planId": "p1", "bucketId": "b1", "orderHint": "1", "percentComplete": 100},
+    {"id": "t3", "title": "B", "planId": "p1", "bucketId": "b2", "orderHint": "5", "percentComplete": 50},
+    {"id": "t4", "title": "D", "planId": "p1", "bucketId": "gone", "percentComplete": 0}
+]
+
+
+class FakeGraph:
+    def __init__(self):
+        self.calls = {"plan": 0, "buckets": 0, "tasks": 0}
+        self.tasks = [dict(task) for task in TASKS]
+    
+    async def get_plan(self, plan_id, select=None):
+        self.calls["plan"] += 1
+        return PlannerPlan.from_dict(PLAN)
+    
+    async def get_plan_buckets(self, plan_id, select=None):
+        self.calls["buckets"] += 1
+        return [PlannerBucket.from_dict(bucket) for bucket in BUCKETS]
+    
+    async def get_plan_tasks(self, plan_id, select=None, expand=None):
+        self.calls["tasks"] += 1
+        return [PlannerTask.from_dict(task) for task in self.tasks]
+    
+    async def create_task(self, task_data):
+        task = {"id": f"t{len(self.tasks) + 1}", **task_data}
+        self.tasks.append(task)
+        return PlannerTask.from_dict(task)
+
+
+def board_of(tasks):
+    return build_board(
+        PlannerPlan.from_dict(PLAN),
+        [PlannerBucket.from_dict(bucket) for bucket in BUCKETS],
+        [PlannerTask.from_dict(task) for task in tasks]
+    )
+
+
+def test_tasks_are_grouped_per_bucket_in_order():
+    board = board_of(TASKS)
+    assert [column["id"] for column in board["buckets"]] == ["b1", "b2", None]
+    assert [task["id"] for task in board["buckets"][0]["tasks"]] == ["t2", "t1"]
+    assert board["buckets"][2]["name"] == "No bucket"
+    assert [column["taskCount"] for column in board["buckets"]] == [2, 1, 1]
+    assert board["buckets"][0]["completedCount"] == 1
+
+
+def test_counts_cover_the_whole_plan():
+    assert board_of(TASKS)["counts"] == {"tasks": 4, "completed": 1, "inProgress": 1, "notStarted": 2, "buckets": 2}
+
+
+def test_empty_plan_keeps_its_buckets():
+    board = board_of([])
+    assert [column["taskCount"] for column in board["buckets"]] == [0, 0]
+    assert board["counts"]["tasks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_board_is_cached_as_one_unit_and_fills_the_views():
+    graph, cache = FakeGraph(), MemoryCache()
+    tools = PlanTools(graph, cache)
+    board = await tools.get_plan_board("p1")
+    assert await tools.get_plan_board("p1") == board
+    assert graph.calls == {"plan": 1, "buckets": 1, "tasks": 1}
+    
+    # The individual views came with the board
+    assert [task["id"] for task in await tools.get_plan_tasks("p1")] == ["t1", "t2", "t3", "t4"]
+    assert await cache.get("plan:p1") == PLAN
+    assert graph.calls["tasks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_task_mutation_invalidates_the_board():
+    graph, cache = FakeGraph(), MemoryCache()
+    plan_tools = PlanTools(graph, cache)
+    task_tools = TaskTools(graph, cache)
+    await plan_tools.get_plan_board("p1")
+    
+    await task_tools.create_task("p1", "E", bucket_id="b2")
+    board = await plan_tools.get_plan_board("p1")
+    assert graph.calls["tasks"] == 2
+    assert board["counts"]["tasks"] == 5
+    assert [task["title"] for task in board["buckets"][1]["tasks"]] == ["B", "E"]
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.exceptions import NotFoundError
+from src.graph.models import PlannerBucket, PlannerPlan, PlannerTask
+from src.tools.aggregation_tools import AggregationTools
+from src.tools.plan_tools import PlanTools
+from src.tools.preload import CachePreloader
+
+
+class FakeGraph:
+    def __init__(self, groups):
+        self.groups = groups
+        self.plan_reads = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def get_group_plans(self, group_id, select=None):
+        if group_id not in self.groups:
+            raise NotFoundError(f"Resource not found: {group_id}")
+        return [PlannerPlan.from_dict({"id": plan_id}) for plan_id in self.groups[group_id]]
+    
+    async def get_plan(self, plan_id, select=None):
+        self.plan_reads.append(plan_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if plan_id == "broken":
+            raise NotFoundError(f"Resource not found: {plan_id}")
+        return PlannerPlan.from_dict({"id": plan_id, "title": plan_id})
+    
+    async def get_plan_buckets(self, plan_id, select=None):
+        return [PlannerBucket.from_dict({"id": "b1", "name": "To do", "planId": plan_id})]
+    
+    async def get_plan_tasks(self, plan_id, select=None):
+        return [PlannerTask.from_dict({"id": f"{plan_id}-t1", "planId": plan_id, "bucketId": "b1"})]
+
+
+def make_preloader(graph, cache, plan_ids=(), group_ids=(), concurrency=4):
+    return CachePreloader(PlanTools(graph, cache), AggregationTools(graph, cache), plan_ids, group_ids, concurrency)
+
+
+@pytest.mark.asyncio
+async def test_group_plans_are_added_to_the_configured_ones():
+    graph, cache = FakeGraph({"g1": ["p2", "p3"], "g2": ["p3", "p4"]}), MemoryCache()
+    status = await make_preloader(graph, cache, ["p1", "p2"], ["g1", "g2"]).run()
+    assert sorted(graph.plan_reads) == ["p1", "p2", "p3", "p4"]
+    assert status["state"] == "done"
+    assert status["groups"] == {"total": 2, "done": 2, "failed": 0}
+    assert status["plans"] == {"total": 4, "done": 4, "failed": 0}
+    for plan_id in ("p1", "p4"):
+        assert await cache.get(f"plan_board:{plan_id}") is not None
+        assert await cache.get(f"plan_tasks:{plan_id}") == [{"id": f"{plan_id}-t1", "planId": plan_id, "bucketId": "b1"}]
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted_and_the_rest_is_loaded():
+    graph = FakeGraph({"g1": ["p1"]})
+    status = await make_preloader(graph, MemoryCache(), ["broken", "p2"], ["g1", "missing"]).run()
+    assert status["groups"] == {"total": 2, "done": 1, "failed": 1}
+    assert status["plans"] == {"total": 3, "done": 2, "failed": 1}
+    assert sorted(error["id"] for error in status["errors"]) == ["broken", "missing"]
+
+
+@pytest.mark.asyncio
+async def test_at_most_concurrency_plans_load_at_a_time():
+    graph = FakeGraph({})
+    await make_preloader(graph, MemoryCache(), [f"p{i}" for i in range(10)], concurrency=3).run()
+    assert graph.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_nothing_configured_is_disabled():
+    status = await make_preloader(FakeGraph({}), MemoryCache()).run()
+    assert status["state"] == "disabled"
+
+
+@pytest.mark.asyncio
+async def test_restored_snapshot_is_not_fetched_again(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    graph, cache = FakeGraph({}), MemoryCache()
+    await make_preloader(graph, cache, ["p1", "p2"]).run()
+    assert await cache.snapshot(path) == 8
+    
+    restarted_graph, restarted = FakeGraph({}), MemoryCache()
+    assert await restarted.restore(path) == 8
+    status = await make_preloader(restarted_graph, restarted, ["p1", "p2"]).run()
+    assert restarted_graph.plan_reads == []
+    assert status["plans"]["done"] == 2
+    assert await restarted.get("plan_board:p1") == await cache.get("plan_board:p1")
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_a_running_preload():
+    preloader = make_preloader(FakeGraph({}), MemoryCache(), [f"p{i}" for i in range(50)], concurrency=1)
+    preloader.start()
+    await asyncio.sleep(0.02)
+    await preloader.stop()
+    assert preloader.status["state"] == "cancelled"
+    assert preloader.status["plans"]["done"] < 50
@@ -0,0 +1,103 @@
+import pytest
+import pytest_asyncio
+from src.cache.codecs import CodecCache
+from src.cache.memory import MemoryCache
+from src.cache.redis_cache import RedisCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest_asyncio.fixture
+async def server():
+    return fakeredis.FakeServer()
+
+
+def make_cache(server, namespace="planner-mcp:"):
+    return RedisCache(fakeredis.FakeAsyncRedis(server=server), default_ttl=300, namespace=namespace)
+
+
+@pytest.mark.asyncio
+async def test_values_round_trip(server):
+    cache = make_cache(server)
+    await cache.set("plan:p1", {"id": "p1", "title": "Plan ✓"})
+    await cache.set("plan_board:p1", b"\x00\x01encoded")
+    assert await cache.get("plan:p1") == {"id": "p1", "title": "Plan ✓"}
+    assert await cache.get("plan_board:p1") == b"\x00\x01encoded"
+    assert await cache.get("plan:missing") is None
+    await cache.delete("plan:p1")
+    assert await cache.get("plan:p1") is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations(server):
+    cache = make_cache(server)
+    await cache.set_many({"task:t1": {"id": "t1"}, "task:t2": {"id": "t2"}})
+    assert await cache.get_many(["task:t1", "task:t2", "task:t3"]) == {"task:t1": {"id": "t1"}, "task:t2": {"id": "t2"}}
+    await cache.delete_many(["task:t1", "task:t2"])
+    assert await cache.get_many(["task:t1", "task:t2"]) == {}
+
+
+@pytest.mark.asyncio
+async def test_namespaces_do_not_see_each_other(server):
+    ours, theirs = make_cache(server), make_cache(server, namespace="other:")
+    await ours.set("plan:p1", 1)
+    await theirs.set("plan:p1", 2)
+    await ours.clear()
+    assert await ours.get("plan:p1") is None
+    assert await theirs.get("plan:p1") == 2
+    assert await theirs.keys() == ["plan:p1"]
+
+
+@pytest.mark.asyncio
+async def test_keys_and_entries_list_the_namespace(server):
+    cache = make_cache(server, namespace="ns[1]:")
+    await cache.set("plan:p1", {"id": "p1"})
+    await cache.set("plan_tasks:p1", [])
+    await cache.set("task:t1", {"id": "t1"}, ttl=60)
+    assert await cache.keys("plan") == ["plan:p1", "plan_tasks:p1"]
+    
+    entries = await cache.entries("task:")
+    assert [entry["key"] for entry in entries] == ["task:t1"]
+    assert 0 < entries[0]["ttl"] <= 60
+    assert entries[0]["bytes"] > 0
+    assert entries[0]["pinned"] is False
+    assert len(await cache.entries(limit=2)) == 2
+
+
+@pytest.mark.asyncio
+async def test_pins_remove_and_restore_the_expiry(server):
+    cache = make_cache(server)
+    await cache.set("plan:p1", 1)
+    assert await cache.pin(["plan:p1", "plan:missing"]) == 1
+    assert (await cache.entries())[0]["pinned"] is True
+    assert await cache.pin(["plan:p1"], pinned=False) == 1
+    entry = (await cache.entries())[0]
+    assert entry["pinned"] is False and entry["ttl"] > 0
+
+
+@pytest.mark.asyncio
+async def test_export_and_import_between_backends(server):
+    cache = make_cache(server)
+    await cache.set("plan:p1", {"id": "p1"}, ttl=60)
+    await cache.set("plan_board:p1", b"raw")
+    await cache.set("task:t1", {"id": "t1"})
+    data = await cache.export_entries("plan")
+    
+    memory = MemoryCache()
+    assert sorted(await memory.import_entries(data)) == ["plan:p1", "plan_board:p1"]
+    assert await memory.get("plan_board:p1") == b"raw"
+    
+    other = make_cache(server, namespace="copy:")
+    assert sorted(await other.import_entries(await memory.export_entries())) == ["plan:p1", "plan_board:p1"]
+    assert await other.get("plan:p1") == {"id": "p1"}
+    assert 0 < (await other.entries("plan:p1"))[0]["ttl"] <= 60
+
+
+@pytest.mark.asyncio
+async def test_codec_layer_on_redis(server):
+    cache = CodecCache(make_cache(server), {"plan_tasks:": "json"}, compress_min_bytes=16)
+    tasks = [{"id": f"t{i}", "title": "x" * 20} for i in range(10)]
+    await cache.set("plan_tasks:p1", tasks)
+    assert await cache.get("plan_tasks:p1") == tasks
+    stored = await cache.backend.get("plan_tasks:p1")
+    assert isinstance(stored, bytes)
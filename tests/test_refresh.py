@@ -0,0 +1,149 @@
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.exceptions import RateLimitError
+from src.tools.refresh import PLAN_KEY_PREFIXES, REFRESH_REQUESTS, TTL_FRACTION, RefreshScheduler
+
+
+class FakeGraph:
+    def __init__(self):
+        self.paused = 0.0
+    
+    def rate_limit_remaining(self) -> float:
+        return self.paused
+
+
+class FakePlanTools:
+    def __init__(self):
+        self.refreshed = []
+        self.error = None
+    
+    async def refresh_plan(self, plan_id: str) -> None:
+        if self.error:
+            raise self.error
+        self.refreshed.append(plan_id)
+
+
+def scheduler(cache=None, **kwargs):
+    return RefreshScheduler(FakeGraph(), cache or MemoryCache(), FakePlanTools(), **kwargs)
+
+
+async def read(cache, key, times):
+    for _ in range(times):
+        await cache.get(key)
+
+
+def test_interval_shrinks_with_the_rate_down_to_the_minimum():
+    refresh = scheduler(min_interval=30, max_interval=600)
+    assert refresh.interval(0) == 600
+    assert refresh.interval(4) == 120
+    assert refresh.interval(1000) == 30
+
+
+def test_intervals_are_capped_below_the_cache_ttl():
+    refresh = scheduler(min_interval=30, max_interval=600, ttl=300)
+    assert refresh.interval(0) == 300 * TTL_FRACTION
+    assert refresh.interval(1000) == 30
+    
+    short = scheduler(min_interval=30, max_interval=600, ttl=20)
+    assert short.interval(0) == short.interval(1000) == 20 * TTL_FRACTION
+    
+    # A TTL of 0 means entries do not expire, so nothing is capped
+    assert scheduler(max_interval=600, ttl=0).interval(0) == 600
+
+
+@pytest.mark.asyncio
+async def test_misses_count_as_reads():
+    cache = MemoryCache()
+    await cache.track_accesses(PLAN_KEY_PREFIXES)
+    await cache.get("plan:p1")
+    await cache.set("plan:p1", {"id": "p1"})
+    await cache.get("plan:p1")
+    await cache.get("task:t1")
+    assert await cache.take_accesses() == {"plan:p1": 2}
+
+
+@pytest.mark.asyncio
+async def test_rate_moves_halfway_to_the_observed_rate_per_half_life():
+    cache = MemoryCache()
+    refresh = scheduler(cache, half_life=60)
+    await cache.track_accesses(PLAN_KEY_PREFIXES)
+    
+    # 30 reads in one half-life is 30 reads per minute; the rate gets half of it
+    await read(cache, "plan:p1", 20)
+    await read(cache, "plan_tasks:p1", 10)
+    await refresh._observe(0, 60)
+    assert refresh._plans["p1"].rate == pytest.approx(15)
+    
+    await read(cache, "plan:p1", 30)
+    await refresh._observe(60, 60)
+    assert refresh._plans["p1"].rate == pytest.approx(22.5)
+    
+    # Without reads the rate decays by half per half-life
+    await refresh._observe(120, 60)
+    assert refresh._plans["p1"].rate == pytest.approx(11.25)
+
+
+@pytest.mark.asyncio
+async def test_idle_plans_are_dropped():
+    cache = MemoryCache()
+    refresh = scheduler(cache, max_interval=600, half_life=60)
+    await cache.track_accesses(PLAN_KEY_PREFIXES)
+    await read(cache, "plan:p1", 1)
+    await refresh._observe(0, 60)
+    assert "p1" in refresh._plans
+    
+    for now in range(60, 600, 60):
+        await refresh._observe(now, 60)
+    assert "p1" not in refresh._plans
+    assert refresh.status["tracked"] == 0
+
+
+def test_token_bucket_spends_and_refills_at_the_budget_rate():
+    refresh = scheduler(budget_per_minute=6)
+    start = refresh._tokens_at
+    assert refresh._take_budget(start, REFRESH_REQUESTS)
+    assert refresh._take_budget(start, REFRESH_REQUESTS)
+    assert not refresh._take_budget(start, 1)
+    
+    # 6 per minute is one token every 10 seconds
+    assert not refresh._take_budget(start + 20, REFRESH_REQUESTS)
+    assert refresh._take_budget(start + 30, REFRESH_REQUESTS)
+    
+    # The bucket never holds more than one minute's budget
+    assert refresh._take_budget(start + 3600, 6)
+    assert not refresh._take_budget(start + 3600, 1)
+
+
+@pytest.mark.asyncio
+async def test_due_plans_are_refreshed_hottest_first_within_the_budget():
+    cache = MemoryCache()
+    refresh = scheduler(cache, min_interval=0, max_interval=0, budget_per_minute=2 * REFRESH_REQUESTS)
+    await cache.track_accesses(PLAN_KEY_PREFIXES)
+    await read(cache, "plan:cold", 1)
+    await read(cache, "plan:warm", 5)
+    await read(cache, "plan:hot", 10)
+    
+    await refresh.run_once(5)
+    assert refresh.plan_tools.refreshed == ["hot", "warm"]
+    assert refresh.status["refreshed"] == 2
+    assert refresh.status["deferred"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_pauses_while_graph_is_throttling():
+    cache = MemoryCache()
+    refresh = scheduler(cache, min_interval=0, max_interval=0)
+    await cache.track_accesses(PLAN_KEY_PREFIXES)
+    await read(cache, "plan:p1", 1)
+    
+    refresh.graph.paused = 10
+    await refresh.run_once(5)
+    assert refresh.status["state"] == "paused"
+    assert refresh.plan_tools.refreshed == []
+    
+    refresh.graph.paused = 0
+    await read(cache, "plan:p1", 1)
+    refresh.plan_tools.error = RateLimitError("throttled")
+    await refresh.run_once(5)
+    assert refresh.status["state"] == "paused"
+    assert refresh.status["failed"] == 0
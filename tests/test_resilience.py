@@ -0,0 +1,101 @@
+import httpx
+import pytest
+from src.graph.client import GraphAPIClient
+from src.graph.exceptions import CircuitOpenError
+from src.graph.resilience import CircuitBreaker, endpoint_class
+
+
+def open_breaker(threshold=3, reset_timeout=30):
+    breaker = CircuitBreaker(threshold, reset_timeout)
+    for _ in range(threshold):
+        breaker.allow("planner/tasks")
+        breaker.record_failure()
+    return breaker
+
+
+def wait_out(breaker):
+    """Move the breaker past its reset timeout"""
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_endpoint_class_drops_ids():
+    assert endpoint_class("/planner/plans/abc/tasks") == "planner/plans/tasks"
+    assert endpoint_class("https://graph.microsoft.com/v1.0/planner/tasks/t1/details?x=1") == "planner/tasks/details"
+    assert endpoint_class("/") == "/"
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(threshold=3)
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("planner/tasks")
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_threshold_zero_never_opens():
+    breaker = CircuitBreaker(threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = open_breaker()
+    wait_out(breaker)
+    assert breaker.state == "half_open"
+    breaker.allow("planner/tasks")
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("planner/tasks")
+
+
+def test_trial_success_closes_and_failure_reopens():
+    breaker = open_breaker()
+    wait_out(breaker)
+    breaker.allow("planner/tasks")
+    breaker.record_success()
+    assert breaker.state == "closed"
+    
+    breaker = open_breaker()
+    wait_out(breaker)
+    breaker.allow("planner/tasks")
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_in() == pytest.approx(30, abs=1)
+
+
+def test_abandoned_trial_frees_the_slot():
+    breaker = open_breaker()
+    wait_out(breaker)
+    breaker.allow("planner/tasks")
+    breaker.abandon()
+    breaker.allow("planner/tasks")
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_releases_the_half_open_trial():
+    client = GraphAPIClient(auth_manager=None, breaker_threshold=1, breaker_reset_seconds=30)
+    
+    def handler(request):
+        raise RuntimeError("bug while sending")
+    
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    breaker = client._breaker("planner/tasks")
+    breaker.record_failure()
+    wait_out(breaker)
+    
+    # Each failed call frees the trial for the next one
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await client._request("planner/tasks", method="GET", url="https://graph.microsoft.com/v1.0/planner/tasks/t1")
+    assert breaker.state == "half_open"
+    await client.client.aclose()
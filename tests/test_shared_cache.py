@@ -0,0 +1,113 @@
+import asyncio
+import os
+import pytest
+import pytest_asyncio
+from src.cache.shared import SharedCacheClient, SharedCacheError, SharedCacheServer, _read_message, _write_message
+from src.tools.refresh import PLAN_KEY_PREFIXES
+from src.utils.worker_lock import WorkerLock
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "cache.sock")
+
+
+@pytest_asyncio.fixture
+async def server(socket_path):
+    server = SharedCacheServer(socket_path)
+    await server.start()
+    yield server
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_operations_round_trip(server, socket_path):
+    client = SharedCacheClient(socket_path)
+    await client.set("plan:p1", {"id": "p1"})
+    await client.set("plan_board:p1", b"\x00raw bytes")
+    assert await client.get("plan:p1") == {"id": "p1"}
+    assert await client.get("plan_board:p1") == b"\x00raw bytes"
+    assert await client.get_many(["plan:p1", "plan:p2"]) == {"plan:p1": {"id": "p1"}}
+    assert await client.keys("plan") == ["plan:p1", "plan_board:p1"]
+    await client.delete("plan:p1")
+    assert await client.get("plan:p1") is None
+    assert (await client.stats())["hits"] == 3
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_daemon_errors_are_raised_to_the_caller(server, socket_path):
+    client = SharedCacheClient(socket_path)
+    with pytest.raises(SharedCacheError):
+        await client.import_entries(b"not a snapshot")
+    # The connection is still usable
+    await client.set("k", 1)
+    assert await client.get("k") == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_unsupported_operation_is_rejected(server, socket_path):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    await _write_message(writer, ["snapshot", "/etc/passwd"])
+    ok, message = await _read_message(reader)
+    assert not ok
+    assert "Unsupported" in message
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_every_workers_reads_are_counted(server, socket_path):
+    first, second = SharedCacheClient(socket_path), SharedCacheClient(socket_path)
+    await first.track_accesses(PLAN_KEY_PREFIXES)
+    await first.set("plan:p1", {"id": "p1"})
+    await first.get("plan:p1")
+    await second.get("plan:p1")
+    await second.get("task:t1")
+    assert await first.take_accesses() == {"plan:p1": 2}
+    assert await first.take_accesses() == {}
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_client_reconnects_after_a_daemon_restart(socket_path):
+    server = SharedCacheServer(socket_path)
+    await server.start()
+    client = SharedCacheClient(socket_path)
+    await client.set("k", 1)
+    await server.close()
+    
+    # A new daemon with an empty cache; pooled connections to the old one are dropped
+    server = SharedCacheServer(socket_path)
+    await server.start()
+    assert await client.get("k") is None
+    await client.set("k", 2)
+    assert await client.get("k") == 2
+    await client.close()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_socket_file_is_replaced(socket_path):
+    with open(socket_path, "w") as f:
+        f.write("left over by a killed daemon")
+    server = SharedCacheServer(socket_path)
+    await server.start()
+    client = SharedCacheClient(socket_path)
+    await client.set("k", 1)
+    assert await client.get("k") == 1
+    await client.close()
+    await server.close()
+    assert not os.path.exists(socket_path)
+
+
+def test_worker_lock_is_held_by_one_process_at_a_time(tmp_path):
+    path = str(tmp_path / "jobs.lock")
+    first, second = WorkerLock(path), WorkerLock(path)
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    assert second.held
+    second.release()
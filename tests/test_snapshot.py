@@ -0,0 +1,99 @@
+import time
+import pytest
+from src.cache.memory import MemoryCache
+from src.cache.snapshot import decode_entries, encode_entries, read_snapshot, write_snapshot
+from src.tools.cache_admin import CacheAdmin
+from src.tools.plan_tools import PlanTools
+from src.tools.task_index import PlanTaskIndex
+
+ENTRIES = [
+    ("plan:p1", None, {"id": "p1", "title": "Plan ✓"}),
+    ("plan_tasks:p1", 1893456000.5, [{"id": "t1"}, {"id": "t2"}]),
+    ("plan_board:p1", None, b'{"raw":"bytes"}'),
+    ("empty", None, "")
+]
+
+
+def test_entries_round_trip():
+    assert decode_entries(encode_entries(ENTRIES)) == ENTRIES
+
+
+def test_no_entries():
+    assert decode_entries(encode_entries([])) == []
+
+
+def test_foreign_data_is_rejected():
+    with pytest.raises(ValueError, match="not a cache snapshot"):
+        decode_entries(b'{"plan:p1": {}}')
+
+
+@pytest.mark.parametrize("cut", [1, 3, 10, 30])
+def test_truncated_data_is_rejected(cut):
+    data = encode_entries(ENTRIES)
+    with pytest.raises(ValueError, match="truncated"):
+        decode_entries(data[:-cut])
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    path = str(tmp_path / "cache" / "snapshot.bin")
+    write_snapshot(path, ENTRIES)
+    assert read_snapshot(path) == ENTRIES
+
+
+@pytest.mark.asyncio
+async def test_cache_snapshot_and_restore_keep_values_and_expiry(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    cache = MemoryCache(default_ttl=300)
+    await cache.set("plan:p1", {"id": "p1"})
+    await cache.set("plan_board:p1", b"\x00encoded", ttl=60)
+    await cache.set("task:t1", {"id": "t1"}, ttl=-1)
+    await cache.set("plan:gone", {"id": "gone"}, ttl=1)
+    cache._cache["plan:gone"]["expires_at"] = time.time() - 1
+    assert await cache.snapshot(path) == 3
+    
+    restored = MemoryCache()
+    await restored.set("plan:p1", {"id": "p1", "title": "Newer"})
+    # Entries already present are newer than the snapshot and are kept
+    assert await restored.restore(path) == 2
+    assert await restored.get("plan:p1") == {"id": "p1", "title": "Newer"}
+    assert await restored.get("plan_board:p1") == b"\x00encoded"
+    assert restored._cache["plan_board:p1"]["expires_at"] == cache._cache["plan_board:p1"]["expires_at"]
+    assert restored._cache["task:t1"]["expires_at"] is None
+    assert await restored.get("plan:gone") is None
+
+
+@pytest.mark.asyncio
+async def test_restore_without_a_snapshot_file_restores_nothing(tmp_path):
+    assert await MemoryCache().restore(str(tmp_path / "missing.bin")) == 0
+
+
+@pytest.mark.asyncio
+async def test_import_skips_expired_entries_and_replaces_existing():
+    cache = MemoryCache()
+    await cache.set("plan:p1", {"id": "p1", "title": "Old"})
+    data = encode_entries([
+        ("plan:p1", None, {"id": "p1", "title": "New"}),
+        ("plan:p2", time.time() - 1, {"id": "p2"})
+    ])
+    assert await cache.import_entries(data) == ["plan:p1"]
+    assert await cache.get("plan:p1") == {"id": "p1", "title": "New"}
+    assert await cache.get("plan:p2") is None
+
+
+@pytest.mark.asyncio
+async def test_admin_import_invalidates_in_flight_loads_and_task_indexes():
+    cache = MemoryCache()
+    plan_tools = PlanTools(None, cache)
+    admin = CacheAdmin(cache, plan_tools)
+    
+    plan_tools.indexes._indexes["p1"] = PlanTaskIndex([{"id": "t1", "planId": "p1"}])
+    plan_tools.indexes._indexes["p2"] = PlanTaskIndex([{"id": "t9", "planId": "p2"}])
+    generation = await cache.generation("plan_tasks:p1")
+    
+    result = await admin.import_(encode_entries([("plan_tasks:p1", None, [{"id": "t2"}])]))
+    assert result == {"imported": 1}
+    # A load that read Graph before the import must not overwrite it
+    assert not await cache.set_if_unchanged("plan_tasks:p1", [{"id": "t1"}], generation)
+    assert await cache.get("plan_tasks:p1") == [{"id": "t2"}]
+    assert "p1" not in plan_tools.indexes._indexes
+    assert "p2" in plan_tools.indexes._indexes
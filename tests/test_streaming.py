@@ -0,0 +1,82 @@
+import json
+import pytest
+from src.graph.streaming import PageDecoder
+
+PAGE = {
+    "@odata.context": "https://graph.microsoft.com/v1.0/$metadata#planner/tasks",
+    "value": [
+        {"id": "t1", "title": "Straße ✓", "percentComplete": 50, "dueDateTime": None},
+        {"id": "t2", "title": "Nested", "assignments": {"u1": {"orderHint": "8!"}}, "tags": ["a", "b"]},
+        {"id": "t3", "title": "Escaped \"quote\" and ] bracket", "priority": 5}
+    ],
+    "@odata.nextLink": "https://graph.microsoft.com/v1.0/planner/plans/p1/tasks?$skiptoken=x"
+}
+
+
+def decode(body: bytes, size: int):
+    decoder = PageDecoder()
+    items = []
+    for i in range(0, len(body), size):
+        items.extend(decoder.feed(body[i:i + size]))
+    items.extend(decoder.close())
+    return items, decoder.fields
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_items_and_fields_survive_any_chunk_split(size):
+    body = json.dumps(PAGE, ensure_ascii=False, indent=1).encode()
+    items, fields = decode(body, size)
+    assert items == PAGE["value"]
+    assert fields == {key: value for key, value in PAGE.items() if key != "value"}
+
+
+def test_items_are_returned_as_soon_as_complete():
+    decoder = PageDecoder()
+    body = json.dumps({"value": [{"id": "t1"}, {"id": "t2"}]}).encode()
+    first_item_end = body.index(b"}") + 1
+    # The closing brace alone is not enough: the item could be a number or literal
+    assert decoder.feed(body[:first_item_end + 1]) == [{"id": "t1"}]
+    assert decoder.feed(body[first_item_end + 1:]) == [{"id": "t2"}]
+    assert decoder.close() == []
+
+
+def test_numbers_cut_at_a_chunk_boundary_are_not_truncated():
+    items, _ = decode(b'{"value": [12345, 6.75]}', 3)
+    assert items == [12345, 6.75]
+
+
+def test_multibyte_characters_split_across_chunks():
+    body = json.dumps({"value": [{"title": "日本語"}]}, ensure_ascii=False).encode()
+    items, _ = decode(body, 1)
+    assert items == [{"title": "日本語"}]
+
+
+def test_empty_page():
+    items, fields = decode(b'{"value": []}', 1)
+    assert items == []
+    assert fields == {}
+
+
+def test_items_key_that_is_not_an_array_is_kept_as_a_field():
+    items, fields = decode(b'{"value": null}', 2)
+    assert items == []
+    assert fields == {"value": None}
+
+
+@pytest.mark.parametrize("body", [
+    b'{"value": [{"id": "t1"}',
+    b'{"value": [{"id": "t1"}]',
+    b'{"value": [{"id": "t1',
+    b''
+])
+def test_incomplete_page_raises_on_close(body):
+    decoder = PageDecoder()
+    decoder.feed(body)
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_malformed_page_raises():
+    decoder = PageDecoder()
+    with pytest.raises(ValueError):
+        decoder.feed(b'["not", "an", "object"]')
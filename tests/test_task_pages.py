@@ -0,0 +1,149 @@
+import base64
+import json
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.order_hint import spread
+from src.tools.plan_tools import PlanTools, decode_cursor, encode_cursor
+from src.tools.task_index import PlanTaskIndex, TaskIndexes, order_key
+
+
+def make_tasks(count):
+    return [
+        {"id": f"t{i:03d}", "planId": "p1", "bucketId": "b1", "orderHint": hint}
+        for i, hint in enumerate(spread(count))
+    ]
+
+
+def read_all(index, size):
+    ids, after = index.page(None, size)
+    pages = [ids]
+    while after is not None:
+        ids, after = index.page(after, size)
+        pages.append(ids)
+    return pages
+
+
+def test_pages_cover_every_task_once_in_board_order():
+    tasks = make_tasks(25) + [{"id": "nohint", "planId": "p1"}]
+    index = PlanTaskIndex(tasks)
+    pages = read_all(index, 10)
+    assert [len(page) for page in pages] == [10, 10, 6]
+    flat = [task_id for page in pages for task_id in page]
+    assert flat == [task["id"] for task in sorted(tasks, key=order_key)]
+    assert flat[-1] == "nohint"
+
+
+def test_exact_multiple_has_no_empty_last_page():
+    index = PlanTaskIndex(make_tasks(20))
+    assert [len(page) for page in read_all(index, 10)] == [10, 10]
+
+
+def test_empty_plan():
+    assert PlanTaskIndex().page(None, 10) == ([], None)
+
+
+def test_writes_between_pages_do_not_shift_later_pages():
+    tasks = make_tasks(30)
+    index = PlanTaskIndex(tasks)
+    first, after = index.page(None, 10)
+    # A task removed from the first page and one added before the cursor
+    index.remove(first[0])
+    index.upsert({"id": "new", "planId": "p1", "orderHint": tasks[0]["orderHint"] + "0"})
+    second, _ = index.page(after, 10)
+    assert second == [task["id"] for task in tasks[10:20]]
+
+
+def test_writes_keep_the_order_without_sorting_again():
+    tasks = make_tasks(20)
+    index = PlanTaskIndex(tasks)
+    index.page(None, 5)
+    keys = index._order[0]
+    
+    index.upsert({**tasks[3], "orderHint": tasks[15]["orderHint"] + "0"})
+    index.remove("t007")
+    index.upsert({"id": "nohint", "planId": "p1"})
+    index.upsert({"id": "first", "planId": "p1", "orderHint": " "})
+    assert index._order[0] is keys
+    
+    ids = [task_id for page in read_all(index, 6) for task_id in page]
+    assert ids == [task["id"] for task in sorted(index.tasks.values(), key=order_key)]
+    assert ids[0] == "first" and ids[-1] == "nohint"
+    assert ids.index("t003") == ids.index("t015") + 1
+
+
+def test_task_changed_in_place_falls_back_to_sorting():
+    index = PlanTaskIndex(make_tasks(5))
+    index.page(None, 5)
+    task = index.get("t001")
+    task["orderHint"] = "~"
+    index.upsert(task)
+    assert read_all(index, 10)[0][-1] == "t001"
+
+
+@pytest.mark.asyncio
+async def test_index_builds_leave_no_state_behind():
+    indexes = TaskIndexes()
+    
+    async def load_with_write():
+        # A write while the build is loading: the build is not kept
+        indexes.upsert_task("p1", {"id": "t9", "planId": "p1"})
+        return make_tasks(3)
+    
+    index = await indexes.get("p1", load_with_write)
+    assert len(index.tasks) == 3
+    assert "p1" not in indexes._indexes
+    
+    async def load():
+        return make_tasks(3)
+    
+    for plan_id in ("p1", "p2"):
+        await indexes.get(plan_id, load)
+        indexes.discard(plan_id)
+    assert indexes._builds == {}
+    assert indexes._indexes == {}
+
+
+def test_encoded_task_follows_updates():
+    index = PlanTaskIndex(make_tasks(3))
+    assert json.loads(index.encoded("t001"))["id"] == "t001"
+    index.upsert({**index.get("t001"), "title": "Renamed"})
+    assert json.loads(index.encoded("t001"))["title"] == "Renamed"
+
+
+def test_cursor_round_trip():
+    after = (False, "P!", "t1")
+    assert decode_cursor("p1", encode_cursor("p1", after)) == after
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor("p2", (False, "P!", "t1")),
+    "not-a-cursor",
+    "%%%",
+    base64.urlsafe_b64encode(b'{"plan":"p1"}').decode(),
+    base64.urlsafe_b64encode(b'{"plan":"p1","after":[1,2]}').decode(),
+    ""
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("p1", cursor)
+
+
+@pytest.mark.asyncio
+async def test_tasks_page_json_pages_through_the_plan():
+    plan_tools = PlanTools(None, MemoryCache(), task_page_size=4, task_page_max_size=8)
+    tasks = make_tasks(10)
+    plan_tools.indexes._indexes["p1"] = PlanTaskIndex(tasks)
+    
+    page = json.loads(await plan_tools.get_tasks_page_json("p1"))
+    assert page["total"] == 10
+    assert page["pageSize"] == 4
+    seen = [task["id"] for task in page["tasks"]]
+    
+    page = json.loads(await plan_tools.get_tasks_page_json("p1", page["nextCursor"], page_size=100))
+    assert page["pageSize"] == 8
+    assert page["nextCursor"] is None
+    seen += [task["id"] for task in page["tasks"]]
+    assert seen == [task["id"] for task in tasks]
+    
+    with pytest.raises(ValueError):
+        await plan_tools.get_tasks_page_json("p1", "bogus")
@@ -0,0 +1,236 @@
+import asyncio
+import pytest
+from src.cache.memory import MemoryCache
+from src.graph.exceptions import ConflictError
+from src.graph.models import PlannerTask, PlannerTaskDetails
+from src.tools.task_index import PlanTaskIndex
+from src.tools.task_tools import TaskTools
+
+
+class FakeGraph:
+    """Tasks with etags; ``before_write`` lets a test change a task between our read and write"""
+    
+    def __init__(self, tasks):
+        self.tasks = {task["id"]: dict(task, version=1) for task in tasks}
+        self.before_write = None
+        self.patches = []
+    
+    def _etag(self, task_id):
+        return f'W/"{task_id}-{self.tasks[task_id]["version"]}"'
+    
+    def _task(self, task_id, select=None):
+        task = {name: value for name, value in self.tasks[task_id].items() if name != "version"}
+        if select:
+            task = {name: value for name, value in task.items() if name in select}
+        return PlannerTask.from_dict({**task, "@odata.etag": self._etag(task_id)})
+    
+    def change(self, task_id, **changes):
+        """Someone else's write"""
+        self.tasks[task_id].update(changes)
+        self.tasks[task_id]["version"] += 1
+    
+    async def get_task(self, task_id, select=None, expand=None):
+        return self._task(task_id, select)
+    
+    async def get_tasks(self, task_ids, select=None):
+        return {task_id: self._task(task_id, select) for task_id in task_ids}
+    
+    def _patch(self, task_id, updates, etag):
+        if self.before_write:
+            hook, self.before_write = self.before_write, None
+            hook()
+        if etag != self._etag(task_id):
+            return ConflictError(f"Resource changed since it was read: {task_id}")
+        self.patches.append((task_id, dict(updates)))
+        self.change(task_id, **updates)
+        return self._task(task_id)
+    
+    async def update_task(self, task_id, updates, etag):
+        result = self._patch(task_id, updates, etag)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    async def update_tasks(self, updates):
+        return {task_id: self._patch(task_id, changes, etag) for task_id, (changes, etag) in updates.items()}
+
+
+TASKS = [
+    {"id": "t1", "planId": "p1", "bucketId": "b1", "title": "A", "priority": 5, "orderHint": "3"},
+    {"id": "t2", "planId": "p1", "bucketId": "b1", "title": "B", "priority": 5, "orderHint": "5"},
+    {"id": "t3", "planId": "p1", "bucketId": "b1", "title": "C", "priority": 5, "orderHint": "7"}
+]
+
+
+@pytest.mark.asyncio
+async def test_conflict_on_other_fields_is_applied_to_the_new_version():
+    graph = FakeGraph(TASKS)
+    tools = TaskTools(graph, MemoryCache())
+    graph.before_write = lambda: graph.change("t1", title="Renamed")
+    
+    result = await tools.update_task("t1", {"priority": 1})
+    assert result["priority"] == 1
+    assert graph.tasks["t1"]["title"] == "Renamed"
+    assert graph.patches == [("t1", {"priority": 1})]
+
+
+@pytest.mark.asyncio
+async def test_conflict_on_the_same_field_keeps_the_other_write():
+    graph = FakeGraph(TASKS)
+    tools = TaskTools(graph, MemoryCache())
+    graph.before_write = lambda: graph.change("t1", priority=9)
+    
+    with pytest.raises(ConflictError, match="priority"):
+        await tools.update_task("t1", {"priority": 1, "title": "Mine"})
+    assert graph.tasks["t1"]["priority"] == 9
+    assert graph.tasks["t1"]["title"] == "A"
+    assert graph.patches == []
+
+
+@pytest.mark.asyncio
+async def test_queued_update_conflict_reaches_every_waiting_caller():
+    graph = FakeGraph(TASKS)
+    tools = TaskTools(graph, MemoryCache(), write_behind_window=0.02)
+    graph.before_write = lambda: graph.change("t1", bucketId="b2")
+    
+    results = await asyncio.gather(
+        tools.update_task("t1", {"bucketId": "b3"}),
+        tools.move_task("t1", "b4"),
+        return_exceptions=True
+    )
+    assert all(isinstance(result, ConflictError) for result in results)
+    assert graph.tasks["t1"]["bucketId"] == "b2"
+    await tools.close()
+
+
+@pytest.mark.asyncio
+async def test_queued_updates_are_coalesced_into_one_patch():
+    graph = FakeGraph(TASKS)
+    tools = TaskTools(graph, MemoryCache(), write_behind_window=0.02)
+    queued = await tools.update_task("t1", {"title": "X"}, wait=False)
+    assert queued == {"id": "t1", "queued": True, "pendingUpdates": {"title": "X"}}
+    await tools.update_task("t1", {"priority": 2}, wait=False)
+    await tools.flush()
+    assert graph.patches == [("t1", {"title": "X", "priority": 2})]
+    await tools.close()
+
+
+@pytest.mark.asyncio
+async def test_reorder_keeps_a_concurrent_move_and_reports_it():
+    graph = FakeGraph(TASKS)
+    tools = TaskTools(graph, MemoryCache())
+    index = PlanTaskIndex([{**task, "@odata.etag": graph._etag(task["id"])} for task in TASKS])
+    graph.before_write = lambda: graph.change("t3", orderHint="1")
+    
+    result = await tools.reorder_tasks("p1", "b1", ["t3", "t1"], index)
+    assert list(result["errors"]) == ["t3"]
+    assert "orderHint" in result["errors"]["t3"]
+    assert graph.tasks["t3"]["orderHint"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_reorder_rewrites_tasks_changed_in_other_fields():
+    graph = FakeGraph(TASKS)
+    tools = TaskTools(graph, MemoryCache())
+    index = PlanTaskIndex([{**task, "@odata.etag": graph._etag(task["id"])} for task in TASKS])
+    graph.before_write = lambda: graph.change("t3", title="Renamed")
+    
+    result = await tools.reorder_tasks("p1", "b1", ["t3", "t1"], index)
+    assert result["errors"] == {}
+    hints = {task_id: graph.tasks[task_id]["orderHint"] for task_id in ("t3", "t1", "t2")}
+    assert sorted(hints, key=hints.get) == ["t3", "t1", "t2"]
+    assert graph.tasks["t3"]["title"] == "Renamed"
+
+
+class FakeDetailsGraph:
+    """Task details with etags; checklist and references are patched item by item, like Graph"""
+    
+    def __init__(self, details):
+        self.details = dict(details)
+        self.version = 1
+        self.before_write = None
+        self.patches = []
+    
+    def _read(self):
+        return PlannerTaskDetails.from_dict({**self.details, "@odata.etag": f'W/"{self.version}"'})
+    
+    def change(self, updates):
+        for name, value in updates.items():
+            if name in ("checklist", "references"):
+                items = dict(self.details.get(name) or {})
+                for item, item_value in value.items():
+                    if item_value is None:
+                        items.pop(item, None)
+                    else:
+                        items[item] = {**items.get(item, {}), **item_value}
+                self.details[name] = items
+            else:
+                self.details[name] = value
+        self.version += 1
+    
+    async def get_task_details(self, task_id):
+        return self._read()
+    
+    async def update_task_details(self, task_id, updates, etag):
+        if self.before_write:
+            hook, self.before_write = self.before_write, None
+            hook()
+        if etag != self._read().odata_etag:
+            raise ConflictError(f"Resource changed since it was read: {task_id}")
+        self.patches.append(updates)
+        self.change(updates)
+        return self._read()
+
+
+DETAILS = {
+    "id": "t1",
+    "description": "Notes",
+    "checklist": {
+        "c1": {"title": "First", "isChecked": False},
+        "c2": {"title": "Second", "isChecked": False}
+    }
+}
+
+
+@pytest.mark.asyncio
+async def test_details_conflict_on_other_items_is_merged_onto_the_new_version():
+    graph = FakeDetailsGraph(DETAILS)
+    tools = TaskTools(graph, MemoryCache())
+    await tools._cache_details(await graph.get_task_details("t1"))
+    graph.before_write = lambda: graph.change({"checklist": {"c2": {"isChecked": True}}})
+    
+    result = await tools.update_task_details("t1", {"checklist": {"c1": {"isChecked": True}}})
+    assert result["checklist"]["c1"]["isChecked"] is True
+    assert result["checklist"]["c2"]["isChecked"] is True
+    assert len(graph.patches) == 1
+
+
+@pytest.mark.asyncio
+async def test_details_conflict_on_the_same_item_keeps_the_other_write():
+    graph = FakeDetailsGraph(DETAILS)
+    tools = TaskTools(graph, MemoryCache())
+    graph.before_write = lambda: graph.change({"checklist": {"c1": {"title": "Renamed"}}})
+    
+    with pytest.raises(ConflictError, match="checklist/c1"):
+        await tools.update_task_details("t1", {"checklist": {"c1": {"isChecked": True}}})
+    assert graph.details["checklist"]["c1"] == {"title": "Renamed", "isChecked": False}
+    assert graph.patches == []
+
+
+@pytest.mark.asyncio
+async def test_details_conflict_is_judged_against_the_cached_copy():
+    graph = FakeDetailsGraph(DETAILS)
+    cache = MemoryCache()
+    tools = TaskTools(graph, cache)
+    await tools._cache_details(await graph.get_task_details("t1"))
+    # Changed after it was cached; the cached etag is now stale
+    graph.change({"description": "Edited elsewhere"})
+    
+    with pytest.raises(ConflictError, match="description"):
+        await tools.update_task_details("t1", {"description": "Mine"})
+    assert graph.details["description"] == "Edited elsewhere"
+    
+    # The stale copy is dropped, so the next attempt reads the current version
+    assert await cache.get("task_details:t1") is None
+    result = await tools.update_task_details("t1", {"description": "Mine"})
+    assert result["description"] == "Mine"
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import httpx
+import pytest
+from src.graph.client import GraphAPIClient
+from src.tools.user_directory import MAX_IDS_PER_REQUEST, USER_FIELDS, UserDirectory
+
+
+class StaticAuth:
+    def get_token(self):
+        return "token"
+
+
+class Directory:
+    """A getByIds endpoint over known users; records the IDs of each request"""
+    
+    def __init__(self, user_ids, delay=0.0):
+        self.users = {user_id: {"id": user_id, "displayName": f"User {user_id}"} for user_id in user_ids}
+        self.delay = delay
+        self.requests = []
+    
+    async def handler(self, request):
+        assert request.url.path.endswith("/directoryObjects/getByIds")
+        body = json.loads(request.content)
+        self.requests.append((request.url.params["$select"], body["types"], body["ids"]))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return httpx.Response(200, json={"value": [self.users[i] for i in body["ids"] if i in self.users]})
+
+
+def make_directory(directory: Directory, **kwargs) -> UserDirectory:
+    client = GraphAPIClient(auth_manager=StaticAuth())
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(directory.handler))
+    return UserDirectory(client, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_ids_are_looked_up_in_chunks_of_the_request_limit():
+    user_ids = [f"u{i}" for i in range(2 * MAX_IDS_PER_REQUEST + 500)]
+    directory = Directory(user_ids)
+    users = make_directory(directory)
+    
+    resolved = await users.resolve(user_ids)
+    assert [len(ids) for _, _, ids in directory.requests] == [MAX_IDS_PER_REQUEST, MAX_IDS_PER_REQUEST, 500]
+    assert [user_id for _, _, ids in directory.requests for user_id in ids] == user_ids
+    assert all(select == ",".join(USER_FIELDS) and types == ["user"] for select, types, _ in directory.requests)
+    assert resolved["u2499"]["displayName"] == "User u2499"
+    await users.graph.client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_only_unknown_and_duplicate_free_ids_are_requested():
+    directory = Directory(["u1", "u2", "u3"])
+    users = make_directory(directory)
+    
+    await users.resolve(["u1", "u2", "u1"])
+    resolved = await users.resolve(["u2", "u3", "gone"])
+    assert [ids for _, _, ids in directory.requests] == [["u1", "u2"], ["u3", "gone"]]
+    assert resolved["gone"] == {"id": "gone", "displayName": None, "mail": None, "userPrincipalName": None}
+    
+    # IDs the directory did not return are remembered as well
+    await users.resolve(["u1", "gone"])
+    assert len(directory.requests) == 2
+    await users.graph.client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_pending_ids():
+    directory = Directory(["u1", "u2", "u3"], delay=0.05)
+    users = make_directory(directory)
+    
+    first, second = await asyncio.gather(users.resolve(["u1", "u2"]), users.resolve(["u2", "u3"]))
+    assert [ids for _, _, ids in directory.requests] == [["u1", "u2"], ["u3"]]
+    assert first["u2"] == second["u2"]
+    await users.graph.client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_users_are_dropped():
+    directory = Directory(["u1", "u2", "u3"])
+    users = make_directory(directory, max_users=2)
+    
+    await users.resolve(["u1", "u2"])
+    await users.resolve(["u1"])
+    await users.resolve(["u3"])
+    await users.resolve(["u1", "u2"])
+    assert [ids for _, _, ids in directory.requests] == [["u1", "u2"], ["u3"], ["u2"]]
+    await users.graph.client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_enrich_adds_assignee_names():
+    directory = Directory(["u1"])
+    users = make_directory(directory)
+    
+    tasks = [{"id": "t1", "assignments": {"u1": {}, "gone": {}}}, {"id": "t2"}]
+    enriched = await users.enrich(tasks)
+    assert enriched[0]["assignees"] == [{"id": "u1", "displayName": "User u1"}, {"id": "gone", "displayName": None}]
+    assert enriched[1]["assignees"] == []
+    assert "assignees" not in tasks[0]
+    await users.graph.client.aclose()
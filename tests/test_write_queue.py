@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from src.tools.write_queue import WriteQueue, merge_updates
+
+
+class Recorder:
+    def __init__(self, delay=0.0, fail=None):
+        self.writes = []
+        self.delay = delay
+        self.fail = fail
+        self.in_flight = 0
+        self.overlapped = False
+    
+    async def write(self, key, updates):
+        self.in_flight += 1
+        self.overlapped = self.overlapped or self.in_flight > 1
+        try:
+            await asyncio.sleep(self.delay)
+            self.writes.append((key, dict(updates)))
+            if self.fail:
+                raise self.fail
+            return {"id": key, **updates}
+        finally:
+            self.in_flight -= 1
+
+
+def test_merge_updates_patches_open_type_properties_per_key():
+    target = {"title": "A", "assignments": {"u1": {"orderHint": " !"}}}
+    merge_updates(target, {"title": "B", "assignments": {"u2": None}})
+    assert target == {"title": "B", "assignments": {"u1": {"orderHint": " !"}, "u2": None}}
+
+
+@pytest.mark.asyncio
+async def test_updates_within_the_window_become_one_write():
+    recorder = Recorder()
+    queue = WriteQueue(recorder.write, window=0.05)
+    first = queue.submit("t1", {"title": "A"})
+    second = queue.submit("t1", {"priority": 1})
+    third = queue.submit("t1", {"title": "B"})
+    assert queue.pending("t1") == {"title": "B", "priority": 1}
+    
+    results = await asyncio.gather(first, second, third)
+    assert recorder.writes == [("t1", {"title": "B", "priority": 1})]
+    assert results == [{"id": "t1", "title": "B", "priority": 1}] * 3
+    assert queue.pending("t1") is None
+
+
+@pytest.mark.asyncio
+async def test_keys_are_written_separately():
+    recorder = Recorder()
+    queue = WriteQueue(recorder.write, window=0.01)
+    await asyncio.gather(queue.submit("t1", {"title": "A"}), queue.submit("t2", {"title": "B"}))
+    assert sorted(recorder.writes) == [("t1", {"title": "A"}), ("t2", {"title": "B"})]
+
+
+@pytest.mark.asyncio
+async def test_updates_during_a_write_form_the_next_write_in_order():
+    recorder = Recorder(delay=0.05)
+    queue = WriteQueue(recorder.write, window=0.01)
+    first = queue.submit("t1", {"percentComplete": 50})
+    await asyncio.sleep(0.03)
+    # The first write is in flight now
+    second = queue.submit("t1", {"percentComplete": 100})
+    await asyncio.gather(first, second)
+    assert recorder.writes == [("t1", {"percentComplete": 50}), ("t1", {"percentComplete": 100})]
+    assert not recorder.overlapped
+
+
+@pytest.mark.asyncio
+async def test_a_failed_write_fails_every_update_it_carried():
+    recorder = Recorder(fail=ValueError("conflict"))
+    queue = WriteQueue(recorder.write, window=0.01)
+    futures = [queue.submit("t1", {"title": "A"}), queue.submit("t1", {"priority": 1})]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    
+    # The queue keeps working for later updates
+    recorder.fail = None
+    assert await queue.submit("t1", {"title": "B"}) == {"id": "t1", "title": "B"}
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_without_waiting_for_the_window():
+    recorder = Recorder()
+    queue = WriteQueue(recorder.write, window=60)
+    future = queue.submit("t1", {"title": "A"})
+    await asyncio.wait_for(queue.flush("t1"), 1)
+    assert future.done()
+    assert recorder.writes == [("t1", {"title": "A"})]
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_and_refuses_new_updates():
+    recorder = Recorder()
+    queue = WriteQueue(recorder.write, window=60)
+    future = queue.submit("t1", {"title": "A"})
+    await asyncio.wait_for(queue.close(), 1)
+    assert future.result() == {"id": "t1", "title": "A"}
+    with pytest.raises(RuntimeError):
+        queue.submit("t1", {"title": "B"})